@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the json and columns fetch formats of Warp10Client.
+
+The stub server replays /exec payloads, synthetic ones by default or
+responses recorded from a real Warp10 with --json-payload and
+--columns-payload (e.g. saved with curl from the same fetch, with and
+without the columns wrapper). Run from the repository root::
+
+    python -m benchmarks.bench_columns --points 1000000
+"""
+
+import argparse
+
+import warp10client
+
+from benchmarks.common import measure
+from benchmarks.common import report
+from benchmarks.stub_server import columns_payload
+from benchmarks.stub_server import gts_payload
+from benchmarks.stub_server import StubServer
+
+METRIC = {'name': 'bench.metric', 'tags': {'serie': '0'}}
+
+
+def read_payload(path):
+    with open(path, 'rb') as payload:
+        return payload.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=200000)
+    parser.add_argument('--series', type=int, default=1)
+    parser.add_argument('--json-payload', help='recorded json response')
+    parser.add_argument('--columns-payload',
+                        help='recorded columns response')
+    parser.add_argument('--memory', action='store_true',
+                        help='also trace peak memory (much slower)')
+    args = parser.parse_args()
+
+    payloads = (
+        ('json', read_payload(args.json_payload) if args.json_payload
+         else gts_payload(args.points, args.series)),
+        ('columns', read_payload(args.columns_payload)
+         if args.columns_payload
+         else columns_payload(args.points, args.series)),
+    )
+    for fetch_format, payload in payloads:
+        with StubServer(exec_payload=payload) as server:
+            client = warp10client.Warp10Client(read_token='bench',
+                                               warp10_api_url=server.url,
+                                               fetch_format=fetch_format)
+            print('%s payload: %.1f MiB' %
+                  (fetch_format, len(payload) / 1024.0 / 1024.0))
+            content = client._fetch(METRIC)
+            runs = (
+                ('%s decode' % fetch_format,
+                 lambda: sum(len(timeserie) for timeserie in
+                             client._get_timeserie_set(
+                                 client._loads(content)))),
+                ('%s get_all()' % fetch_format,
+                 lambda: sum(len(timeserie) for timeserie in
+                             client.get_all(METRIC))),
+            )
+            for label, func in runs:
+                count, seconds, peak = measure(func, memory=args.memory)
+                report(label, seconds, peak, '(%d points)' % count)
+
+
+if __name__ == '__main__':
+    main()
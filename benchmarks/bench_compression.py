@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Report bytes saved and CPU spent by gzip compressed ingestion.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_compression --metrics 200000
+"""
+
+import argparse
+import time
+
+import warp10client
+from warp10client.common import compression
+
+from benchmarks.common import measure
+from benchmarks.common import report
+from benchmarks.stub_server import StubServer
+
+
+def gen_metrics(count, series=100):
+    for i in range(count):
+        yield {
+            'name': 'os.cpu.util',
+            'tags': {'host': 'host-%03d.example.com' % (i % series),
+                     'project_id': '8069f876e7d444249ef04b9a74090711',
+                     'unit': '%'},
+            'position': {'timestamp': 1500000000000000 + i * 1000000},
+            'value': (i * 7) % 100 + 0.5,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--metrics', type=int, default=200000)
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 6, 9])
+    args = parser.parse_args()
+
+    client = warp10client.Warp10Client()
+    raw = b''.join(client._get_write_body(gen_metrics(args.metrics)))
+    print('raw body: %d metrics, %d bytes' % (args.metrics, len(raw)))
+    for level in args.levels:
+        start = time.time()
+        size = sum(len(chunk) for chunk in
+                   compression.gzip_chunks([raw], level=level))
+        seconds = time.time() - start
+        report('gzip level %d' % level, seconds,
+               extra='%10d bytes  ratio %5.1fx  %6.1f MiB/s' % (
+                   size, float(len(raw)) / size,
+                   len(raw) / seconds / 1024 / 1024))
+
+    with StubServer() as server:
+        for label, kwargs in (('set() uncompressed', {}),
+                              ('set() gzip level 1',
+                               {'compression': 'gzip',
+                                'compression_level': 1}),
+                              ('set() gzip level 6',
+                               {'compression': 'gzip'})):
+            client = warp10client.Warp10Client(write_token='bench',
+                                               warp10_api_url=server.url,
+                                               **kwargs)
+            server.bytes_received = 0
+            _, seconds, _ = measure(lambda: client.set(
+                gen_metrics(args.metrics), return_metrics=False))
+            report(label, seconds,
+                   extra='%10d bytes sent' % server.bytes_received)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measure get/set throughput of ConcurrentWarp10Client.
+
+The stub server adds a fixed latency to every call to mimic a remote
+backend. Run from the repository root::
+
+    python -m benchmarks.bench_concurrent --calls 200 --latency 0.01
+"""
+
+import argparse
+
+import warp10client
+from warp10client.parallel import ConcurrentWarp10Client
+
+from benchmarks.common import measure
+from benchmarks.common import report
+from benchmarks.stub_server import gts_payload
+from benchmarks.stub_server import StubServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 4, 16, 32])
+    args = parser.parse_args()
+
+    metrics = [{'name': 'bench.metric', 'tags': {'serie': str(i)}}
+               for i in range(args.calls)]
+    batches = [{'name': 'bench.metric', 'tags': {'serie': str(i)},
+                'value': i, 'position': {'timestamp': i}}
+               for i in range(args.calls)]
+    kwargs = dict(read_token='bench', write_token='bench')
+
+    with StubServer(exec_payload=gts_payload(10),
+                    delay=args.latency) as server:
+        kwargs['warp10_api_url'] = server.url
+        client = warp10client.Warp10Client(**kwargs)
+        _, seconds, _ = measure(lambda: [client.get(m) for m in metrics])
+        report('get sequential', seconds,
+               extra='%8.1f calls/s' % (args.calls / seconds))
+        for workers in args.workers:
+            with ConcurrentWarp10Client(max_workers=workers,
+                                        **kwargs) as client:
+                _, seconds, _ = measure(
+                    lambda: client.parallel_get(metrics))
+                report('parallel_get %d workers' % workers, seconds,
+                       extra='%8.1f calls/s' % (args.calls / seconds))
+                _, seconds, _ = measure(
+                    lambda: client.parallel_set(batches))
+                report('parallel_set %d workers' % workers, seconds,
+                       extra='%8.1f calls/s' % (args.calls / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare GTS line encoding throughput.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_encoder --points 500000
+"""
+
+import argparse
+import array
+
+try:
+    from urllib.parse import quote_plus
+except ImportError:
+    from urllib import quote_plus
+
+import warp10client
+from warp10client.encoder import GTSEncoder
+
+from benchmarks.common import measure
+from benchmarks.common import report
+
+TAGS = {'resource_id': '18d94676-077c-4c13-b000-27fd603f3056',
+        'project_id': '8069f876e7d444249ef04b9a74090711',
+        'unit': '%'}
+
+
+def legacy_format_metric(metric):
+    # NOTE: Metric.format_metric() before label block caching.
+    tags = ','.join(
+        '{}={}'.format(quote_plus(k), quote_plus(metric._tags[k]))
+        for k in metric._tags if metric._tags[k]
+    )
+    return '{}/{}/{} {}{} {}'.format(
+        int(metric.position.timestamp), metric.position.lat_lon,
+        metric.position.elevation, quote_plus(metric.name),
+        '{' + tags + '}', metric.value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=500000)
+    args = parser.parse_args()
+
+    timestamps = array.array('q', (1500000000000000 + i * 1000000
+                                   for i in range(args.points)))
+    values = array.array('d', (i * 0.5 for i in range(args.points)))
+    metrics = [warp10client.Metric(name='cpu_util', value=values[i],
+                                   tags=TAGS,
+                                   position={'timestamp': timestamps[i]})
+               for i in range(args.points)]
+    client = warp10client.Warp10Client()
+
+    runs = (
+        ('legacy format_metric', lambda: sum(
+            1 for metric in metrics if legacy_format_metric(metric))),
+        ('Metric.format_metric', lambda: sum(
+            1 for metric in metrics if metric.format_metric())),
+        ('set() body, continuation', lambda: sum(
+            1 for _ in client._iter_write_body(metrics))),
+        ('GTSEncoder.encode', lambda: sum(
+            1 for _ in GTSEncoder('cpu_util', TAGS).encode(timestamps,
+                                                           values))),
+    )
+    for label, func in runs:
+        count, seconds, _ = measure(func)
+        report(label, seconds, extra='%12.0f lines/s' % (count / seconds))
+
+
+if __name__ == '__main__':
+    main()
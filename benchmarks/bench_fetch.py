@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare response decoding strategies of Warp10Client.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_fetch --points 1000000
+"""
+
+import argparse
+
+import warp10client
+
+from benchmarks.common import measure
+from benchmarks.common import report
+from benchmarks.stub_server import gts_payload
+from benchmarks.stub_server import StubServer
+
+METRIC = {'name': 'bench.metric', 'tags': {'serie': '0'}}
+
+
+def legacy_get(client, metric):
+    # NOTE: Decoding as done before the single parse decoder,
+    # the response is evaluated four times.
+    resp = client._call(metric, call_type='fetch')
+    count = 0
+    if eval(resp.content)[0]:
+        values = eval(resp.content)[0][0].get('v')
+        eval(resp.content)[0][0].get('c')
+        eval(resp.content)[0][0].get('l')
+        count = len(values)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=200000)
+    parser.add_argument('--memory', action='store_true',
+                        help='also trace peak memory (much slower)')
+    args = parser.parse_args()
+
+    with StubServer(exec_payload=gts_payload(args.points)) as server:
+        client = warp10client.Warp10Client(read_token='bench',
+                                           write_token='bench',
+                                           warp10_api_url=server.url)
+        print('payload: %d points, %.1f MiB' %
+              (args.points, len(server.exec_payload) / 1024.0 / 1024.0))
+        runs = (
+            ('eval x4 (legacy)', lambda: legacy_get(client, METRIC)),
+            ('single parse get()',
+             lambda: len(client.get(METRIC).metrics)),
+            ('streaming stream()',
+             lambda: sum(1 for _ in client.stream(METRIC))),
+        )
+        for label, func in runs:
+            count, seconds, peak = measure(func, memory=args.memory)
+            report(label, seconds, peak, '(%d points)' % count)
+
+
+if __name__ == '__main__':
+    main()
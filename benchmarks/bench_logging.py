@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measure the cost of debug logging arguments on large set() batches.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_logging --metrics 200000
+"""
+
+import argparse
+from copy import deepcopy
+import logging
+
+import six
+
+import warp10client
+from warp10client.common import constants
+
+from benchmarks.common import measure
+from benchmarks.common import report
+from benchmarks.stub_server import StubServer
+
+
+def gen_metrics(count, series=100):
+    for i in range(count):
+        yield {
+            'name': 'os.cpu.util',
+            'tags': {'host': 'host-%03d.example.com' % (i % series),
+                     'unit': '%'},
+            'position': {'timestamp': 1500000000000000 + i * 1000000},
+            'value': (i * 7) % 100 + 0.5,
+        }
+
+
+def legacy_log_arguments(headers, data):
+    # NOTE: Arguments built by _call() before lazy logging,
+    # whether debug logging was on or not.
+    headers = deepcopy(headers)
+    if constants.WARP_TOKEN_HEADER_NAME in headers:
+        headers[constants.WARP_TOKEN_HEADER_NAME] = 'hashed'
+    if isinstance(data, six.binary_type):
+        data = data.decode('utf-8')
+    data = deepcopy(data)
+    return headers, constants.WARP_TOKEN_HEADER_NAME in data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--metrics', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    client = warp10client.Warp10Client()
+    body = b''.join(client._get_write_body(gen_metrics(args.metrics)))
+    headers = client._get_headers(call_type='ingress')
+    print('body: %d metrics, %d bytes' % (args.metrics, len(body)))
+
+    _, seconds, _ = measure(lambda: [legacy_log_arguments(headers, body)
+                                     for _ in range(args.repeat)])
+    report('legacy log arguments', seconds / args.repeat, extra='per call')
+    _, seconds, _ = measure(lambda: [client._get_log_data(body)
+                                     for _ in range(args.repeat)])
+    report('log preview', seconds / args.repeat, extra='per call')
+
+    # NOTE: Records are built but not written anywhere.
+    log = logging.getLogger('warp10client.client')
+    log.addHandler(logging.NullHandler())
+    log.propagate = False
+    with StubServer() as server:
+        client = warp10client.Warp10Client(write_token='bench',
+                                           warp10_api_url=server.url)
+        for label, level in (('set() DEBUG off', logging.INFO),
+                             ('set() DEBUG on', logging.DEBUG)):
+            log.setLevel(level)
+            _, seconds, _ = measure(lambda: [
+                client._call(None, call_type='ingress', body=body)
+                for _ in range(args.repeat)])
+            report(label, seconds / args.repeat, extra='per call')
+        log.setLevel(logging.NOTSET)
+
+
+if __name__ == '__main__':
+    main()
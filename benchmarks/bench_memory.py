@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measure the memory held per datapoint of a Timeserie.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_memory --points 1000000
+"""
+
+import argparse
+import gc
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from warp10client.timeserie import ColumnsBuilder
+
+from benchmarks.common import report
+
+TAGS = {'resource_id': '18d94676-077c-4c13-b000-27fd603f3056',
+        'project_id': '8069f876e7d444249ef04b9a74090711',
+        'unit': '%'}
+
+
+class LegacyPosition(object):
+    # NOTE: Dict backed Position as before __slots__.
+    def __init__(self, timestamp, latitude=None, longitude=None,
+                 elevation=None):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.elevation = elevation
+        self.timestamp = timestamp
+
+
+class LegacyMetric(object):
+    # NOTE: Dict backed Metric as before __slots__, labels are
+    # copied for every datapoint.
+    DEFAULT_TAGS = {}
+
+    def __init__(self, name, value=None, tags=None, position=None):
+        self.name = name
+        self.value = value
+        self._tags = LegacyMetric.DEFAULT_TAGS.copy()
+        self._tags.update(**tags)
+        position.lat_lon = ''
+        position.elevation = ''
+        self.position = position
+
+
+def legacy_metrics(timeserie):
+    return [LegacyMetric(name=timeserie.name, value=timeserie.values[i],
+                         tags=timeserie.tags or {},
+                         position=LegacyPosition(timeserie.timestamps[i]))
+            for i in range(len(timeserie))]
+
+
+def build_timeserie(points):
+    builder = ColumnsBuilder()
+    for i in range(points):
+        builder.append(1500000000000000 + i * 1000000, None, None, None,
+                       (i * 7) % 100 + 0.5)
+    return builder.build(name='cpu_util', tags=dict(TAGS))
+
+
+def retained(func):
+    """Run ``func`` and return (result, seconds, bytes still allocated)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    try:
+        result = func()
+        elapsed = time.time() - start
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=1000000)
+    args = parser.parse_args()
+    if tracemalloc is None:
+        parser.error('tracemalloc is required (python 3.4+)')
+
+    timeserie, seconds, size = retained(
+        lambda: build_timeserie(args.points))
+    report('columns', seconds,
+           extra='%6.1f bytes/point' % (float(size) / args.points))
+    runs = (
+        ('metrics, dict backed', lambda: legacy_metrics(timeserie)),
+        ('metrics, __slots__', lambda: list(timeserie.metrics)),
+    )
+    for label, func in runs:
+        metrics, seconds, size = retained(func)
+        report(label, seconds,
+               extra='%6.1f bytes/point' % (float(size) / len(metrics)))
+        del metrics
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measure ingest throughput of ConcurrentWarp10Client.sharded_set().
+
+The stub server adds a fixed latency to every /update call and ingests
+bodies at a bounded rate per connection, to mimic a remote backend. Run
+from the repository root::
+
+    python -m benchmarks.bench_sharding --metrics 200000 --rate 1
+"""
+
+import argparse
+
+import warp10client
+from warp10client.parallel import ConcurrentWarp10Client
+
+from benchmarks.common import measure
+from benchmarks.common import report
+from benchmarks.stub_server import StubServer
+
+
+def gen_metrics(count, series):
+    return [{'name': 'os.cpu.util',
+             'tags': {'host': 'host-%04d.example.com' % (i % series)},
+             'position': {'timestamp': 1500000000000000 + i * 1000000},
+             'value': (i * 7) % 100 + 0.5}
+            for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--metrics', type=int, default=200000)
+    parser.add_argument('--series', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--rate', type=float, default=1,
+                        help='ingest rate per connection, in MiB/s')
+    parser.add_argument('--shards', type=int, nargs='+',
+                        default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    metrics = gen_metrics(args.metrics, args.series)
+    kwargs = dict(write_token='bench')
+    with StubServer(delay=args.latency,
+                    ingest_rate=args.rate * 1024 * 1024) as server:
+        kwargs['warp10_api_url'] = server.url
+        client = warp10client.Warp10Client(**kwargs)
+        _, seconds, _ = measure(
+            lambda: client.set(metrics, return_metrics=False))
+        report('set() single body', seconds,
+               extra='%10.0f points/s' % (args.metrics / seconds))
+        baseline = None
+        for shards in args.shards:
+            with ConcurrentWarp10Client(max_workers=shards,
+                                        **kwargs) as client:
+                _, seconds, _ = measure(
+                    lambda: client.sharded_set(metrics, shards=shards))
+            baseline = baseline or seconds
+            report('sharded_set %d shards' % shards, seconds,
+                   extra='%10.0f points/s  x%.2f' % (
+                       args.metrics / seconds, baseline / seconds))
+        print('lines received: %d' % server.lines_received)
+
+
+if __name__ == '__main__':
+    main()
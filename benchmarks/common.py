@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Helpers shared by the benchmark scripts."""
+
+import gc
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def measure(func, memory=False):
+    """Run ``func`` once and return (result, seconds, peak_bytes)."""
+    gc.collect()
+    if memory and tracemalloc:
+        tracemalloc.start()
+    start = time.time()
+    try:
+        result = func()
+        elapsed = time.time() - start
+    finally:
+        peak = None
+        if memory and tracemalloc:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def report(label, seconds, peak=None, extra=''):
+    line = '%-28s %9.3f s' % (label, seconds)
+    if peak is not None:
+        line += ' %10.1f MiB peak' % (peak / 1024.0 / 1024.0)
+    print(line + (' ' + extra if extra else ''))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Local stub of the Warp10 HTTP API used by the benchmarks.
+
+It answers /exec with a canned payload and swallows /update bodies, so
+client side costs can be measured without a real Warp10 backend.
+"""
+
+import threading
+import time
+import zlib
+
+import six
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = list()
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if not size:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for key, value in six.iteritems(headers or {}):
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        body = self._read_body()
+        self.server.record(self.path, self.headers, body)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if self.server.ingest_rate and self.path.endswith('/update'):
+            # NOTE: Mimic a backend ingesting at a bounded rate
+            # per connection.
+            time.sleep(len(body) / float(self.server.ingest_rate))
+        if self.path.endswith('/exec'):
+            self._reply(self.server.status, self.server.exec_payload,
+                        {'Content-Type': 'application/json'})
+        elif self.path.endswith('/update'):
+            self._reply(self.server.status)
+        elif '/delete' in self.path:
+            self._reply(self.server.status, self.server.delete_payload)
+        else:
+            self._reply(404)
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class StubServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, exec_payload=b'[[]]', delay=0, status=200,
+                 ingest_rate=None):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.exec_payload = exec_payload
+        self.delete_payload = b''
+        self.delay = delay
+        self.ingest_rate = ingest_rate
+        self.status = status
+        self.requests = 0
+        self.bytes_received = 0
+        self.lines_received = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://%s:%d/api/v0' % self.server_address
+
+    def record(self, path, headers, body):
+        size = len(body)
+        if headers.get('Content-Type') == 'application/gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += size
+            if path.endswith('/update'):
+                self.lines_received += body.count(b'\n')
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def gts_payload(points, series=1, name='bench.metric'):
+    """Render a synthetic /exec response holding ``series`` GTS."""
+    gts = list()
+    for serie in six.moves.range(series):
+        values = ','.join(
+            '[%d,%r]' % (1500000000000000 + i * 1000000, i * 0.5)
+            for i in six.moves.range(points))
+        gts.append('{"c":"%s","l":{"serie":"%d"},"a":{},"v":[%s]}' %
+                   (name, serie, values))
+    return ('[[%s]]' % ','.join(gts)).encode('utf-8')
+
+
+def columns_payload(points, series=1, name='bench.metric'):
+    """Render the /exec response of the same GTS in the columns format."""
+    gts = list()
+    for serie in six.moves.range(series):
+        ticks = ','.join('%d' % (1500000000000000 + i * 1000000)
+                         for i in six.moves.range(points))
+        values = ','.join('%r' % (i * 0.5) for i in six.moves.range(points))
+        # NOTE: Series without geo data get empty geo columns.
+        gts.append('["%s",{"serie":"%d"},[%s],[%s],[],[],[]]' %
+                   (name, serie, ticks, values))
+    return ('[[%s]]' % ','.join(gts)).encode('utf-8')
@@ -3,3 +3,4 @@
 
 from warp10client.client import Warp10Client  # noqa: F401
 from warp10client.metric import Metric  # noqa: F401
+from warp10client.query import Query  # noqa: F401
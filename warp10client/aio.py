@@ -0,0 +1,437 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""asyncio flavour of the Warp10 client, requires python 3.5+ and aiohttp.
+"""
+
+import asyncio
+import logging
+
+import daiquiri
+import requests
+import six
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from warp10client.client import CallException
+from warp10client.client import Warp10Client
+from warp10client.metric import Metric
+from warp10client.retry import RETRY_STATUSES
+
+LOG = daiquiri.getLogger(__name__)
+
+
+def _unsupported(name, hint):
+    # NOTE: Blocking methods of Warp10Client would get coroutines from
+    # _call(), they fail right away instead.
+    def method(self, *args, **kwargs):
+        raise TypeError('AsyncWarp10Client.{}() is not supported, {}'.format(
+            name, hint))
+    method.__name__ = name
+    return method
+
+
+class _AsyncChunks(object):
+    """
+
+    Asynchronous iterator over the chunks of a body.
+
+    aiohttp streams asynchronous iterables with chunked transfer
+    encoding. Asynchronous generators would need python 3.6.
+
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class AsyncWarp10Client(Warp10Client):
+    """
+
+    Warp10 client built on aiohttp.
+
+    WarpScript generation, bodies and response decoding are shared with
+    Warp10Client, only the transport is asynchronous. The aiohttp session
+    is created on first call, from within the running event loop.
+
+    timeout, retry and circuit_breaker behave as in Warp10Client,
+    connections are bounded by limit instead of the pool options.
+
+    """
+
+    UNSUPPORTED_OPTIONS = {
+        'pool_connections': 'use limit',
+        'pool_maxsize': 'use limit',
+        'pool_block': 'use limit',
+        'interval_cache': 'fetches are not cached by interval',
+        'instrumentation': 'calls are not instrumented',
+    }
+
+    def __init__(self, limit=100, **kwargs):
+        if aiohttp is None:
+            raise ImportError('aiohttp is required by AsyncWarp10Client')
+        if kwargs.get('spool') is not None:
+            # NOTE: The replayer sends spooled lines with
+            # blocking calls.
+            raise ValueError('AsyncWarp10Client does not support a spool')
+        if kwargs.get('read_endpoints') or kwargs.get('write_endpoints'):
+            raise ValueError('AsyncWarp10Client does not support endpoint '
+                             'pools')
+        for option, hint in sorted(six.iteritems(self.UNSUPPORTED_OPTIONS)):
+            if kwargs.get(option):
+                raise ValueError('AsyncWarp10Client does not support '
+                                 '{}, {}'.format(option, hint))
+        super(AsyncWarp10Client, self).__init__(**kwargs)
+        # NOTE: Drop the blocking session created by
+        # Warp10Client.
+        self._session.close()
+        self._session = None
+        self._limit = limit
+        self._client_timeout = self._get_client_timeout(self._timeout)
+
+    @staticmethod
+    def _get_client_timeout(timeout):
+        # NOTE: Like requests, a single value bounds both the
+        # connection and every read, a tuple gives them apart.
+        if timeout is None:
+            return None
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect = read = timeout
+        return aiohttp.ClientTimeout(total=None, sock_connect=connect,
+                                     sock_read=read)
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._limit))
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    __enter__ = _unsupported('__enter__', 'use async with')
+
+    __exit__ = _unsupported('__exit__', 'use async with')
+
+    get_pages = _unsupported('get_pages', 'fetch windows with get_all()')
+
+    stream = _unsupported('stream', 'use get() or get_all()')
+
+    send_request = _unsupported('send_request', 'use get() or set()')
+
+    async def find(self, metric):
+        """
+
+        Find series matching metric, see Warp10Client.find().
+
+        :param metric: Hash with name and tags selectors
+        :return: list of hashes with name and tags, one per serie
+
+        """
+        resp = await self._call(self._gen_find_script(metric),
+                                call_type='fetch')
+        try:
+            content = await resp.read()
+        finally:
+            resp.release()
+        return self._get_found_series(metric, self._loads(content))
+
+    async def refresh_index(self, metric=None):
+        """
+
+        Refresh the label index, see Warp10Client.refresh_index().
+
+        :return: number of series found
+
+        """
+        if self._label_index is None:
+            raise ValueError('Client has no label index')
+        return len(await self.find(metric or {'name': '~.*'}))
+
+    async def resolve(self, metric):
+        """
+
+        Resolve metric selectors into exact selectors, see
+        Warp10Client.resolve().
+
+        :return: list of metric hashes
+
+        """
+        if self._label_index is not None:
+            series = self._label_index.find(metric)
+        else:
+            series = await self.find(metric)
+        return self._get_exact_metrics(metric, series)
+
+    async def exists(self, metric):
+        """
+
+        Check if metric exists in Warp10 backend.
+
+        :param metric: Hash with metric that needs to be checked
+        :return: bolean
+
+        """
+        return (await self.exists_many([metric]))[0]
+
+    async def exists_many(self, metrics, max_script_size=None):
+        """
+
+        Check if many metrics exist in Warp10 backend, see
+        Warp10Client.exists_many().
+
+        Chunks of the script are sent concurrently.
+
+        :param metrics: list of metric hashes that need to be checked
+        :param max_script_size: maximum size of a script in bytes
+        :return: list of booleans, one per metric
+
+        """
+        if max_script_size is None:
+            max_script_size = self.DEFAULT_MAX_SCRIPT_SIZE
+        scripts = [self._gen_exists_script(metric) for metric in metrics]
+        results = [self._exists_cache.get(script)
+                   if self._exists_cache is not None else None
+                   for script in scripts]
+        missing = [index for index, result in enumerate(results)
+                   if result is None]
+        chunks = list(self._iter_script_chunks(missing, scripts,
+                                               max_script_size))
+        contents = await asyncio.gather(
+            *(self._fetch(''.join(scripts[index] for index in chunk))
+              for chunk in chunks))
+        for chunk, content in zip(chunks, contents):
+            for index, result in zip(chunk, reversed(self._loads(content))):
+                results[index] = bool(result)
+                if self._exists_cache is not None:
+                    self._exists_cache.set(scripts[index], results[index])
+        return results
+
+    async def get(self, metric):
+        """
+
+        Get metric from Warp10
+
+        :param metric: Hash with metric that needs to be fetched
+        :return timeserie: timeserie object
+
+        """
+        content = await self._fetch(metric)
+        return self._get_timeserie(self._loads(content))
+
+    async def get_all(self, metric):
+        """
+
+        Get all series matching metric from Warp10 in a single call.
+
+        :param metric: Hash with metric that needs to be fetched
+        :return timeserie_set: timeserie set object
+
+        """
+        content = await self._fetch(metric)
+        return self._get_timeserie_set(self._loads(content))
+
+    async def get_many(self, metrics, max_script_size=None, max_points=None):
+        """
+
+        Get many metrics from Warp10, see Warp10Client.get_many().
+
+        Chunks of the script are sent concurrently.
+
+        :param metrics: list of metric hashes that need to be fetched
+        :param max_script_size: maximum size of a script in bytes
+        :param max_points: maximum number of points expected from a call
+        :return: list of timeserie set objects, one per metric
+
+        """
+        if max_script_size is None:
+            max_script_size = self.DEFAULT_MAX_SCRIPT_SIZE
+        chunks = list(self._get_script_chunks(metrics, max_script_size,
+                                              max_points))
+        contents = await asyncio.gather(
+            *(self._fetch(''.join(scripts)) for scripts in chunks))
+        results = list()
+        for scripts, content in zip(chunks, contents):
+            results.extend(self._get_timeserie_sets(
+                self._loads(content), len(scripts)))
+        return results
+
+    async def set(self, metrics, return_metrics=True):
+        """
+
+        Send metrics to WARP10 backend, see Warp10Client.set().
+
+        :param metrics: Hash with metric or iterable of metrics Hashes
+        :param return_metrics: build the list of added metric objects
+        :return added_metrics: list of metric objects, None if
+            return_metrics is False
+
+        """
+        if isinstance(metrics, (dict, Metric)):
+            metrics = [metrics]
+        if return_metrics:
+            metrics = self._convert_metrics(metrics)
+        resp = await self._call(metrics, call_type='ingress')
+        resp.release()
+        return metrics if return_metrics else None
+
+    async def set_serie(self, name, tags, timestamps, values, latitudes=None,
+                        longitudes=None, elevations=None):
+        """
+
+        Send datapoints of a single serie given as columns, see
+        Warp10Client.set_serie().
+
+        :return: number of datapoints sent
+
+        """
+        resp = await self._call(
+            None, call_type='ingress',
+            body=self._get_serie_body(name, tags, timestamps, values,
+                                      latitudes, longitudes, elevations))
+        resp.release()
+        return len(timestamps)
+
+    async def delete(self, metrics, dry_run=False, window=None):
+        """
+
+        Delete metrics from WARP10 backend, see Warp10Client.delete().
+
+        Calls are sent concurrently, bounded by the connector limit.
+
+        :return: number of series deletions reported by Warp10
+
+        """
+        return sum(await asyncio.gather(
+            *(self._delete(metric) for metric in self._iter_delete_metrics(
+                metrics, dry_run, window))))
+
+    async def _delete(self, metric):
+        resp = await self._call(metric, call_type='delete')
+        try:
+            return self._count_deleted(await resp.read())
+        finally:
+            resp.release()
+
+    async def _fetch(self, metric):
+        script = self._gen_request_body(metric, call_type='fetch')
+        key = self._get_cache_key(script)
+        if key is not None:
+            content = self._cache.get(key)
+            if content is not None:
+                return content
+        resp = await self._call(script, call_type='fetch')
+        try:
+            content = await resp.read()
+        finally:
+            resp.release()
+        if key is not None:
+            self._cache.set(key, content)
+        return content
+
+    async def _call(self, metrics, call_type='fetch', body=None):
+        url = self._get_url(call_type=call_type)
+        headers = self._get_headers(call_type=call_type)
+
+        try:
+            if body is None:
+                body = self._gen_request_body(metrics=metrics,
+                                              call_type=call_type)
+            data = self._compress_body(body, headers, call_type=call_type)
+        except Exception as e:
+            raise CallException('Failed to prepare request.\n'
+                                'Error: %s\n'
+                                'Endpoint: %s' % (e, url))
+
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug('Calling API with parameters: \n'
+                      'url: %(url)s \n'
+                      'headers: %(headers)s \n'
+                      'data: %(data)s',
+                      {'url': url,
+                       'headers': self._remove_sensitive_data(dict(headers)),
+                       'data': self._get_log_data(data)})
+
+        retry = self._retry \
+            if self._retry and self._retry.is_retryable(call_type) else None
+        if not isinstance(data, (six.string_types, six.binary_type, dict)):
+            # NOTE: A streamed body can only be sent once.
+            data = b''.join(data) if retry else _AsyncChunks(data)
+
+        if call_type == 'delete':
+            kwargs = dict(headers=headers, params=data)
+        else:
+            kwargs = dict(headers=headers, data=data)
+        if self._client_timeout is not None:
+            kwargs['timeout'] = self._client_timeout
+
+        resp = await self._send(url, call_type, kwargs, retry)
+
+        expected_code = self.CALL_RESP_STATUS.get(call_type)
+        if resp.status != expected_code:
+            resp.release()
+            raise requests.RequestException(
+                'Warp10 API answered with not expected '
+                'HTTP status code - returned: '
+                '%(returned)s expected: %(expected)s, '
+                'reason: %(reason)s' %
+                {'expected': expected_code,
+                 'returned': resp.status,
+                 'reason': resp.reason})
+        return resp
+
+    async def _send(self, url, call_type, kwargs, retry):
+        method = self._get_method(call_type=call_type)
+
+        attempt = 0
+        while True:
+            if self._circuit_breaker:
+                self._circuit_breaker.before_call()
+            try:
+                resp = await self._get_session().request(method, url,
+                                                         **kwargs)
+            except Exception as e:
+                self._record_failure()
+                if retry and retry.can_retry(attempt):
+                    LOG.warning('Warp10 call failed, retrying: %s', e)
+                    await asyncio.sleep(retry.get_backoff(attempt))
+                    attempt += 1
+                    continue
+                raise CallException('Failed to gather data from WARP10 '
+                                    'endpoint.\n'
+                                    'Error: %s\n'
+                                    'Endpoint: %s' % (e, url))
+            if resp.status not in (retry.statuses if retry
+                                   else RETRY_STATUSES):
+                if self._circuit_breaker:
+                    self._circuit_breaker.record_success()
+                return resp
+            self._record_failure()
+            if not (retry and retry.can_retry(attempt)):
+                return resp
+            LOG.warning('Warp10 answered %s, retrying', resp.status)
+            resp.release()
+            await asyncio.sleep(retry.get_backoff(attempt))
+            attempt += 1
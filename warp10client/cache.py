@@ -0,0 +1,415 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import bisect
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from warp10client.timeserie import ColumnsBuilder
+from warp10client.timeserie import get_serie_key
+from warp10client.timeserie import TimeserieSet
+
+
+class CacheBackend(object):
+    """
+
+    Base class of fetch response caches.
+
+    Backends store bytes under string keys for ttl seconds and keep
+    hits, misses and evictions counters in stats.
+
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def get(self, key):
+        """Return the value cached under key, None if missing or expired."""
+        value = self._get(key)
+        self.stats['misses' if value is None else 'hits'] += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Cache value under key for ttl seconds, cache default if None."""
+        self._set(key, value, time.time() + (self.ttl if ttl is None
+                                             else ttl))
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value, expires):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """In process LRU cache bounded by entries count and total size."""
+
+    def __init__(self, ttl=60, max_entries=1024, max_bytes=None):
+        super(MemoryCache, self).__init__(ttl=ttl)
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                self._bytes -= len(value)
+                return None
+            self._entries[key] = entry
+            return value
+
+    def _set(self, key, value, expires):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._entries[key] = (expires, value)
+            self._bytes += len(value)
+            while len(self._entries) > 1 and (
+                    len(self._entries) > self._max_entries or (
+                        self._max_bytes and self._bytes > self._max_bytes)):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class DiskCache(CacheBackend):
+    """
+
+    Cache storing each entry in a file of a local directory.
+
+    Files are touched when read and the least recently used ones are
+    removed once more than max_entries are stored.
+
+    """
+
+    SUFFIX = '.cache'
+
+    def __init__(self, directory, ttl=60, max_entries=1024):
+        super(DiskCache, self).__init__(ttl=ttl)
+        self._directory = directory
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self._directory, hashlib.sha256(
+            key.encode('utf-8')).hexdigest() + self.SUFFIX)
+
+    def _files(self):
+        return [os.path.join(self._directory, name)
+                for name in os.listdir(self._directory)
+                if name.endswith(self.SUFFIX)]
+
+    def __len__(self):
+        return len(self._files())
+
+    def _get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                expires = float(cache_file.readline())
+                if expires < time.time():
+                    value = None
+                else:
+                    value = cache_file.read()
+        except (IOError, OSError, ValueError):
+            return None
+        if value is None:
+            self._remove(path)
+        else:
+            os.utime(path, None)
+        return value
+
+    def _set(self, key, value, expires):
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as cache_file:
+            cache_file.write(('%r\n' % expires).encode('ascii'))
+            cache_file.write(value)
+        # NOTE: Readers never see a partially written entry.
+        os.rename(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            files = self._files()
+            if len(files) <= self._max_entries:
+                return
+            files.sort(key=self._mtime)
+            for path in files[:len(files) - self._max_entries]:
+                self._remove(path)
+                self.stats['evictions'] += 1
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for path in self._files():
+            self._remove(path)
+
+
+class ExistsCache(object):
+    """
+
+    Cache of exists() results.
+
+    Series usually keep existing, positive results are kept for
+    positive_ttl seconds while negative ones, which are wrong as soon as
+    the serie is written, are kept for negative_ttl seconds.
+
+    """
+
+    def __init__(self, positive_ttl=300, negative_ttl=30, max_entries=65536,
+                 backend=None):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.backend = backend or MemoryCache(max_entries=max_entries)
+
+    @property
+    def stats(self):
+        return self.backend.stats
+
+    def get(self, key):
+        """Return the cached result, None if unknown."""
+        value = self.backend.get(key)
+        return None if value is None else value == b'1'
+
+    def set(self, key, exists):
+        self.backend.set(key, b'1' if exists else b'0',
+                         ttl=self.positive_ttl if exists
+                         else self.negative_ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+
+class _CachedSerie(object):
+
+    def __init__(self, name, tags):
+        self.name = name
+        self.tags = tags
+        self.timestamps = list()
+        self.points = list()
+
+    def replace(self, start, end, timestamps, points):
+        """Replace datapoints within [start, end] by the given ones."""
+        left = bisect.bisect_left(self.timestamps, start)
+        right = bisect.bisect_right(self.timestamps, end)
+        self.timestamps[left:right] = timestamps
+        self.points[left:right] = points
+
+    def trim(self, start):
+        index = bisect.bisect_left(self.timestamps, start)
+        del self.timestamps[:index]
+        del self.points[:index]
+
+    def build(self, start, end):
+        builder = ColumnsBuilder()
+        left = bisect.bisect_left(self.timestamps, start)
+        right = bisect.bisect_right(self.timestamps, end)
+        for index in range(left, right):
+            builder.append(self.timestamps[index], *self.points[index])
+        return builder.build(name=self.name, tags=self.tags)
+
+
+class IntervalCache(object):
+    """
+
+    Cache of fetched datapoints by serie and time range.
+
+    For each query (selector and aggregation, without time range) it
+    remembers which intervals have already been fetched, so only the
+    missing ones have to be fetched from Warp10. The last lag
+    microseconds before now are never considered fetched since datapoints
+    may still be written there. Datapoints older than max_age before the
+    newest requested end are dropped, and the least recently used
+    queries are dropped once more than max_entries are cached.
+
+    """
+
+    def __init__(self, max_entries=128, lag=60 * 1000000, max_age=None):
+        self._max_entries = max_entries
+        self.lag = lag
+        self._max_age = max_age
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {
+            'requests': 0,
+            'fetched_ranges': 0,
+            'fetched_points': 0,
+            'cached_points': 0,
+        }
+
+    def _entry(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            entry = {'intervals': list(),
+                     'series': collections.OrderedDict()}
+            while len(self._entries) >= self._max_entries:
+                self._entries.popitem(last=False)
+        self._entries[key] = entry
+        return entry
+
+    def get_gaps(self, key, start, end):
+        """
+
+        Get sub-ranges of [start, end] that have not been fetched yet.
+
+        :param key: query key
+        :param start: range start in microseconds, included
+        :param end: range end in microseconds, included
+        :return: list of (start, end) tuples
+
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            gaps = list()
+            cursor = start
+            for interval_start, interval_end in self._entry(key)['intervals']:
+                if interval_end < cursor:
+                    continue
+                if interval_start > end:
+                    break
+                if interval_start > cursor:
+                    gaps.append((cursor, interval_start - 1))
+                cursor = max(cursor, interval_end + 1)
+            if cursor <= end:
+                gaps.append((cursor, end))
+            return gaps
+
+    def update(self, key, start, end, timeseries, covered_end=None):
+        """
+
+        Store datapoints fetched for [start, end].
+
+        :param key: query key
+        :param start: fetched range start in microseconds
+        :param end: fetched range end in microseconds
+        :param timeseries: fetched timeserie set
+        :param covered_end: end of the range that will not change anymore,
+            defaults to end
+
+        """
+        covered_end = end if covered_end is None else min(end, covered_end)
+        with self._lock:
+            entry = self._entry(key)
+            for timeserie in timeseries:
+                serie_key = get_serie_key(timeserie.name, timeserie.tags)
+                serie = entry['series'].get(serie_key)
+                if serie is None:
+                    serie = entry['series'][serie_key] = _CachedSerie(
+                        timeserie.name, timeserie.tags)
+                timestamps, points = self._get_points(timeserie)
+                serie.replace(start, end, timestamps, points)
+                self.stats['fetched_points'] += len(timestamps)
+            self.stats['fetched_ranges'] += 1
+            if covered_end >= start:
+                self._add_interval(entry, start, covered_end)
+            if self._max_age:
+                self._trim(entry, end - self._max_age)
+
+    @staticmethod
+    def _get_points(timeserie):
+        columns = timeserie._get_columns()
+        timestamps = columns['timestamps']
+
+        def column(values):
+            if values is None:
+                return [None] * len(timestamps)
+            return [None if value != value else value for value in values]
+
+        # NOTE: Warp10 returns datapoints newest first.
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        points = list(zip(column(columns['latitudes']),
+                          column(columns['longitudes']),
+                          column(columns['elevations']),
+                          columns['values'] or ()))
+        return ([timestamps[i] for i in order], [points[i] for i in order])
+
+    @staticmethod
+    def _add_interval(entry, start, end):
+        intervals = list()
+        for interval in sorted(entry['intervals'] + [(start, end)]):
+            if intervals and interval[0] <= intervals[-1][1] + 1:
+                intervals[-1] = (intervals[-1][0],
+                                 max(intervals[-1][1], interval[1]))
+            else:
+                intervals.append(interval)
+        entry['intervals'] = intervals
+
+    @staticmethod
+    def _trim(entry, start):
+        entry['intervals'] = [(max(interval_start, start), interval_end)
+                              for interval_start, interval_end in
+                              entry['intervals'] if interval_end >= start]
+        for serie in entry['series'].values():
+            serie.trim(start)
+
+    def get(self, key, start, end):
+        """
+
+        Get cached datapoints of [start, end].
+
+        :return: timeserie set object
+
+        """
+        with self._lock:
+            timeseries = TimeserieSet(serie.build(start, end) for serie in
+                                      self._entry(key)['series'].values())
+            self.stats['cached_points'] += sum(len(timeserie)
+                                               for timeserie in timeseries)
+            return timeseries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
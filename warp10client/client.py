@@ -1,23 +1,33 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import contextlib
 import hashlib
+import logging
 import re
+import timeit
 
-from copy import deepcopy
 from functools import wraps
 
 import daiquiri
 import requests
 import six
 
+from warp10client.common import compression
 from warp10client.common import constants
+from warp10client.common import timeutils
+from warp10client import decoder
+from warp10client import encoder
 from warp10client.metric import Metric
 from warp10client.position import Position
+from warp10client.retry import CircuitOpenException
+from warp10client.retry import RETRY_STATUSES
+from warp10client.spool import Replayer
+from warp10client.timeserie import build_from_columns
+from warp10client.timeserie import ColumnsBuilder
 from warp10client.timeserie import Timeserie
-
-# TODO(mjozefcz):
-# Consider multithread for all functions
+from warp10client.timeserie import TimeserieSet
+from warp10client.writer import BufferedWriter
 
 LOG = daiquiri.getLogger(__name__)
 
@@ -47,6 +57,30 @@ class Warp10Client(object):
         )
     )
 
+    DEFAULT_MAX_SCRIPT_SIZE = 64 * 1024
+
+    WRITE_CHUNK_SIZE = 64 * 1024
+
+    DEFAULT_PAGE_WINDOW = 24 * 3600 * 1000000
+
+    DEFAULT_PAGE_SIZE = 100000
+
+    LOG_PREVIEW_SIZE = 1024
+
+    FETCH_FORMATS = ('json', 'columns')
+
+    # NOTE: Replace every GTS of the fetched list by
+    # [ class labels ticks values latitudes longitudes elevations ],
+    # rendered as flat JSON lists. Geo lists hold NaN for datapoints
+    # without a location or an elevation, the columns.geo macro empties
+    # them when no datapoint has any.
+    COLUMNS_SCRIPT = "<% DUP false SWAP <% ISNaN ! OR %> FOREACH " \
+        "<% %> <% DROP [] %> IFTE %> 'columns.geo' STORE " \
+        '<% DROP [ SWAP DUP NAME SWAP DUP LABELS SWAP DUP TICKS SWAP ' \
+        'DUP VALUES SWAP DUP LOCATIONS $columns.geo EVAL SWAP ' \
+        '$columns.geo EVAL SWAP ROT ELEVATIONS $columns.geo EVAL ] ' \
+        '%> LMAP '
+
     CALL_RESP_STATUS = {
         'fetch': 200,
         'ingress': 200,
@@ -67,7 +101,7 @@ class Warp10Client(object):
                         'reason: %(reason)s' %
                         {'expected': expected_code,
                          'returned': out.status_code,
-                         'reason': out.reason})
+                         'reason': out.reason}, response=out)
                 else:
                     return out
             newfunc = wraps(func)(newfunc)
@@ -75,12 +109,60 @@ class Warp10Client(object):
         return decorate
 
     def __init__(self, read_token=None, write_token=None,
-                 warp10_api_url=None, tags=None):
+                 warp10_api_url=None, tags=None, compression=None,
+                 compression_level=6, compression_threshold=1024,
+                 cache=None, cache_now_bound=False, interval_cache=None,
+                 pool_connections=None, pool_maxsize=None, pool_block=False,
+                 timeout=None, retry=None, circuit_breaker=None,
+                 instrumentation=None, exists_cache=None,
+                 label_index=None, fetch_format='json', spool=None,
+                 replay_interval=5.0, read_endpoints=None,
+                 write_endpoints=None):
+        if compression not in (None, 'gzip'):
+            raise ValueError('Unsupported compression: %s' % compression)
+        if fetch_format not in self.FETCH_FORMATS:
+            raise ValueError('Unsupported fetch format: %s' % fetch_format)
+        if (read_endpoints or write_endpoints) and not warp10_api_url and \
+                not (read_endpoints and write_endpoints):
+            raise ValueError('warp10_api_url is required unless both '
+                             'read_endpoints and write_endpoints are given')
         self._session = requests.Session()
+        if pool_connections or pool_maxsize:
+            # NOTE: Connections are kept alive in the pool,
+            # size it to the number of concurrent calls.
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_connections or 10,
+                pool_maxsize=pool_maxsize or 10,
+                pool_block=pool_block)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        self._timeout = timeout
+        self._retry = retry
+        self._circuit_breaker = circuit_breaker
+        self._instrumentation = instrumentation
+        self._exists_cache = exists_cache
+        self._label_index = label_index
         self._read_token = read_token
         self._write_token = write_token
         self._warp10_api_url = warp10_api_url
+        # NOTE: Pools of nodes replace warp10_api_url and the
+        # shared session, fetches go to read endpoints, ingress and
+        # deletes to write endpoints.
+        self._read_endpoints = read_endpoints
+        self._write_endpoints = write_endpoints
         self._tags = tags
+        self._compression = compression
+        self._compression_level = compression_level
+        self._compression_threshold = compression_threshold
+        self._cache = cache
+        self._cache_now_bound = cache_now_bound
+        self._interval_cache = interval_cache
+        self._fetch_format = fetch_format
+        self._spool = spool
+        # NOTE: Lines left in the spool by a previous process
+        # are replayed too.
+        self._replayer = Replayer(self, spool, interval=replay_interval) \
+            if spool is not None else None
 
     def _get_token(self, call_type='fetch'):
         if call_type in ('delete', 'ingress'):
@@ -92,10 +174,24 @@ class Warp10Client(object):
         headers = dict()
         headers[constants.WARP_TOKEN_HEADER_NAME] = \
             self._get_token(call_type=call_type)
+        # NOTE: requests already asks for gzip or deflate
+        # responses and decodes them, Accept-Encoding is left to it.
         if call_type == 'ingress':
             headers['Content-Type'] = 'text/plain'
         return headers
 
+    def _compress_body(self, data, headers, call_type='fetch'):
+        if not self._compression or call_type != 'ingress':
+            return data
+        data, compressed = compression.gzip_body(
+            data, level=self._compression_level,
+            threshold=self._compression_threshold)
+        if compressed:
+            # NOTE: Warp10 expects gzipped GTS input to be
+            # flagged by its content type.
+            headers['Content-Type'] = 'application/gzip'
+        return data
+
     @staticmethod
     def _get_method(call_type='fetch'):
         if call_type in ('fetch', 'ingress'):
@@ -103,14 +199,23 @@ class Warp10Client(object):
         else:
             return 'GET'
 
-    def _get_url(self, call_type='fetch'):
+    @staticmethod
+    def _get_api_endpoint(call_type='fetch'):
         if call_type == 'fetch':
-            api_endpoint = 'exec'
+            return 'exec'
         elif call_type == 'ingress':
-            api_endpoint = 'update'
+            return 'update'
         else:
-            api_endpoint = 'delete'
-        return "%s/%s" % (self._warp10_api_url, api_endpoint)
+            return 'delete'
+
+    def _get_url(self, call_type='fetch', base_url=None):
+        return "%s/%s" % (base_url or self._warp10_api_url,
+                          self._get_api_endpoint(call_type=call_type))
+
+    def _get_endpoints(self, call_type='fetch'):
+        if call_type == 'fetch':
+            return self._read_endpoints
+        return self._write_endpoints
 
     @staticmethod
     def _get_aggregation_method(method):
@@ -140,77 +245,644 @@ class Warp10Client(object):
                                     data=data)
         return result
 
+    def find(self, metric):
+        """
+
+        Find series matching metric, without their datapoints.
+
+        Series found are added to the label index, if any, and indexed
+        series matching metric that were not found are removed from it.
+
+        :param metric: Hash with name (class, '~' prefix for a regular
+            expression) and tags
+        :return: list of hashes with name and tags, one per serie
+
+        """
+        # NOTE: Series show up and go away, the response cache
+        # would keep an outdated list.
+        content = self._call(self._gen_find_script(metric),
+                             call_type='fetch').content
+        return self._get_found_series(metric, self._loads(content))
+
+    def _get_found_series(self, metric, stack):
+        series = [{'name': gts.get('c'), 'tags': gts.get('l') or {}}
+                  for gts in (stack[0] if stack else ())
+                  if isinstance(gts, dict)]
+        if self._label_index is not None:
+            self._label_index.replace(metric, series)
+        return series
+
+    def _gen_find_script(self, metric):
+        return "[ '{}' '{}' {} ] FIND ".format(
+            self._get_token(),
+            metric.get('name') or '~.*',
+            self._get_warp10_script_tags(metric) or '{}')
+
+    def refresh_index(self, metric=None):
+        """
+
+        Refresh the label index with series matching metric, all series
+        if None.
+
+        :param metric: Hash with name and tags selectors
+        :return: number of series found
+
+        """
+        if self._label_index is None:
+            raise ValueError('Client has no label index')
+        return len(self.find(metric or {'name': '~.*'}))
+
+    def resolve(self, metric):
+        """
+
+        Resolve metric selectors into exact selectors, one per serie.
+
+        Series are looked up in the label index when the client has one,
+        found with find() otherwise. Exact selectors keep the other keys
+        of metric (time range, aggregation) and can be fetched with
+        get_many().
+
+        :param metric: Hash with metric selectors
+        :return: list of metric hashes
+
+        """
+        if self._label_index is not None:
+            series = self._label_index.find(metric)
+        else:
+            series = self.find(metric)
+        return self._get_exact_metrics(metric, series)
+
+    def _get_exact_metrics(self, metric, series):
+        return [dict(metric, name=self._get_exact_selector(serie['name']),
+                     tags=dict((label, self._get_exact_selector(value))
+                               for label, value in
+                               six.iteritems(serie['tags'])))
+                for serie in series]
+
+    @staticmethod
+    def _get_exact_selector(value):
+        # NOTE: Values starting like regular expression or
+        # exact selectors have to be flagged as exact.
+        if value.startswith(('~', '=')):
+            return '=' + value
+        return value
+
     def exists(self, metric):
         """
 
         Check if metric exists in Warp10 backend.
 
+        A serie matching the metric exists when it holds at least one
+        datapoint in the metric time range. Series are not downloaded,
+        Warp10 only answers with a boolean.
+
         :param metric: Hash with metric that needs to be checked
         :return: bolean
 
         """
-        return len(self.get(metric).metrics) > 0
+        return self.exists_many([metric])[0]
+
+    def exists_many(self, metrics, max_script_size=None):
+        """
+
+        Check if many metrics exist in Warp10 backend, see exists().
+
+        Checks are compiled into as few scripts as max_script_size allows,
+        results already in the exists cache are not checked again.
+
+        :param metrics: list of metric hashes that need to be checked
+        :param max_script_size: maximum size of a script in bytes
+        :return: list of booleans, one per metric
+
+        """
+        if max_script_size is None:
+            max_script_size = self.DEFAULT_MAX_SCRIPT_SIZE
+        scripts = [self._gen_exists_script(metric) for metric in metrics]
+        results = [self._exists_cache.get(script)
+                   if self._exists_cache is not None else None
+                   for script in scripts]
+        missing = [index for index, result in enumerate(results)
+                   if result is None]
+        for chunk in self._iter_script_chunks(missing, scripts,
+                                              max_script_size):
+            stack = self._loads(self._fetch(''.join(
+                scripts[index] for index in chunk)))
+            # NOTE: Top of the stack holds the last result.
+            for index, result in zip(chunk, reversed(stack)):
+                results[index] = bool(result)
+                if self._exists_cache is not None:
+                    self._exists_cache.set(scripts[index], results[index])
+        return results
+
+    @staticmethod
+    def _iter_script_chunks(indexes, scripts, max_script_size):
+        chunk = list()
+        size = 0
+        for index in indexes:
+            if chunk and size + len(scripts[index]) > max_script_size:
+                yield chunk
+                chunk = list()
+                size = 0
+            chunk.append(index)
+            size += len(scripts[index])
+        if chunk:
+            yield chunk
+
+    def _gen_exists_script(self, metric):
+        # NOTE: Only the last datapoint before end of each
+        # serie is fetched, with a start it has to be in the window.
+        # Warp10 only sends back the resulting boolean.
+        t_h = metric.get('timestamp') or {}
+        script = self._gen_warp10_script(dict(
+            metric, aggregate=None, pipeline=None, format='json',
+            timestamp={'end': t_h.get('end'), 'count': 1}))
+        if not t_h.get('start'):
+            return '{}0 SWAP <% SIZE + %> FOREACH 0 > '.format(script)
+        return "{}false SWAP <% LASTTICK '{}' TOTIMESTAMP >= || %> " \
+            'FOREACH '.format(script, t_h.get('start'))
 
     def get(self, metric):
         """
 
         Get metric from Warp10
 
+        Only the first serie matching the selector is returned, use
+        get_all() to get all of them.
+
         :param metric: Hash with metric that needs to be fetched
         :return timeserie: timeserie object
 
         """
-        resp = self._call(metric, call_type='fetch')
-        metric_list = list()
-        if eval(resp.content)[0]:
-            values = eval(resp.content)[0][0].get('v')
-            name = eval(resp.content)[0][0].get('c')
-            tags = eval(resp.content)[0][0].get('l')
-            timestamps = [v[0] for v in values]
-            start = min(timestamps)
-            stop = max(timestamps)
-            for value in values:
-                metric_list.append(
-                    Metric(name=name,
-                           value=value[1],
-                           tags=tags,
-                           position=Position(timestamp=value[0])))
-            timeserie = Timeserie(start=start, stop=stop,
-                                  metrics=metric_list)
-            return timeserie
-        else:
+        if self._use_interval_cache(metric):
+            for timeserie in self._get_cached_set(metric):
+                return timeserie
             return Timeserie()
+        return self._get_timeserie(self._loads(self._fetch(metric)))
 
-    def set(self, metrics):
+    def get_all(self, metric):
         """
 
-        Send metrics to WARP10 backend.
+        Get all series matching metric from Warp10 in a single call.
 
-        :param metrics: Hash with metric or list of metrics Hashes
-        :return added_metrics: list of metric objects
+        :param metric: Hash with metric that needs to be fetched
+        :return timeserie_set: timeserie set object keyed by class and
+            labels
+
+        """
+        if self._use_interval_cache(metric):
+            return self._get_cached_set(metric)
+        return self._get_timeserie_set(self._loads(self._fetch(metric)))
+
+    def _use_interval_cache(self, metric):
+        # NOTE: Results of a processing pipeline (reduce,
+        # downsampling) can't be merged range by range.
+        return (self._interval_cache is not None and
+                isinstance(metric, dict) and
+                not metric.get('pipeline') and
+                bool((metric.get('timestamp') or {}).get('start')))
+
+    def _get_cached_set(self, metric):
+        # NOTE: Only the sub-ranges missing from the interval
+        # cache are fetched, each with its own FETCH bounds.
+        now = timeutils.now()
+        start, end, span = self._get_range(metric, now)
+        covered_end = now - self._interval_cache.lag
+        if span:
+            covered_end = covered_end // span * span
+        key = hashlib.sha256(self._gen_warp10_script(
+            dict(metric, timestamp=None)).encode('utf-8')).hexdigest()
+        gaps = self._interval_cache.get_gaps(key, start, end)
+        for gap_start, gap_end in gaps:
+            self._interval_cache.update(
+                key, gap_start, gap_end,
+                self._get_page(self._get_range_metric(metric, gap_start,
+                                                      gap_end, span)),
+                covered_end=covered_end)
+        return self._interval_cache.get(key, start, end)
+
+    @staticmethod
+    def _get_range(metric, now=None):
+        # NOTE: Aggregated ranges are aligned on buckets, a
+        # bucket ending at b holds datapoints of ]b - span, b], so they
+        # never get split across sub-ranges.
+        t_h = metric.get('timestamp')
+        start = timeutils.parse_iso8601(t_h.get('start'))
+        end = timeutils.parse_iso8601(t_h.get('end')) \
+            if t_h.get('end') else (now or timeutils.now())
+        aggregate = metric.get('aggregate') or {}
+        span = int(aggregate.get('span') or 1000000) if aggregate else None
+        if span:
+            start = (start - 1) // span * span + 1
+            end = -(-end // span) * span
+        return start, end, span
+
+    @staticmethod
+    def _get_range_metric(metric, start, end, span=None):
+        range_metric = dict(metric, timestamp={
+            'start': timeutils.format_iso8601(start),
+            'end': timeutils.format_iso8601(end)})
+        if span:
+            range_metric['aggregate'] = dict(metric.get('aggregate'),
+                                             lastbucket=end)
+        return range_metric
+
+    def _get_page(self, metric):
+        return self._get_timeserie_set(self._loads(self._fetch(metric)))
+
+    def get_pages(self, metric, window=None, page_size=None):
+        """
+
+        Get all series matching metric from Warp10 page by page.
+
+        Only one page is held in memory at a time, however long the time
+        range is. When the metric has a start, the time range is split in
+        windows of window microseconds (aligned on aggregation buckets),
+        fetched oldest first. Otherwise, or when page_size is given, pages
+        hold at most page_size datapoints per serie, fetched with FETCH
+        count limits newest first.
 
+        :param metric: Hash with metric that needs to be fetched
+        :param window: window length in microseconds
+        :param page_size: maximum number of datapoints per serie and page
+        :return: generator of timeserie set objects, one per page
+
+        """
+        if page_size or not (metric.get('timestamp') or {}).get('start'):
+            return self._iter_count_pages(metric,
+                                          page_size or self.DEFAULT_PAGE_SIZE)
+        return six.moves.map(self._get_page, self._iter_page_metrics(
+            metric, window or self.DEFAULT_PAGE_WINDOW))
+
+    def _iter_page_metrics(self, metric, window):
+        start, end, span = self._get_range(metric)
+        if span:
+            window = max(window // span, 1) * span
+        while start <= end:
+            page_end = min(start + window - 1, end)
+            yield self._get_range_metric(metric, start, page_end, span)
+            start = page_end + 1
+
+    def _iter_count_pages(self, metric, page_size):
+        if metric.get('aggregate') or metric.get('pipeline'):
+            raise ValueError('Paging by count requires raw datapoints')
+        t_h = metric.get('timestamp') or {}
+        end = timeutils.parse_iso8601(t_h.get('end')) \
+            if t_h.get('end') else timeutils.now()
+        # NOTE: Each serie is paged independently, a page ends
+        # before the newest of the oldest datapoints of full series so
+        # datapoints of some series are fetched again and filtered out.
+        # The value is the timestamp before which datapoints of the serie
+        # have not been returned yet, None once it is exhausted.
+        floors = dict()
+        while end is not None:
+            page = self._get_page(dict(metric, timestamp={
+                'end': timeutils.format_iso8601(end), 'count': page_size}))
+            timeseries = TimeserieSet()
+            end = None
+            for key, timeserie in page.items():
+                if key in floors:
+                    if floors[key] is None:
+                        continue
+                    timeserie = self._get_older_points(timeserie,
+                                                       floors[key])
+                if len(timeserie):
+                    timeseries.add(timeserie)
+                if len(page[key]) < page_size:
+                    floors[key] = None
+                    continue
+                floors[key] = oldest = min(page[key].timestamps)
+                end = oldest - 1 if end is None else max(end, oldest - 1)
+            if len(timeseries):
+                yield timeseries
+
+    @staticmethod
+    def _get_older_points(timeserie, before):
+        def column(values, index):
+            if values is None:
+                return None
+            value = values[index]
+            return None if value != value else value
+
+        builder = ColumnsBuilder()
+        for index, timestamp in enumerate(timeserie.timestamps):
+            if timestamp < before:
+                builder.append(timestamp, column(timeserie.latitudes, index),
+                               column(timeserie.longitudes, index),
+                               column(timeserie.elevations, index),
+                               timeserie.values[index])
+        return builder.build(name=timeserie.name, tags=timeserie.tags)
+
+    def get_many(self, metrics, max_script_size=None, max_points=None):
         """
-        metrics = [metrics] if type(metrics) == dict else metrics
-        added_metrics = list()
-        self._call(metrics, call_type='ingress')
+
+        Get many metrics from Warp10 with as few calls as possible.
+
+        Selectors are compiled into a single WarpScript, one FETCH each,
+        and the series are read back from the stack. The script is split
+        in several calls when it grows over max_script_size bytes or when
+        the expected number of points goes over max_points. The expected
+        number of points is taken from the 'expected_points' key of the
+        metric or computed from its time range and aggregation span.
+        Metrics without an estimate only count for the script size.
+
+        :param metrics: list of metric hashes that need to be fetched
+        :param max_script_size: maximum size of a script in bytes
+        :param max_points: maximum number of points expected from a call
+        :return: list of timeserie set objects, one per metric
+
+        """
+        if max_script_size is None:
+            max_script_size = self.DEFAULT_MAX_SCRIPT_SIZE
+        results = list()
+        for scripts in self._get_script_chunks(metrics, max_script_size,
+                                               max_points):
+            results.extend(self._get_timeserie_sets(
+                self._loads(self._fetch(''.join(scripts))), len(scripts)))
+        return results
+
+    def _fetch(self, metric):
+        script = self._gen_request_body(metric, call_type='fetch')
+        key = self._get_cache_key(script)
+        if key is not None:
+            content = self._cache.get(key)
+            if content is not None:
+                return content
+        content = self._call(script, call_type='fetch').content
+        if key is not None:
+            self._cache.set(key, content)
+        return content
+
+    def _get_cache_key(self, script):
+        if self._cache is None:
+            return None
+        # NOTE: Results of windows relative to NOW change
+        # over time, quoted strings (names, labels) are ignored.
+        if not self._cache_now_bound and \
+                'NOW' in re.sub("'[^']*'", '', script):
+            return None
+        return hashlib.sha256(script.encode('utf-8')).hexdigest()
+
+    def _get_timeserie_sets(self, stack, size):
+        # NOTE: Top of the stack holds the result of the last
+        # FETCH.
+        return [self._get_timeserie_set(stack, level=level)
+                for level in six.moves.range(size - 1, -1, -1)]
+
+    def _get_script_chunks(self, metrics, max_script_size, max_points):
+        chunk = list()
+        size = points = 0
         for metric in metrics:
-            added_metrics.append(
-                Metric(name=metric.get('name'),
-                       value=metric.get('value'),
-                       tags=metric.get('tags'),
-                       position=Position(**metric.get('position'))))
-        return added_metrics
-
-    def delete(self, metrics):
+            script = self._gen_warp10_script(metric)
+            expected = self._get_expected_points(metric) or 0
+            if chunk and (size + len(script) > max_script_size or
+                          (max_points and points + expected > max_points)):
+                yield chunk
+                chunk = list()
+                size = points = 0
+            chunk.append(script)
+            size += len(script)
+            points += expected
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _get_expected_points(metric):
+        if metric.get('expected_points'):
+            return int(metric.get('expected_points'))
+        aggregate = metric.get('aggregate') or {}
+        t_h = metric.get('timestamp') or {}
+        if not aggregate or not t_h.get('start'):
+            return None
+        start = timeutils.parse_iso8601(t_h.get('start'))
+        end = timeutils.parse_iso8601(t_h.get('end')) \
+            if t_h.get('end') else timeutils.now()
+        span = int(aggregate.get('span') or 1000000)
+        return max(end - start, 0) // span + 1
+
+    def stream(self, metric, chunk_size=65536):
+        """
+
+        Get metric from Warp10 without loading the whole response.
+
+        The response body is decoded while it is downloaded and every
+        datapoint is yielded as soon as it has been read.
+
+        :param metric: Hash with metric that needs to be fetched
+        :param chunk_size: size of chunks read from the response
+        :return: generator of metric objects
+
+        """
+        # NOTE: Datapoints are decoded from GTS as rendered by
+        # Warp10, columns can't be streamed.
+        if isinstance(metric, dict):
+            metric = dict(metric, format='json')
+        resp = self._call(metric, call_type='fetch', stream=True)
+        try:
+            for _level, gts, value in decoder.iter_values(
+                    resp.iter_content(chunk_size=chunk_size),
+                    chunk_size=chunk_size):
+                yield self._get_metric(gts.get('c'), gts.get('l'), value)
+        finally:
+            resp.close()
+
+    @staticmethod
+    def _get_metric(name, tags, value):
+        timestamp, latitude, longitude, elevation, value = \
+            decoder.split_value(value)
+        return Metric(name=name,
+                      value=value,
+                      tags=tags,
+                      position=Position(timestamp=timestamp,
+                                        latitude=latitude,
+                                        longitude=longitude,
+                                        elevation=elevation))
+
+    def _get_timeserie(self, stack):
+        if not stack or not stack[0]:
+            return Timeserie()
+        with self._measure('build'):
+            timeserie = self._build_timeserie(stack[0][0])
+        if self._instrumentation is not None:
+            self._instrumentation.on_points('fetch', len(timeserie))
+        return timeserie
+
+    def _get_timeserie_set(self, stack, level=0):
+        if not stack or not stack[level]:
+            return TimeserieSet()
+        with self._measure('build'):
+            timeseries = TimeserieSet(self._build_timeserie(gts)
+                                      for gts in stack[level]
+                                      if isinstance(gts, (dict, list)))
+        if self._instrumentation is not None:
+            self._instrumentation.on_points(
+                'fetch', sum(len(timeserie) for timeserie in timeseries))
+        return timeseries
+
+    @staticmethod
+    def _build_timeserie(gts):
+        if isinstance(gts, list):
+            return build_from_columns(*gts)
+        builder = ColumnsBuilder()
+        append = builder.append
+        for value in gts.get('v') or ():
+            if len(value) == 2:
+                append(value[0], None, None, None, value[1])
+            else:
+                append(*decoder.split_value(value))
+        return builder.build(name=gts.get('c'), tags=gts.get('l'))
+
+    def set(self, metrics, return_metrics=True):
+        """
+
+        Send metrics to WARP10 backend.
+
+        The request body is streamed with chunked transfer encoding while
+        metrics are read, so metrics may come from a generator. With a
+        spool, the body is kept in memory and spooled if Warp10 can't be
+        reached.
+
+        :param metrics: Hash with metric or iterable of metrics Hashes
+        :param return_metrics: build the list of added metric objects,
+            needs to keep all of them in memory
+        :return added_metrics: list of metric objects, None if
+            return_metrics is False
+
+        """
+        if isinstance(metrics, (dict, Metric)):
+            metrics = [metrics]
+        if return_metrics:
+            metrics = self._convert_metrics(metrics)
+        self._ingest(metrics)
+        return metrics if return_metrics else None
+
+    def set_serie(self, name, tags, timestamps, values, latitudes=None,
+                  longitudes=None, elevations=None):
+        """
+
+        Send datapoints of a single serie given as columns.
+
+        Class and labels are encoded once and datapoints are sent as
+        continuation lines, which is much cheaper than set() for long
+        series.
+
+        :param name: class name of the serie
+        :param tags: labels hash of the serie
+        :param timestamps: sequence of timestamps in microseconds
+        :param values: sequence of values
+        :param latitudes: optional sequence of latitudes
+        :param longitudes: optional sequence of longitudes
+        :param elevations: optional sequence of elevations
+        :return: number of datapoints sent
+
+        """
+        self._ingest(None, body=self._get_serie_body(
+            name, tags, timestamps, values, latitudes, longitudes,
+            elevations))
+        return len(timestamps)
+
+    def _ingest(self, metrics, body=None):
+        # NOTE: Returns False when the body has been spooled
+        # instead of being sent.
+        if self._spool is None:
+            self._call(metrics, call_type='ingress', body=body)
+            return True
+        if body is None:
+            body = self._gen_request_body(metrics, call_type='ingress')
+        if not isinstance(body, (six.string_types, six.binary_type)):
+            body = b''.join(body)
+        try:
+            self._call(None, call_type='ingress', body=body)
+        except Exception as e:
+            if not self._is_spoolable(e):
+                raise
+            LOG.warning('Failed to send %d bytes to Warp10, spooling them: '
+                        '%s', len(body), e)
+            self._spool.append(body)
+            return False
+        if self._spool.pending_bytes:
+            self._replayer.wake()
+        return True
+
+    @staticmethod
+    def _is_spoolable(error):
+        # NOTE: Warp10 is unreachable or overloaded, bodies it
+        # rejected would be rejected again.
+        if isinstance(error, (CallException, CircuitOpenException)):
+            return True
+        response = getattr(error, 'response', None)
+        return response is None or response.status_code in \
+            RETRY_STATUSES or response.status_code >= 500
+
+    def _get_serie_body(self, name, tags, timestamps, values, latitudes,
+                        longitudes, elevations):
+        gts_encoder = encoder.GTSEncoder(name, tags)
+        if self._label_index is not None:
+            self._label_index.add(name, tags)
+        return self._iter_body_chunks(gts_encoder.encode(
+            timestamps, values, latitudes=latitudes, longitudes=longitudes,
+            elevations=elevations))
+
+    def writer(self, **kwargs):
+        """
+
+        Get a buffered writer sending metrics in batches.
+
+        :param kwargs: options of warp10client.writer.BufferedWriter
+        :return: buffered writer object, close it once done
+
+        """
+        return BufferedWriter(self, **kwargs)
+
+    def delete(self, metrics, dry_run=False, window=None):
         """
 
         Delete metrics from WARP10 backend.
 
+        Each hash selects series by name (class, '~' prefix for a regular
+        expression) and tags, and a time range given by its timestamp
+        start and end. All datapoints of the series are deleted when there
+        is no time range. Each hash is deleted in its own call, and ranges
+        with a start are split in windows of window microseconds so huge
+        purges are spread over bounded calls.
+
         :param metrics: Hash with metric or list of metrics Hashes
-        :return bolean
+        :param dry_run: only count series that would be deleted, time
+            ranges are not split then
+        :param window: window length in microseconds, ranges are not
+            split if None
+        :return: number of series deletions reported by Warp10, a serie
+            is counted once per window
 
         """
-        raise NotImplementedError
+        return sum(six.moves.map(self._delete, self._iter_delete_metrics(
+            metrics, dry_run, window)))
+
+    def _iter_delete_metrics(self, metrics, dry_run, window):
+        if isinstance(metrics, (dict, Metric)):
+            metrics = [metrics]
+        for metric in metrics:
+            if isinstance(metric, Metric):
+                metric = {'name': metric.name, 'tags': metric._tags}
+            if dry_run:
+                yield dict(metric, dry_run=True)
+            elif window and (metric.get('timestamp') or {}).get('start'):
+                for window_metric in self._iter_page_metrics(
+                        dict(metric, aggregate=None), window):
+                    yield window_metric
+            else:
+                yield metric
+
+    def _delete(self, metric):
+        resp = self._call(metric, call_type='delete')
+        return self._count_deleted(resp.content)
+
+    @staticmethod
+    def _count_deleted(content):
+        # NOTE: Warp10 answers with the selectors of deleted
+        # series, one per line.
+        if isinstance(content, six.binary_type):
+            content = content.decode('utf-8')
+        return sum(1 for line in content.splitlines() if line.strip())
 
     @staticmethod
     def _remove_sensitive_data(data):
@@ -221,14 +893,49 @@ class Warp10Client(object):
                     'utf-8')).hexdigest())
         return data
 
+    def _get_log_data(self, data):
+        # NOTE: Only a bounded preview of the body is logged,
+        # bodies can be several MB.
+        if isinstance(data, six.binary_type):
+            preview = data[:self.LOG_PREVIEW_SIZE]
+            try:
+                preview = preview.decode('utf-8')
+            except UnicodeDecodeError as e:
+                # NOTE: A character may be cut by the preview.
+                if e.start < len(preview) - 3:
+                    return '<binary body>'
+                preview = preview[:e.start].decode('utf-8')
+        elif isinstance(data, six.string_types):
+            preview = data[:self.LOG_PREVIEW_SIZE]
+        elif isinstance(data, dict):
+            return str(data)
+        else:
+            # NOTE: Streamed bodies can only be read once.
+            return '<streamed body>'
+        for token in (self._read_token, self._write_token):
+            if token:
+                preview = preview.replace(token, '<token>')
+        if len(data) > self.LOG_PREVIEW_SIZE:
+            preview = '%s... (%d bytes)' % (preview, len(data))
+        return preview
+
     @check_resp_status()
-    def _call(self, metrics, call_type='fetch'):
+    def _call(self, metrics, call_type='fetch', stream=False, body=None):
         url = self._get_url(call_type=call_type)
         headers = self._get_headers(call_type=call_type)
 
+        counts = {'points': 0, 'bytes': 0}
         try:
-            data = self._gen_request_body(metrics=metrics,
-                                          call_type=call_type)
+            with self._measure('generate', call_type=call_type):
+                if body is None:
+                    body = self._gen_request_body(metrics=metrics,
+                                                  call_type=call_type)
+                if self._instrumentation is not None:
+                    body = self._count(body, counts, 'points')
+                data = self._compress_body(body, headers,
+                                           call_type=call_type)
+                if self._instrumentation is not None:
+                    data = self._count(data, counts, 'bytes')
         except Exception as e:
             raise CallException('Failed to prepare request.\n'
                                 'Error: %s\n'
@@ -236,36 +943,149 @@ class Warp10Client(object):
                                 'Headers: %s'
                                 % (e, url,
                                     self._remove_sensitive_data(
-                                        deepcopy(headers))))
+                                        dict(headers))))
+
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug('Calling API with parameters: \n'
+                      'url: %(url)s \n'
+                      'headers: %(headers)s \n'
+                      'data: %(data)s',
+                      {'url': url,
+                       'headers': self._remove_sensitive_data(dict(headers)),
+                       'data': self._get_log_data(data)})
+
+        retry = self._retry \
+            if self._retry and self._retry.is_retryable(call_type) else None
+        if retry and call_type == 'ingress' and \
+                not isinstance(data, (six.string_types, six.binary_type)):
+            # NOTE: A streamed body can only be sent once.
+            data = b''.join(data)
 
-        LOG.debug('Calling API with parameters: \n'
-                  'url: %(url)s \n'
-                  'headers: %(headers)s \n'
-                  'data: %(data)s',
-                  {'url': url,
-                   'headers': self._remove_sensitive_data(deepcopy(headers)),
-                   'data': self._remove_sensitive_data(deepcopy(data))})
+        if call_type == 'delete':
+            kwargs = dict(headers=headers, params=data)
+        else:
+            kwargs = dict(headers=headers, data=data)
+        if stream:
+            kwargs['stream'] = True
+        if self._timeout is not None:
+            kwargs['timeout'] = self._timeout
+        if self._instrumentation is None:
+            return self._send(url, call_type, kwargs, retry)
 
         try:
-            return getattr(self._session,
-                           self._get_method(call_type=call_type).lower())(
-                url,
-                headers=headers,
-                data=data)
+            with self._measure('network', call_type=call_type):
+                resp = self._send(url, call_type, kwargs, retry)
         except Exception as e:
-            raise CallException('Failed to gather data from WARP10 '
-                                'endpoint.\n'
-                                'Error: %s\n'
-                                'Endpoint: %s\n'
-                                'Headers: %s\n'
-                                'Data: %s'
-                                % (e, url,
-                                    self._remove_sensitive_data(
-                                        deepcopy(headers)),
-                                    self._remove_sensitive_data(
-                                        deepcopy(data))))
+            self._instrumentation.on_error(call_type, e)
+            raise
+        if resp.status_code != self.CALL_RESP_STATUS.get(call_type):
+            self._instrumentation.on_error(call_type, resp.status_code)
+        self._instrumentation.on_call(
+            call_type, counts['bytes'],
+            None if stream else len(resp.content))
+        if call_type == 'ingress':
+            self._instrumentation.on_points(call_type, counts['points'])
+        return resp
+
+    def _send(self, url, call_type, kwargs, retry):
+        method = self._get_method(call_type=call_type).lower()
+        endpoints = self._get_endpoints(call_type=call_type)
+
+        attempt = 0
+        while True:
+            if self._circuit_breaker:
+                self._circuit_breaker.before_call()
+            if endpoints is None:
+                session = self._session
+            else:
+                # NOTE: Retries may go to another node.
+                endpoint = endpoints.acquire()
+                session = endpoint.session
+                url = self._get_url(call_type=call_type,
+                                    base_url=endpoint.url)
+                start = timeit.default_timer()
+            try:
+                resp = getattr(session, method)(url, **kwargs)
+            except Exception as e:
+                if endpoints is not None:
+                    endpoints.release(endpoint,
+                                      timeit.default_timer() - start)
+                self._record_failure()
+                if retry and retry.can_retry(attempt):
+                    LOG.warning('Warp10 call failed, retrying: %s', e)
+                    retry.sleep(attempt)
+                    attempt += 1
+                    continue
+                raise CallException('Failed to gather data from WARP10 '
+                                    'endpoint.\n'
+                                    'Error: %s\n'
+                                    'Endpoint: %s\n'
+                                    'Headers: %s\n'
+                                    'Data: %s'
+                                    % (e, url,
+                                        self._remove_sensitive_data(
+                                            dict(kwargs['headers'])),
+                                        self._get_log_data(
+                                            kwargs.get('data'))))
+            if endpoints is not None:
+                endpoints.release(endpoint, timeit.default_timer() - start,
+                                  resp.status_code)
+            if resp.status_code not in (retry.statuses if retry
+                                        else RETRY_STATUSES):
+                if self._circuit_breaker:
+                    self._circuit_breaker.record_success()
+                return resp
+            self._record_failure()
+            if not (retry and retry.can_retry(attempt)):
+                return resp
+            LOG.warning('Warp10 answered %s, retrying', resp.status_code)
+            resp.close()
+            retry.sleep(attempt)
+            attempt += 1
+
+    @contextlib.contextmanager
+    def _measure(self, phase, call_type='fetch'):
+        if self._instrumentation is None:
+            yield
+            return
+        start = timeit.default_timer()
+        try:
+            yield
+        finally:
+            self._instrumentation.on_phase(call_type, phase,
+                                           timeit.default_timer() - start)
+
+    @staticmethod
+    def _count(data, counts, key):
+        # NOTE: Datapoints are counted as lines of the body.
+        def size(chunk):
+            return chunk.count(b'\n' if isinstance(chunk, six.binary_type)
+                               else '\n') if key == 'points' else len(chunk)
+
+        if isinstance(data, dict):
+            return data
+        if isinstance(data, (six.string_types, six.binary_type)):
+            counts[key] += size(data)
+            return data
+
+        def chunks():
+            for chunk in data:
+                counts[key] += size(chunk)
+                yield chunk
+        return chunks()
+
+    def _loads(self, content):
+        with self._measure('decode'):
+            return decoder.loads(content)
+
+    def _record_failure(self):
+        if self._circuit_breaker:
+            self._circuit_breaker.record_failure()
 
     def _gen_request_body(self, metrics, call_type='fetch'):
+        if isinstance(metrics, six.string_types):
+            # NOTE: Body has already been rendered.
+            return metrics
         if call_type == 'fetch':
             return self._gen_warp10_script(metrics)
         elif call_type == 'ingress':
@@ -277,7 +1097,12 @@ class Warp10Client(object):
         t_h = metric.get('timestamp', None)
         w_s = str()
         if t_h:
-            if t_h.get('start') and t_h.get('end'):
+            if t_h.get('count'):
+                # NOTE: Last count datapoints before end.
+                w_s = '{} -{}'.format(
+                    "'{}' TOTIMESTAMP".format(t_h.get('end'))
+                    if t_h.get('end') else 'NOW', int(t_h.get('count')))
+            elif t_h.get('start') and t_h.get('end'):
                 w_s = "'{}' '{}'".format(t_h.get('start'),
                                          t_h.get('end'))
             elif t_h.get('start'):
@@ -313,45 +1138,144 @@ class Warp10Client(object):
             else:
                 span = 1000000
 
-            w_s = '[ SWAP {} bucketizer.{} 0 {} 0 ] BUCKETIZE'.format(
-                param, method.lower(), span)
+            w_s = '[ SWAP {} bucketizer.{} {} {} {} ] BUCKETIZE'.format(
+                param, method.lower(), int(aggregate.get('lastbucket') or 0),
+                span, int(aggregate.get('count') or 0))
         return w_s
 
+    @staticmethod
+    def _get_selector_tags(metric):
+        # NOTE: Labels with an empty value don't select
+        # anything.
+        return [(t_k, t_v) for t_k, t_v in
+                six.iteritems(metric.get('tags') or {}) if t_v]
+
     def _get_warp10_script_tags(self, metric):
         w_s = str()
         if metric.get('tags', None):
-            tags = metric.get('tags')
             # Cook string like "{ 'key1' 'value' 'key2' 'value2' ...}"
-            w_s = '{{ {} }}'.format(' '.join("'%s' '%s'" %
-                                    (t_k, t_v) for t_k, t_v in
-                six.iteritems(tags) if t_v))
+            w_s = '{{ {} }}'.format(' '.join(
+                "'%s' '%s'" % (t_k, t_v)
+                for t_k, t_v in self._get_selector_tags(metric)))
         return w_s
 
+    @staticmethod
+    def _get_warp10_script_pipeline(metric):
+        # NOTE: Processing steps compiled by query.Query.
+        return ' '.join(metric.get('pipeline') or ())
+
     def _gen_warp10_script(self, metric):
-        return "[ '{}' '{}' {} {} ] FETCH {} ".format(
+        w_s = "[ '{}' '{}' {} {} ] FETCH {} ".format(
             self._get_token(),
             metric.get('name'),
             self._get_warp10_script_tags(metric),
             self._gen_warp10_script_timebound(metric),
             self._get_warp10_script_aggregation(metric)
         )
+        pipeline = self._get_warp10_script_pipeline(metric)
+        if pipeline:
+            w_s = '{}{} '.format(w_s, pipeline)
+        if (metric.get('format') or self._fetch_format) == 'columns':
+            w_s += self.COLUMNS_SCRIPT
+        return w_s
 
     def _get_write_body(self, metrics):
-        metrics = self._convert_metrics(
-            [metrics] if type(metrics) == dict else metrics
-        )
-        data = str()
+        if isinstance(metrics, (dict, Metric)):
+            metrics = [metrics]
+        return self._iter_body_chunks(self._iter_write_body(metrics))
+
+    def _iter_write_body(self, metrics):
+        previous_class = None
         for metric in metrics:
-            data += '{}\n'.format(metric.format_metric())
-        return data
+            if not isinstance(metric, Metric):
+                metric = Metric(**metric)
+            gts_class = metric.format_class()
+            if gts_class == previous_class:
+                # NOTE: Continuation line, reuses class and
+                # labels of the previous line.
+                yield '={} {}'.format(metric.format_position(),
+                                      encoder.format_value(metric.value))
+            else:
+                yield '{} {} {}'.format(metric.format_position(), gts_class,
+                                        encoder.format_value(metric.value))
+                previous_class = gts_class
+                if self._label_index is not None:
+                    self._label_index.add(metric.name, metric._tags)
+
+    def _iter_body_chunks(self, lines):
+        chunk = list()
+        size = 0
+        for line in lines:
+            chunk.append(line)
+            size += len(line) + 1
+            if size >= self.WRITE_CHUNK_SIZE:
+                chunk.append('')
+                yield '\n'.join(chunk).encode('utf-8')
+                chunk = list()
+                size = 0
+        if chunk:
+            chunk.append('')
+            yield '\n'.join(chunk).encode('utf-8')
+
+    @staticmethod
+    def _split_operator(value, operators):
+        if value[:1] in operators:
+            return value[:1], encoder.quote(value[1:])
+        return '', encoder.quote(value)
+
+    @classmethod
+    def _get_delete_selector(cls, metric):
+        # NOTE: FETCH label values start with '~' (regex) or '='
+        # (exact), /delete selectors take that operator in place of the
+        # '=' after the label instead. Warp10 URL decodes class, labels
+        # and values, they are encoded like GTS input lines.
+        name = ''.join(cls._split_operator(metric.get('name'), '~'))
+        labels = list()
+        for t_k, t_v in cls._get_selector_tags(metric):
+            operator, value = cls._split_operator(t_v, '~=')
+            labels.append('{}{}{}'.format(encoder.quote(t_k),
+                                          operator or '=', value))
+        return '{}{{{}}}'.format(name, ','.join(labels))
+
+    def _get_delete_body(self, metric):
+        # NOTE: /delete is a GET, the body holds its
+        # parameters.
+        params = {'selector': self._get_delete_selector(metric)}
+        t_h = metric.get('timestamp') or {}
+        if t_h.get('start') or t_h.get('end'):
+            params['start'] = t_h.get('start') or '1970-01-01T00:00:00.000Z'
+            params['end'] = t_h.get('end') or \
+                timeutils.format_iso8601(timeutils.now())
+        else:
+            params['deleteall'] = 'true'
+        if metric.get('dry_run'):
+            params['dryrun'] = 'true'
+        return params
+
+    def close(self):
+        """
+
+        Stop the spool replayer and close the session.
+
+        Lines left in the spool are replayed by the next client using it.
+        Endpoint pools are left open, they may be shared by other clients.
+
+        """
+        if self._replayer is not None:
+            self._replayer.close()
+        self._session.close()
+
+    def __enter__(self):
+        return self
 
-    def _get_delete_body(self, metrics):
-        return str()
+    def __exit__(self, *args):
+        self.close()
 
     def _convert_metrics(self, metrics):
         data = list()
         for metric in metrics:
-            data.append(Metric(**metric))
+            data.append(metric if isinstance(metric, Metric)
+                        else Metric(**metric))
         return data
 
     def __repr__(self):
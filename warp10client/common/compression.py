@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import itertools
+import zlib
+
+import six
+
+# NOTE: zlib writes a gzip header and trailer with this window.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def gzip_chunks(chunks, level=6):
+    """
+
+    Compress an iterable of bytes into a gzip stream.
+
+    :param chunks: iterable of bytes
+    :param level: compression level, 1 (fast) to 9 (small)
+    :return: generator of compressed bytes
+
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, six.text_type):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def gzip_body(body, level=6, threshold=0):
+    """
+
+    Gzip a request body if it is at least threshold bytes long.
+
+    Iterable bodies are only read until threshold bytes are seen, so
+    streaming bodies keep being streamed.
+
+    :param body: text, bytes or iterable of bytes
+    :param level: compression level, 1 (fast) to 9 (small)
+    :param threshold: minimum size in bytes to compress
+    :return: tuple (body, compressed)
+
+    """
+    if isinstance(body, six.text_type):
+        body = body.encode('utf-8')
+    if isinstance(body, six.binary_type):
+        if len(body) < threshold:
+            return body, False
+        return b''.join(gzip_chunks([body], level=level)), True
+    chunks = iter(body)
+    head = list()
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= threshold:
+            return gzip_chunks(itertools.chain(head, chunks),
+                               level=level), True
+    return b''.join(head), False
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import calendar
+import re
+import time
+
+# NOTE: Warp10 handles time as microseconds since epoch.
+MICROSECONDS = 1000000
+
+_ISO8601_RE = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,9}))?'
+    r'(Z|[+-]\d{2}:?\d{2})?$')
+
+
+def now():
+    """Current time in microseconds since epoch."""
+    return int(time.time() * MICROSECONDS)
+
+
+def parse_iso8601(value):
+    """
+
+    Convert an ISO8601 date, as accepted by FETCH, to a timestamp.
+
+    :param value: date like '2017-01-01T00:00:00.000Z'
+    :return: microseconds since epoch
+
+    """
+    match = _ISO8601_RE.match(value.strip())
+    if not match:
+        raise ValueError('Invalid ISO8601 date: %s' % value)
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    seconds = calendar.timegm((int(year), int(month), int(day), int(hour),
+                               int(minute), int(second)))
+    micros = int((fraction or '0').ljust(6, '0')[:6])
+    if zone and zone != 'Z':
+        zone = zone.replace(':', '')
+        offset = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+        seconds -= offset if zone[0] == '+' else -offset
+    return seconds * MICROSECONDS + micros
+
+
+def format_iso8601(timestamp):
+    """
+
+    Convert a timestamp to an ISO8601 date usable by FETCH.
+
+    :param timestamp: microseconds since epoch
+    :return: date like '2017-01-01T00:00:00.000000Z'
+
+    """
+    seconds, micros = divmod(int(timestamp), MICROSECONDS)
+    return '{}.{:06d}Z'.format(
+        time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds)), micros)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import codecs
+import json
+
+import six
+
+_WHITESPACE = ' \t\n\r'
+
+
+class DecodeException(ValueError):
+    pass
+
+
+def loads(content):
+    """
+
+    Parse a complete /exec response body exactly once.
+
+    :param content: response body, bytes or text
+    :return: decoded Warp10 stack as a list
+
+    """
+    if isinstance(content, six.binary_type):
+        content = content.decode('utf-8')
+    try:
+        return json.loads(content)
+    except ValueError as e:
+        raise DecodeException('Failed to decode Warp10 response: %s' % e)
+
+
+def split_value(value):
+    """
+
+    Split a Warp10 datapoint array into its components.
+
+    :param value: datapoint list as rendered by Warp10
+    :return: tuple (timestamp, latitude, longitude, elevation, value)
+
+    """
+    # NOTE: Warp10 renders a datapoint as [ts, value],
+    # [ts, elevation, value], [ts, lat, lon, value] or
+    # [ts, lat, lon, elevation, value] depending on what is set.
+    size = len(value)
+    if size == 2:
+        return value[0], None, None, None, value[1]
+    elif size == 3:
+        return value[0], None, None, value[1], value[2]
+    elif size == 4:
+        return value[0], value[1], value[2], None, value[3]
+    elif size == 5:
+        return value[0], value[1], value[2], value[3], value[4]
+    raise DecodeException('Unexpected Warp10 datapoint: %r' % (value,))
+
+
+class _Reader(object):
+    """Pull parser over an iterable of response chunks."""
+
+    def __init__(self, chunks, chunk_size=65536):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buf = six.text_type()
+        self._pos = 0
+        self._eof = False
+        self._chunk_size = chunk_size
+
+    def _fill(self, min_size=0):
+        # NOTE: Read at least as much as is left in the buffer
+        # so retried decodes of a big element stay linear.
+        self._buf = self._buf[self._pos:]
+        self._pos = 0
+        target = len(self._buf) + max(min_size, 1)
+        parts = [self._buf]
+        size = len(self._buf)
+        while size < target:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                parts.append(self._text.decode(b'', final=True))
+                self._eof = True
+                break
+            if isinstance(chunk, six.binary_type):
+                chunk = self._text.decode(chunk)
+            parts.append(chunk)
+            size += len(chunk)
+        self._buf = six.text_type().join(parts)
+        return not self._eof or self._pos < len(self._buf)
+
+    def peek(self):
+        while True:
+            buf = self._buf
+            pos = self._pos
+            end = len(buf)
+            while pos < end and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < end:
+                return buf[pos]
+            if self._eof or not self._fill():
+                return ''
+
+    def advance(self, expected):
+        char = self.peek()
+        if char not in expected:
+            raise DecodeException('Expected one of %r in Warp10 response, '
+                                  'got %r' % (expected, char))
+        self._pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except ValueError as e:
+                if self._eof:
+                    raise DecodeException('Failed to decode Warp10 '
+                                          'response: %s' % e)
+                self._fill(len(self._buf) - self._pos + self._chunk_size)
+                continue
+            # NOTE: A number at the very end of the buffer may
+            # continue in the next chunk.
+            if end == len(self._buf) and not self._eof:
+                self._fill(self._chunk_size)
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_gts_values(reader, level):
+    reader.advance('{')
+    gts = dict()
+    pending = None
+    if reader.peek() == '}':
+        reader.advance('}')
+        return
+    while True:
+        key = reader.value()
+        reader.advance(':')
+        if key == 'v' and reader.peek() == '[':
+            reader.advance('[')
+            streaming = 'c' in gts
+            values = None if streaming else list()
+            if reader.peek() == ']':
+                reader.advance(']')
+            else:
+                while True:
+                    value = reader.value()
+                    if streaming:
+                        yield level, gts, value
+                    else:
+                        values.append(value)
+                    if reader.advance(',]') == ']':
+                        break
+            pending = values
+        else:
+            gts[key] = reader.value()
+        if reader.advance(',}') == '}':
+            break
+    for value in pending or ():
+        yield level, gts, value
+
+
+def iter_values(chunks, chunk_size=65536):
+    """
+
+    Incrementally decode a /exec response.
+
+    Datapoints are yielded as soon as they are read, so the whole
+    response never has to be held in memory.
+
+    :param chunks: iterable of bytes, e.g. response.iter_content()
+    :param chunk_size: read-ahead used when a value spans chunks
+    :return: generator of (stack_level, gts, value) tuples where gts is
+        a dict holding 'c', 'l' and 'a' shared by all values of a serie
+
+    """
+    reader = _Reader(chunks, chunk_size=chunk_size)
+    reader.advance('[')
+    if reader.peek() == ']':
+        return
+    level = 0
+    while True:
+        if reader.peek() == '[':
+            reader.advance('[')
+            if reader.peek() == ']':
+                reader.advance(']')
+            else:
+                while True:
+                    if reader.peek() == '{':
+                        for item in _iter_gts_values(reader, level):
+                            yield item
+                    else:
+                        reader.value()
+                    if reader.advance(',]') == ']':
+                        break
+        else:
+            reader.value()
+        if reader.advance(',]') == ']':
+            break
+        level += 1
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import array
+
+try:
+    from urllib.parse import quote_plus
+except ImportError:
+    from urllib import quote_plus
+
+import six
+
+# NOTE: Class names, label keys and label values are shared by
+# a lot of datapoints, keep their encoded form around. Caches are simply
+# reset once full.
+CACHE_SIZE = 65536
+
+_quoted = dict()
+_classes = dict()
+
+
+def quote(value):
+    """quote_plus() with a cache."""
+    try:
+        return _quoted[value]
+    except KeyError:
+        if len(_quoted) >= CACHE_SIZE:
+            _quoted.clear()
+        quoted = _quoted[value] = quote_plus(value)
+        return quoted
+
+
+def format_class(name, tags=None):
+    """
+
+    Encode the class and labels part of a GTS input line.
+
+    :param name: class name
+    :param tags: labels hash, labels with an empty value are skipped
+    :return: string like 'name{label1=value1,label2=value2}'
+
+    """
+    key = (name, tuple(six.iteritems(tags))) if tags else (name, ())
+    try:
+        return _classes[key]
+    except KeyError:
+        if len(_classes) >= CACHE_SIZE:
+            _classes.clear()
+        encoded = _classes[key] = '{}{{{}}}'.format(quote(name), ','.join(
+            '{}={}'.format(quote(k), quote(v)) for k, v in key[1] if v))
+        return encoded
+
+
+def format_value(value):
+    """Encode a value as expected by the GTS input format."""
+    if type(value) == bool:
+        return 'T' if value else 'F'
+    elif isinstance(value, six.string_types):
+        return "'{}'".format(quote_plus(value))
+    return '{}'.format(value)
+
+
+def format_position(timestamp, latitude=None, longitude=None,
+                    elevation=None):
+    """Encode the 'timestamp/lat:lon/elevation' part of a GTS input line."""
+    if latitude or longitude:
+        lat_lon = '{}:{}'.format('' if latitude is None else latitude,
+                                 '' if longitude is None else longitude)
+    else:
+        lat_lon = ''
+    return '{}/{}/{}'.format(int(timestamp), lat_lon,
+                             '' if elevation is None else int(elevation))
+
+
+def _get(column, index):
+    if column is None:
+        return None
+    value = column[index]
+    # NOTE: Timeserie columns use NaN for missing entries.
+    return None if value != value else value
+
+
+class GTSEncoder(object):
+    """
+
+    Encode many datapoints of a single serie.
+
+    The class and labels are encoded once. Only the first line carries
+    them, next ones are continuation lines ('=ts/lat:lon/elev value')
+    reusing the class and labels of the previous line.
+
+    """
+
+    def __init__(self, name, tags=None):
+        self.name = name
+        self.tags = tags
+        self.prefix = format_class(name, tags)
+
+    def encode(self, timestamps, values, latitudes=None, longitudes=None,
+               elevations=None):
+        """
+
+        Encode datapoints given as columns.
+
+        :param timestamps: sequence of timestamps in microseconds
+        :param values: sequence of values
+        :param latitudes: optional sequence of latitudes
+        :param longitudes: optional sequence of longitudes
+        :param elevations: optional sequence of elevations
+        :return: generator of GTS input lines, without line feed
+
+        """
+        geo = latitudes is not None or longitudes is not None or \
+            elevations is not None
+        if not geo:
+            for line in self._encode_values(timestamps, values):
+                yield line
+            return
+        first = True
+        for index, timestamp in enumerate(timestamps):
+            position = format_position(timestamp,
+                                       _get(latitudes, index),
+                                       _get(longitudes, index),
+                                       _get(elevations, index))
+            value = format_value(values[index])
+            if first:
+                yield '{} {} {}'.format(position, self.prefix, value)
+                first = False
+            else:
+                yield '={} {}'.format(position, value)
+
+    def _encode_values(self, timestamps, values):
+        points = six.moves.zip(timestamps, values)
+        for timestamp, value in points:
+            yield '{}// {} {}'.format(int(timestamp), self.prefix,
+                                      format_value(value))
+            break
+        if isinstance(values, array.array):
+            # NOTE: Typed columns only hold numbers.
+            for timestamp, value in points:
+                yield '={}// {}'.format(int(timestamp), value)
+        else:
+            for timestamp, value in points:
+                yield '={}// {}'.format(int(timestamp), format_value(value))
+
+    def encode_body(self, timestamps, values, latitudes=None,
+                    longitudes=None, elevations=None):
+        """Same as encode(), joined into a single /update body."""
+        lines = list(self.encode(timestamps, values, latitudes=latitudes,
+                                 longitudes=longitudes,
+                                 elevations=elevations))
+        lines.append('')
+        return '\n'.join(lines)
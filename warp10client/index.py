@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections
+import re
+import threading
+
+import six
+
+from warp10client.timeserie import get_serie_key
+
+
+def _get_tags(tags):
+    # NOTE: Warp10 doesn't store labels with an empty value.
+    return dict((label, value) for label, value in
+                six.iteritems(tags or {}) if value)
+
+
+def _compile(pattern):
+    # NOTE: Warp10 regular expressions match whole strings.
+    return re.compile('(?:{})\\Z'.format(pattern))
+
+
+class LabelIndex(object):
+    """
+
+    In memory inverted index of series class and labels.
+
+    Series are indexed by class and by label value, so selectors are
+    resolved without calling Warp10: exact values are looked up, regular
+    expressions ('~' prefix) are only matched against the indexed values
+    of their class or label.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = dict()
+        self._by_class = collections.defaultdict(set)
+        self._by_label = collections.defaultdict(
+            lambda: collections.defaultdict(set))
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, serie):
+        return get_serie_key(serie['name'],
+                             _get_tags(serie.get('tags'))) in self._series
+
+    def add(self, name, tags=None):
+        """Index a serie, nothing is done if it is already indexed."""
+        tags = _get_tags(tags)
+        key = get_serie_key(name, tags)
+        with self._lock:
+            if key in self._series:
+                return
+            self._series[key] = (name, tags)
+            self._by_class[name].add(key)
+            for label, value in six.iteritems(tags):
+                self._by_label[label][value].add(key)
+
+    def update(self, series):
+        """Index series given as hashes with name and tags."""
+        for serie in series:
+            self.add(serie['name'], serie.get('tags'))
+
+    def remove(self, name, tags=None):
+        tags = _get_tags(tags)
+        key = get_serie_key(name, tags)
+        with self._lock:
+            if self._series.pop(key, None) is None:
+                return
+            self._discard(self._by_class, name, key)
+            for label, value in six.iteritems(tags):
+                self._discard(self._by_label[label], value, key)
+                if not self._by_label[label]:
+                    del self._by_label[label]
+
+    @staticmethod
+    def _discard(mapping, value, key):
+        mapping[value].discard(key)
+        if not mapping[value]:
+            del mapping[value]
+
+    def replace(self, selector, series):
+        """
+
+        Replace indexed series matching selector by the given ones.
+
+        :param selector: Hash with name and tags selectors
+        :param series: series matching selector, as hashes with name and
+            tags
+
+        """
+        series = list(series)
+        found = set(get_serie_key(serie['name'], _get_tags(serie.get('tags')))
+                    for serie in series)
+        for serie in self.find(selector):
+            if get_serie_key(serie['name'], serie['tags']) not in found:
+                self.remove(serie['name'], serie['tags'])
+        self.update(series)
+
+    def _select(self, values, selector):
+        # NOTE: values maps indexed values to sets of keys.
+        if not selector.startswith('~'):
+            if selector.startswith('='):
+                selector = selector[1:]
+            return set(values.get(selector, ()))
+        match = _compile(selector[1:]).match
+        keys = set()
+        for value, value_keys in list(six.iteritems(values)):
+            if match(value):
+                keys.update(value_keys)
+        return keys
+
+    def find(self, selector):
+        """
+
+        Find indexed series matching a selector.
+
+        :param selector: Hash with name (class, '~' prefix for a regular
+            expression) and tags (values with the same syntax, empty
+            values are ignored)
+        :return: list of hashes with name and tags, sorted by serie key
+
+        """
+        with self._lock:
+            keys = self._select(self._by_class, selector.get('name') or '~.*')
+            for label, value in six.iteritems(selector.get('tags') or {}):
+                if not keys:
+                    break
+                if value:
+                    keys &= self._select(self._by_label.get(label, {}),
+                                         value)
+            return [{'name': self._series[key][0],
+                     'tags': dict(self._series[key][1])}
+                    for key in sorted(keys)]
+
+    def label_values(self, label, selector=None):
+        """
+
+        Values of label among indexed series.
+
+        :param label: label name
+        :param selector: only consider series matching this selector
+        :return: sorted list of values
+
+        """
+        if selector is None:
+            with self._lock:
+                return sorted(self._by_label.get(label, ()))
+        return sorted(set(serie['tags'][label]
+                          for serie in self.find(selector)
+                          if label in serie['tags']))
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+            self._by_class.clear()
+            self._by_label.clear()
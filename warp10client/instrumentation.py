@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import bisect
+import collections
+import threading
+
+from warp10client.common import timeutils
+
+# NOTE: Upper bounds in seconds, from sub-millisecond script
+# generation to slow fetches.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+PHASES = ('generate', 'network', 'decode', 'build')
+
+
+class Instrumentation(object):
+    """
+
+    Hooks called by the client around its hot path.
+
+    Phases are 'generate' (WarpScript or body generation), 'network'
+    (from sending the request to getting the response headers), 'decode'
+    (parsing the JSON stack) and 'build' (timeserie construction). Hooks
+    do nothing, subclass this class to plug callbacks in or use Stats.
+
+    """
+
+    def on_phase(self, call_type, phase, duration):
+        """Called with the duration of a phase in seconds."""
+
+    def on_call(self, call_type, bytes_sent, bytes_received):
+        """Called once a call got its response, sizes may be None."""
+
+    def on_points(self, call_type, count):
+        """Called with the number of datapoints decoded or sent."""
+
+    def on_error(self, call_type, error):
+        """Called when a call fails."""
+
+
+class Histogram(object):
+    """Latency histogram with fixed buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile."""
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100.0
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Stats(Instrumentation):
+    """
+
+    Instrumentation keeping counters and latency histograms.
+
+    Values are kept per call type in ``calls``, e.g.
+    ``stats.calls['fetch']['network'].percentile(99)``. They can be sent
+    to Warp10 with report().
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = collections.defaultdict(self._new_call_stats)
+
+    @staticmethod
+    def _new_call_stats():
+        stats = dict((phase, Histogram()) for phase in PHASES)
+        stats.update(calls=0, errors=0, points=0, bytes_sent=0,
+                     bytes_received=0)
+        return stats
+
+    def on_phase(self, call_type, phase, duration):
+        with self._lock:
+            self.calls[call_type][phase].add(duration)
+
+    def on_call(self, call_type, bytes_sent, bytes_received):
+        with self._lock:
+            stats = self.calls[call_type]
+            stats['calls'] += 1
+            stats['bytes_sent'] += bytes_sent or 0
+            stats['bytes_received'] += bytes_received or 0
+
+    def on_points(self, call_type, count):
+        with self._lock:
+            self.calls[call_type]['points'] += count
+
+    def on_error(self, call_type, error):
+        with self._lock:
+            self.calls[call_type]['errors'] += 1
+
+    def to_metrics(self, prefix='warp10client', tags=None, timestamp=None):
+        """
+
+        Convert stats to metric hashes.
+
+        :param prefix: class names prefix
+        :param tags: labels added to every metric
+        :param timestamp: timestamp of datapoints, now if None
+        :return: list of metric hashes
+
+        """
+        timestamp = timestamp or timeutils.now()
+        metrics = list()
+
+        def add(name, call_type, value, **extra):
+            metric_tags = dict(tags or {}, call_type=call_type, **extra)
+            metrics.append({'name': '{}.{}'.format(prefix, name),
+                            'tags': metric_tags,
+                            'position': {'timestamp': timestamp},
+                            'value': value})
+
+        with self._lock:
+            for call_type, stats in sorted(self.calls.items()):
+                for counter in ('calls', 'errors', 'points', 'bytes_sent',
+                                'bytes_received'):
+                    add(counter, call_type, stats[counter])
+                for phase in PHASES:
+                    histogram = stats[phase]
+                    if not histogram.count:
+                        continue
+                    add('latency.count', call_type, histogram.count,
+                        phase=phase)
+                    add('latency.sum', call_type, histogram.sum,
+                        phase=phase)
+                    add('latency.max', call_type, histogram.max,
+                        phase=phase)
+                    for percent in (50, 99):
+                        add('latency.p{}'.format(percent), call_type,
+                            histogram.percentile(percent), phase=phase)
+        return metrics
+
+    def report(self, writer, **kwargs):
+        """
+
+        Send stats to Warp10 through a BufferedWriter.
+
+        :param writer: writer object, e.g. client.writer()
+        :param kwargs: arguments of to_metrics()
+
+        """
+        writer.write(self.to_metrics(**kwargs))
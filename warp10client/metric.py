@@ -8,10 +8,56 @@ except ImportError:
 
 from time import time
 
+from warp10client import encoder
 from warp10client.position import Position
 
+TAGS_CACHE_SIZE = 4096
+
+_TAGS_CACHE = dict()
+
+
+class Tags(dict):
+    """Immutable labels mapping, shared by the datapoints of a serie."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Tags are shared between metrics and read only')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return Tags, (dict(self),)
+
+
+def intern_tags(tags):
+    """
+
+    Get the shared read only mapping of labels.
+
+    :param tags: labels hash
+    :return: Tags object, the same one for equal labels
+
+    """
+    if isinstance(tags, Tags):
+        return tags
+    try:
+        key = tuple(sorted(tags.items()))
+        shared = _TAGS_CACHE.get(key)
+    except TypeError:
+        # NOTE: Unhashable label values can't be interned.
+        return Tags(tags)
+    if shared is None:
+        if len(_TAGS_CACHE) >= TAGS_CACHE_SIZE:
+            _TAGS_CACHE.clear()
+        shared = _TAGS_CACHE[key] = Tags(tags)
+    return shared
+
 
 class Metric(object):
+    __slots__ = ('name', 'value', '_tags', 'position')
+
     # NOTE(mjozefcz): Consider to add here maybe some extra if needed?
     DEFAULT_TAGS = {
         # 'host': gethostname() # DO NOT CREATE SILOS, what if vm has
@@ -26,8 +72,9 @@ class Metric(object):
     def __init__(self, name, value=None, tags=None, position=None):
         self.name = name
         self.value = value
-        self._tags = Metric.DEFAULT_TAGS.copy()
-        self._tags.update(**tags)
+        if Metric.DEFAULT_TAGS:
+            tags = dict(Metric.DEFAULT_TAGS, **(tags or {}))
+        self._tags = intern_tags(tags or {})
         self.position = self._fill_current_position(position=position)
 
     def __repr__(self):
@@ -47,23 +94,18 @@ class Metric(object):
                                                     self.position.elevation,
                                                     tags or '')
 
+    def format_class(self):
+        return encoder.format_class(self.name, self._tags)
+
+    def format_position(self):
+        return '{}/{}/{}'.format(int(self.position.timestamp),
+                                 self.position.lat_lon,
+                                 self.position.elevation)
+
     def format_metric(self):
-        tags = ','.join(
-            '{}={}'.format(quote_plus(k), quote_plus(self._tags[k]))
-            for k in self._tags if self._tags[k]
-        )
-        metric_name = quote_plus(self.name)
-        if type(self.value) == bool:
-            metric_value = 'T' if self.value else 'F'
-        elif type(self.value) == str:
-            metric_value = "'{}'".format(quote_plus(self.value))
-        else:
-            metric_value = self.value
-        return '{}/{}/{} {}{} {}'.format(
-            int(self.position.timestamp),
-            self.position.lat_lon,
-            self.position.elevation,
-            metric_name, '{' + tags + '}', metric_value)
+        return '{} {} {}'.format(self.format_position(),
+                                 self.format_class(),
+                                 encoder.format_value(self.value))
 
     def _fill_current_position(self, position):
         if position is None:
@@ -72,7 +114,7 @@ class Metric(object):
                 **Metric.DEFAULT_LOCATION
             )
         elif not isinstance(position, Position):
-            kwargs = Metric.DEFAULT_LOCATION
+            kwargs = Metric.DEFAULT_LOCATION.copy()
             kwargs.update(position)
             position = Position(**kwargs)
 
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections
+import zlib
+
+from concurrent import futures
+import six
+
+from warp10client.client import Warp10Client
+from warp10client.metric import Metric
+from warp10client.timeserie import get_serie_key
+
+
+def get_shard(serie_key, shards):
+    """
+
+    Get the shard of a serie.
+
+    :param serie_key: class and labels of the serie, as given by
+        get_serie_key() so labels are sorted
+    :param shards: number of shards
+    :return: shard index, stable across processes
+
+    """
+    return zlib.crc32(serie_key.encode('utf-8')) % shards
+
+
+def ordered_map(executor, func, items, max_in_flight):
+    """
+
+    Apply func to items in executor, yielding results in items order.
+
+    At most max_in_flight calls are submitted at the same time, so a long
+    or lazy iterable of items is never fully queued in the executor.
+
+    :param executor: concurrent.futures executor
+    :param func: callable taking one item
+    :param items: iterable of items
+    :param max_in_flight: maximum number of pending calls
+    :return: generator of results
+
+    """
+    pending = collections.deque()
+    try:
+        for item in items:
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class ConcurrentWarp10Client(Warp10Client):
+    """
+
+    Warp10 client running calls across a thread pool.
+
+    Workers share the client session, its connection pool and the ones
+    of endpoint pools are sized to at least the number of workers so
+    connections are kept alive between calls.
+
+    """
+
+    def __init__(self, max_workers=8, max_in_flight=None, **kwargs):
+        kwargs.setdefault('pool_connections', max_workers)
+        kwargs.setdefault('pool_maxsize', max_workers)
+        super(ConcurrentWarp10Client, self).__init__(**kwargs)
+        for endpoints in (self._read_endpoints, self._write_endpoints):
+            if endpoints is not None and endpoints.pool_maxsize < max_workers:
+                endpoints.resize(max_workers)
+        self._max_workers = max_workers
+        self._max_in_flight = max_in_flight or max_workers * 2
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def imap(self, func, items):
+        """
+
+        Run func for each item across the thread pool.
+
+        :param func: callable taking one item, e.g. client.get
+        :param items: iterable of items
+        :return: generator of results, in items order
+
+        """
+        return ordered_map(self._executor, func, items, self._max_in_flight)
+
+    def parallel_get(self, metrics):
+        """
+
+        Get metrics from Warp10 concurrently.
+
+        :param metrics: list of metric hashes that need to be fetched
+        :return: list of timeserie objects, one per metric
+
+        """
+        return list(self.imap(self.get, metrics))
+
+    def parallel_exists(self, metrics):
+        """
+
+        Check concurrently if metrics exist in Warp10 backend.
+
+        :param metrics: list of metric hashes that need to be checked
+        :return: list of booleans, one per metric
+
+        """
+        return list(self.imap(self.exists, metrics))
+
+    def parallel_set(self, batches):
+        """
+
+        Send batches of metrics to Warp10 backend concurrently.
+
+        :param batches: list of metric hashes or of lists of metric hashes,
+            each one is sent in its own call
+        :return: list of added metrics lists, one per batch
+
+        """
+        return list(self.imap(self.set, batches))
+
+    def sharded_set(self, metrics, shards=None):
+        """
+
+        Send metrics to Warp10 backend split in shards sent concurrently.
+
+        Metrics are partitioned by serie (class and labels), every shard
+        is sent in its own call so series keep their order. Datapoints of
+        a serie are grouped and encoded as continuation lines.
+
+        :param metrics: Hash with metric or iterable of metrics Hashes
+        :param shards: number of shards, max_workers if None
+        :return: number of metrics sent
+
+        """
+        if isinstance(metrics, (dict, Metric)):
+            metrics = [metrics]
+        shards = shards or self._max_workers
+        series = [collections.OrderedDict() for _ in range(shards)]
+        count = 0
+        for metric in metrics:
+            if not isinstance(metric, Metric):
+                metric = Metric(**metric)
+            # NOTE: Labels with an empty value are not part of
+            # the serie.
+            key = get_serie_key(metric.name, dict(
+                (t_k, t_v) for t_k, t_v in six.iteritems(metric._tags)
+                if t_v))
+            series[get_shard(key, shards)].setdefault(
+                key, list()).append(metric)
+            count += 1
+        batches = [[metric for serie in shard.values() for metric in serie]
+                   for shard in series if shard]
+        for _ in self.imap(self._ingest, batches):
+            pass
+        return count
+
+    def get_pages(self, metric, window=None, page_size=None):
+        """
+
+        Get series page by page, see Warp10Client.get_pages().
+
+        Time windows are fetched concurrently, at most max_in_flight pages
+        are held in memory. Pages are still yielded oldest first. Paging
+        by count is sequential.
+
+        :param metric: Hash with metric that needs to be fetched
+        :param window: window length in microseconds
+        :param page_size: maximum number of datapoints per serie and page
+        :return: generator of timeserie set objects, one per page
+
+        """
+        if page_size or not (metric.get('timestamp') or {}).get('start'):
+            return super(ConcurrentWarp10Client, self).get_pages(
+                metric, window=window, page_size=page_size)
+        return self.imap(self._get_page, self._iter_page_metrics(
+            metric, window or self.DEFAULT_PAGE_WINDOW))
+
+    def delete(self, metrics, dry_run=False, window=None):
+        """
+
+        Delete metrics from WARP10 backend concurrently, see
+        Warp10Client.delete().
+
+        Calls, one per hash or window, run across the thread pool with at
+        most max_in_flight of them pending.
+
+        :return: number of series deletions reported by Warp10
+
+        """
+        return sum(self.imap(self._delete, self._iter_delete_metrics(
+            metrics, dry_run, window)))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        super(ConcurrentWarp10Client, self).close()
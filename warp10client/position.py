@@ -5,9 +5,12 @@ from time import time
 
 
 class Position(object):
+    __slots__ = ('timestamp', 'latitude', 'longitude', 'elevation', 'lat_lon')
+
     def __init__(self, timestamp=time(), latitude=None, longitude=None,
                  elevation=None):
         self.latitude = latitude
         self.longitude = longitude
         self.elevation = elevation
         self.timestamp = timestamp
+        self.lat_lon = ''
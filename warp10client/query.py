@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from warp10client.client import Warp10Client
+
+
+class Query(dict):
+    """
+
+    Metric hash with a chain of server side processing steps.
+
+    Steps are compiled to WarpScript and run by Warp10 right after the
+    FETCH, so only the reduced series are sent back. A query can be used
+    wherever a metric hash is accepted for fetching:
+
+        query = Query('cpu_util', tags={'project_id': project_id},
+                      start='2017-09-26T00:00:00.000Z')
+        query.bucketize('max', span=60000000).rate().reduce('sum')
+        client.get_all(query)
+
+    """
+
+    MAPPERS = {
+        'rate', 'delta', 'abs', 'ceil', 'floor', 'round', 'sum', 'mean',
+        'max', 'min', 'count', 'first', 'last', 'median', 'add', 'mul',
+    }
+
+    REDUCERS = {
+        'sum', 'mean', 'max', 'min', 'count', 'median', 'first', 'last',
+    }
+
+    def __init__(self, name, tags=None, start=None, end=None, **kwargs):
+        super(Query, self).__init__(name=name, **kwargs)
+        if tags:
+            self['tags'] = dict(tags)
+        if start or end:
+            self['timestamp'] = {'start': start, 'end': end}
+        self['pipeline'] = list(self.get('pipeline') or ())
+
+    def _add(self, w_s):
+        self['pipeline'].append(w_s)
+        return self
+
+    def bucketize(self, method='mean', span=1000000, lastbucket=0, count=0):
+        """
+
+        Aggregate datapoints into buckets of span microseconds.
+
+        :param method: one of Warp10Client.VALID_AGGREGATION_METHODS
+        :param span: bucket width in microseconds
+        :param lastbucket: end of the last bucket, 0 to use the last
+            datapoint
+        :param count: number of buckets, 0 to cover all datapoints
+        :return: the query itself
+
+        """
+        return self._add('[ SWAP {} bucketizer.{} {} {} {} ] BUCKETIZE'.format(
+            Warp10Client._get_aggregation_parameter(method),
+            Warp10Client._get_aggregation_method(method).lower(),
+            int(lastbucket), int(span), int(count)))
+
+    def map(self, mapper, pre=0, post=0, occurrences=0, param=None):
+        """
+
+        Apply a mapper on a sliding window of each serie.
+
+        :param mapper: mapper name, see MAPPERS
+        :param pre: number of datapoints before the current one in the
+            window
+        :param post: number of datapoints after the current one in the
+            window
+        :param occurrences: maximum number of computations, 0 for all
+        :param param: parameter of mappers like 'add' or 'mul'
+        :return: the query itself
+
+        """
+        if mapper not in self.MAPPERS:
+            raise NotImplementedError('Mapper %s is not valid mapper' %
+                                      mapper)
+        return self._add('[ SWAP {} mapper.{} {} {} {} ] MAP'.format(
+            '' if param is None else param, mapper, int(pre), int(post),
+            int(occurrences)))
+
+    def rate(self):
+        """Rate of change per microsecond with the previous datapoint."""
+        return self.map('rate', pre=1)
+
+    def delta(self):
+        """Difference with the previous datapoint."""
+        return self.map('delta', pre=1)
+
+    def reduce(self, reducer='sum', labels=None):
+        """
+
+        Reduce series sharing the same values of labels into one.
+
+        Series have to be bucketized first so their ticks line up.
+
+        :param reducer: reducer name, see REDUCERS
+        :param labels: labels to group series by, all series are reduced
+            together if None
+        :return: the query itself
+
+        """
+        if reducer not in self.REDUCERS:
+            raise NotImplementedError('Reducer %s is not valid reducer' %
+                                      reducer)
+        return self._add('[ SWAP [ {} ] reducer.{} ] REDUCE'.format(
+            ' '.join("'%s'" % label for label in labels or ()), reducer))
+
+    def max_points(self, threshold):
+        """
+
+        Downsample each serie to at most threshold datapoints with LTTB.
+
+        :param threshold: maximum number of datapoints per serie
+        :return: the query itself
+
+        """
+        self['expected_points'] = int(threshold)
+        return self._add('{} LTTB'.format(int(threshold)))
+
+    def to_warpscript(self):
+        """WarpScript of the processing steps, run after the FETCH."""
+        return ' '.join(self['pipeline'])
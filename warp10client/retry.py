@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+import time
+
+# NOTE: Statuses answered by Warp10, or a proxy in front of it,
+# when it is overloaded or restarting.
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+
+class CircuitOpenException(Exception):
+    pass
+
+
+class RetryPolicy(object):
+    """
+
+    Retry failed calls with jittered exponential backoff.
+
+    Calls failing with a connection error or one of statuses are retried
+    up to attempts times in total. Before retry n (starting at 0), the
+    client sleeps a random time between 0 and backoff * 2 ** n seconds,
+    capped at max_backoff. Fetches and deletes are idempotent and always
+    retried, ingress calls only when retry_ingress is set since their
+    body has to be kept in memory to be sent again.
+
+    """
+
+    def __init__(self, attempts=3, backoff=0.1, max_backoff=5.0,
+                 statuses=RETRY_STATUSES, retry_ingress=False):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.retry_ingress = retry_ingress
+
+    def is_retryable(self, call_type):
+        return call_type != 'ingress' or self.retry_ingress
+
+    def can_retry(self, attempt):
+        return attempt + 1 < self.attempts
+
+    def get_backoff(self, attempt):
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff * 2 ** attempt))
+
+    def sleep(self, attempt):
+        time.sleep(self.get_backoff(attempt))
+
+
+class CircuitBreaker(object):
+    """
+
+    Stop calling a degraded backend for a while.
+
+    After threshold consecutive failures the circuit opens and calls
+    fail right away with CircuitOpenException. Once reset_timeout seconds
+    have passed, a single trial call is let through: the circuit closes
+    if it succeeds and opens again otherwise.
+
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=5, reset_timeout=30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenException if calls are not allowed."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and \
+                    time.time() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpenException(
+                'Warp10 circuit breaker is open after %d failures' %
+                self._failures)
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or \
+                    self._failures >= self.threshold:
+                self.state = self.OPEN
+                self._opened_at = time.time()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import daiquiri
+import requests
+
+from warp10client.retry import RETRY_STATUSES
+
+LOG = daiquiri.getLogger(__name__)
+
+STRATEGIES = ('least_in_flight', 'round_robin')
+
+
+class Endpoint(object):
+    """Warp10 node of a pool, with its own connection pool."""
+
+    def __init__(self, url, pool_connections=1, pool_maxsize=10):
+        self.url = url.rstrip('/')
+        self.session = requests.Session()
+        self._pool_connections = pool_connections
+        self.mount(pool_maxsize)
+        self.in_flight = 0
+        self.failures = 0
+        self.latency = None
+        self.ejected_until = None
+
+    def mount(self, pool_maxsize):
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self._pool_connections,
+            pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def is_healthy(self, now):
+        return self.ejected_until is None or self.ejected_until <= now
+
+    def __repr__(self):
+        return '<Endpoint {} in_flight={} failures={}>'.format(
+            self.url, self.in_flight, self.failures)
+
+
+class EndpointPool(object):
+    """
+
+    Balance calls across Warp10 nodes serving the same API.
+
+    Calls go to the node with the least calls in flight
+    ('least_in_flight') or to every node in turn ('round_robin'). A node
+    is ejected for eject_time seconds after max_failures consecutive
+    failures (connection errors, 5xx or overload answers), or once the
+    moving average of its latency goes over max_latency seconds. It gets
+    calls again once ejection expired. When every node is ejected, the
+    one whose ejection expires first is used.
+
+    Every node has its own session, i.e. its own connection pool.
+
+    """
+
+    def __init__(self, urls, strategy='least_in_flight', max_failures=3,
+                 eject_time=30.0, max_latency=None, latency_weight=0.2,
+                 pool_maxsize=10):
+        if not urls:
+            raise ValueError('At least one Warp10 endpoint is required')
+        if strategy not in STRATEGIES:
+            raise ValueError('Unsupported strategy: %s' % strategy)
+        self.endpoints = [Endpoint(url, pool_maxsize=pool_maxsize)
+                          for url in urls]
+        self.pool_maxsize = pool_maxsize
+        self._strategy = strategy
+        self._max_failures = max_failures
+        self._eject_time = eject_time
+        self._max_latency = max_latency
+        self._latency_weight = latency_weight
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def acquire(self):
+        """Pick the endpoint of the next call, release() it afterwards."""
+        with self._lock:
+            now = time.time()
+            count = len(self.endpoints)
+            # NOTE: Endpoints are scanned from a rotating start
+            # so ties are spread too.
+            endpoints = [self.endpoints[(self._next + i) % count]
+                         for i in range(count)]
+            self._next = (self._next + 1) % count
+            healthy = [endpoint for endpoint in endpoints
+                       if endpoint.is_healthy(now)]
+            if not healthy:
+                endpoint = min(endpoints,
+                               key=lambda endpoint: endpoint.ejected_until)
+            elif self._strategy == 'round_robin':
+                endpoint = healthy[0]
+            else:
+                endpoint = min(healthy,
+                               key=lambda endpoint: endpoint.in_flight)
+            endpoint.in_flight += 1
+            return endpoint
+
+    def release(self, endpoint, duration, status_code=None):
+        """
+
+        Record the outcome of a call.
+
+        :param endpoint: endpoint returned by acquire()
+        :param duration: duration of the call in seconds
+        :param status_code: HTTP status, None if the call failed without
+            a response
+
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+            if endpoint.latency is None:
+                endpoint.latency = duration
+            else:
+                endpoint.latency += self._latency_weight * (
+                    duration - endpoint.latency)
+            if status_code is None or status_code in RETRY_STATUSES or \
+                    status_code >= 500:
+                endpoint.failures += 1
+                if endpoint.failures >= self._max_failures:
+                    self._eject(endpoint, '%d failures' % endpoint.failures)
+            elif self._max_latency and \
+                    endpoint.latency > self._max_latency:
+                self._eject(endpoint, 'latency %.3fs' % endpoint.latency)
+            else:
+                endpoint.failures = 0
+
+    def _eject(self, endpoint, reason):
+        LOG.warning('Ejecting Warp10 endpoint %s for %ss: %s',
+                    endpoint.url, self._eject_time, reason)
+        endpoint.ejected_until = time.time() + self._eject_time
+        # NOTE: Once readmitted, a single failure ejects the
+        # node again.
+        endpoint.failures = max(self._max_failures - 1, 0)
+        endpoint.latency = None
+
+    def resize(self, pool_maxsize):
+        """
+
+        Resize the connection pool of every node.
+
+        Connections of the previous pools are closed once released.
+
+        :param pool_maxsize: maximum number of connections kept alive per
+            node
+
+        """
+        with self._lock:
+            for endpoint in self.endpoints:
+                endpoint.mount(pool_maxsize)
+            self.pool_maxsize = pool_maxsize
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.session.close()
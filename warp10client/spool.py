@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import os
+import threading
+import time
+
+import daiquiri
+import six
+
+LOG = daiquiri.getLogger(__name__)
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+DROP_POLICIES = ('oldest', 'newest', 'error')
+
+SEGMENT_SUFFIX = '.spool'
+
+
+class SpoolFullException(Exception):
+    pass
+
+
+def _fsync_dir(path):
+    # NOTE: New segments are only durable once their directory
+    # entry is, directories can't be opened on every platform.
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Spool(object):
+    """
+
+    On disk, append only spool of GTS lines.
+
+    Bodies that could not be sent to Warp10 are appended to segment
+    files of about segment_bytes in directory path, and read back oldest
+    first by the Replayer. Appends are sequential writes flushed to the
+    OS on every append and synced to disk according to fsync: 'always'
+    (every append), 'interval' (at most every fsync_interval seconds and
+    when a segment is sealed) or 'never' (left to the OS).
+
+    Disk usage is bounded by max_bytes. Once full, the drop policy
+    either deletes the oldest segments ('oldest'), drops the new body
+    ('newest') or raises SpoolFullException ('error').
+
+    Lines are delivered at least once: read positions are kept in
+    memory, segments left by a previous process are replayed as a whole.
+
+    """
+
+    def __init__(self, path, segment_bytes=16 * 1024 * 1024,
+                 max_bytes=1024 * 1024 * 1024, fsync='interval',
+                 fsync_interval=1.0, drop='oldest'):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError('Unsupported fsync policy: %s' % fsync)
+        if drop not in DROP_POLICIES:
+            raise ValueError('Unsupported drop policy: %s' % drop)
+        self._path = path
+        self._segment_bytes = segment_bytes
+        self._max_bytes = max_bytes
+        self._fsync = fsync
+        self._fsync_interval = fsync_interval
+        self._drop = drop
+        self._lock = threading.Lock()
+        self._segments = list()
+        self._sizes = dict()
+        self._file = None
+        self._synced_at = time.time()
+        self._read_offset = 0
+        # NOTE: Segment numbers are never reused, a position
+        # returned by peek() can't match a segment created later.
+        self._next_seq = 0
+        self.stats = {
+            'appended_bytes': 0,
+            'replayed_bytes': 0,
+            'dropped_bytes': 0,
+        }
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self._load()
+
+    def _get_segment_path(self, seq):
+        return os.path.join(self._path, '%016d%s' % (seq, SEGMENT_SUFFIX))
+
+    def _load(self):
+        for name in sorted(os.listdir(self._path)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            seq = int(name[:-len(SEGMENT_SUFFIX)])
+            self._next_seq = max(self._next_seq, seq + 1)
+            size = self._repair(self._get_segment_path(seq))
+            if size:
+                self._segments.append(seq)
+                self._sizes[seq] = size
+            else:
+                os.remove(self._get_segment_path(seq))
+
+    @staticmethod
+    def _repair(path):
+        # NOTE: A crash may leave a partially written last
+        # line, it is cut off.
+        with open(path, 'rb+') as segment:
+            data = segment.read()
+            size = data.rfind(b'\n') + 1
+            if size != len(data):
+                segment.truncate(size)
+        return size
+
+    @property
+    def pending_bytes(self):
+        with self._lock:
+            return sum(six.itervalues(self._sizes)) - self._read_offset
+
+    def __len__(self):
+        return self.pending_bytes
+
+    def append(self, data):
+        """
+
+        Append GTS lines to the spool.
+
+        :param data: newline terminated GTS lines, text or bytes
+        :return: True if data has been spooled, False if it was dropped
+        :raise SpoolFullException: spool is full and drop policy is
+            'error'
+
+        """
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        if not data:
+            return True
+        if not data.endswith(b'\n'):
+            data += b'\n'
+        with self._lock:
+            if not self._make_room(len(data)):
+                self.stats['dropped_bytes'] += len(data)
+                LOG.warning('Warp10 spool is full, dropped %d bytes',
+                            len(data))
+                return False
+            if self._file is None or \
+                    self._sizes[self._segments[-1]] >= self._segment_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._sizes[self._segments[-1]] += len(data)
+            self.stats['appended_bytes'] += len(data)
+            if self._fsync == 'always' or (
+                    self._fsync == 'interval' and
+                    time.time() - self._synced_at >= self._fsync_interval):
+                self._sync()
+        return True
+
+    def _make_room(self, size):
+        used = sum(six.itervalues(self._sizes))
+        if used + size <= self._max_bytes:
+            return True
+        if self._drop == 'error':
+            raise SpoolFullException(
+                'Warp10 spool is full (%d bytes)' % used)
+        if self._drop == 'newest':
+            return False
+        while used + size > self._max_bytes and self._segments:
+            seq = self._segments[0]
+            if seq == self._segments[-1] and self._file is not None:
+                # NOTE: Seal the segment being written so it
+                # can be dropped too.
+                self._close_file()
+            dropped = self._sizes[seq] - self._read_offset
+            self.stats['dropped_bytes'] += dropped
+            LOG.warning('Warp10 spool is full, dropped %d bytes', dropped)
+            used -= self._sizes[seq]
+            self._remove_segment(seq)
+        return used + size <= self._max_bytes
+
+    def _rotate(self):
+        self._close_file()
+        seq = self._next_seq
+        self._next_seq += 1
+        self._file = open(self._get_segment_path(seq), 'ab')
+        self._segments.append(seq)
+        self._sizes[seq] = 0
+        if self._fsync != 'never':
+            _fsync_dir(self._path)
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._synced_at = time.time()
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        if self._fsync != 'never':
+            self._sync()
+        self._file.close()
+        self._file = None
+
+    def _remove_segment(self, seq):
+        self._segments.remove(seq)
+        del self._sizes[seq]
+        self._read_offset = 0
+        try:
+            os.remove(self._get_segment_path(seq))
+        except OSError as e:
+            LOG.warning('Failed to remove Warp10 spool segment: %s', e)
+
+    def peek(self, max_bytes=4 * 1024 * 1024):
+        """
+
+        Read the oldest pending lines.
+
+        Lines are cut before max_bytes, but never before a continuation
+        line ('=' prefix) which has to be sent with the line before.
+
+        :param max_bytes: maximum size of data, unless a single line (and
+            its continuation lines) is longer
+        :return: tuple (position, data), data is None if the spool is
+            empty. Give position to ack() once data has been sent
+
+        """
+        with self._lock:
+            while self._segments and self._is_sealed(self._segments[0]) \
+                    and self._read_offset >= self._sizes[self._segments[0]]:
+                self._remove_segment(self._segments[0])
+            if not self._segments:
+                return None, None
+            seq = self._segments[0]
+            if self._read_offset >= self._sizes[seq]:
+                return None, None
+            with open(self._get_segment_path(seq), 'rb') as segment:
+                segment.seek(self._read_offset)
+                data = segment.read(
+                    min(max_bytes, self._sizes[seq] - self._read_offset) + 1)
+                while len(data) > max_bytes:
+                    cut = self._get_cut(data, len(data) - 1)
+                    if cut:
+                        data = data[:cut]
+                        break
+                    more = segment.read(max_bytes)
+                    if not more:
+                        break
+                    data += more
+            data = data[:self._sizes[seq] - self._read_offset]
+            return (seq, self._read_offset + len(data)), data
+
+    @staticmethod
+    def _get_cut(data, end):
+        # NOTE: Cut after a newline which is followed by a line
+        # that is not a continuation line.
+        cut = data.rfind(b'\n', 0, end)
+        while cut != -1 and data[cut + 1:cut + 2] == b'=':
+            cut = data.rfind(b'\n', 0, cut)
+        return cut + 1
+
+    def ack(self, position):
+        """
+
+        Mark data read with peek() as sent.
+
+        :param position: position returned by peek()
+
+        """
+        seq, offset = position
+        with self._lock:
+            if not self._segments or self._segments[0] != seq:
+                # NOTE: Segment has been dropped meanwhile.
+                return
+            self.stats['replayed_bytes'] += offset - self._read_offset
+            self._read_offset = offset
+            if offset >= self._sizes[seq] and self._is_sealed(seq):
+                self._remove_segment(seq)
+
+    def _is_sealed(self, seq):
+        return seq != self._segments[-1] or self._file is None
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+
+class Replayer(object):
+    """
+
+    Background thread draining a spool into Warp10.
+
+    Pending lines are sent in batches of batch_bytes every interval
+    seconds, or as soon as wake() is called. After a failure the next
+    attempt is delayed twice as much, up to max_interval seconds. Lines
+    rejected by Warp10 (other than overload or unavailability answers)
+    are dropped.
+
+    """
+
+    def __init__(self, client, spool, interval=5.0, max_interval=60.0,
+                 batch_bytes=4 * 1024 * 1024):
+        self._client = client
+        self._spool = spool
+        self._interval = interval
+        self._max_interval = max_interval
+        self._batch_bytes = batch_bytes
+        self._condition = threading.Condition()
+        self._closed = False
+        self._woken = False
+        self.stats = {
+            'batches': 0,
+            'errors': 0,
+            'rejected_bytes': 0,
+        }
+        self._thread = threading.Thread(target=self._run,
+                                        name='warp10-replayer')
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def wake(self):
+        """Drain the spool now, e.g. once the backend answered."""
+        with self._condition:
+            self._woken = True
+            self._condition.notify_all()
+
+    def replay(self):
+        """
+
+        Send pending lines until the spool is empty or a call fails.
+
+        :return: True if the spool has been drained
+
+        """
+        while True:
+            position, data = self._spool.peek(self._batch_bytes)
+            if data is None:
+                return True
+            try:
+                self._client._call(None, call_type='ingress', body=data)
+            except Exception as e:
+                if self._client._is_spoolable(e):
+                    self.stats['errors'] += 1
+                    LOG.warning('Failed to replay Warp10 spool: %s', e)
+                    return False
+                self.stats['rejected_bytes'] += len(data)
+                LOG.error('Warp10 rejected %d spooled bytes: %s',
+                          len(data), e)
+            else:
+                self.stats['batches'] += 1
+            self._spool.ack(position)
+
+    def _run(self):
+        delay = self._interval
+        while True:
+            with self._condition:
+                if not (self._closed or self._woken):
+                    self._condition.wait(delay)
+                if self._closed:
+                    return
+                self._woken = False
+            if self.replay():
+                delay = self._interval
+            else:
+                delay = min(delay * 2, self._max_interval)
+
+    def close(self):
+        """Stop the background thread, pending lines stay spooled."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._spool.close()
+        unregister = getattr(atexit, 'unregister', None)
+        if unregister:
+            unregister(self.close)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from mock import mock
+import requests
+
+from warp10client import aio
+from warp10client.cache import MemoryCache
+from warp10client.retry import CircuitBreaker
+from warp10client.retry import CircuitOpenException
+from warp10client.retry import RetryPolicy
+from warp10client.tests import base
+
+
+class FakeResponse(object):
+
+    def __init__(self, status=200, content=b'[[]]'):
+        self.status = status
+        self.reason = 'OK'
+        self.content = content
+        self.release = mock.Mock()
+
+    async def read(self):
+        return self.content
+
+
+class TestAsyncWarp10ClientTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestAsyncWarp10ClientTestCase, self).setUp()
+        if aio.aiohttp is None:
+            self.skipTest('aiohttp is not installed')
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.responses = list()
+        self.calls = list()
+        self.timeouts = list()
+        self.warp10_url = 'http://example.warp10.com'
+
+        async def request(method, url, headers=None, data=None,
+                          params=None, timeout=None):
+            self.calls.append((method, url, headers,
+                               data if params is None else params))
+            self.timeouts.append(timeout)
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        self.mock_session = mock.Mock()
+        self.mock_session.request = request
+        patcher = mock.patch('aiohttp.ClientSession',
+                             return_value=self.mock_session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = self._client()
+
+    def _client(self, **kwargs):
+        return aio.AsyncWarp10Client(read_token='read', write_token='write',
+                                     warp10_api_url=self.warp10_url,
+                                     **kwargs)
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_get(self):
+        self.responses.append(FakeResponse(
+            content=b'[[{"c":"cpu","l":{"a":"b"},"a":{},"v":[[1,1.5]]}]]'))
+        timeserie = self._run(self.client.get({'name': 'cpu'}))
+        self.assertEqual(1.5, timeserie.metrics[0].value)
+        method, url, headers, data = self.calls[0]
+        self.assertEqual('POST', method)
+        self.assertEqual(self.warp10_url + '/exec', url)
+        self.assertEqual({'X-Warp10-Token': 'read'}, headers)
+        self.assertIn("'cpu'", data)
+
+    def test_get_many(self):
+        self.responses.append(FakeResponse(
+            content=b'[[{"c":"mem","l":{},"a":{},"v":[]}],'
+                    b'[{"c":"cpu","l":{},"a":{},"v":[]}]]'))
+        results = self._run(self.client.get_many([{'name': 'cpu'},
+                                                  {'name': 'mem'}]))
+        self.assertEqual(['cpu', 'mem'],
+                         [list(result)[0].name for result in results])
+
+    def test_exists(self):
+        self.responses.append(FakeResponse(content=b'[false]'))
+        self.assertFalse(self._run(self.client.exists({'name': 'cpu'})))
+
+    def test_exists_many(self):
+        self.responses.append(FakeResponse(content=b'[false,true]'))
+        self.assertEqual([True, False], self._run(self.client.exists_many(
+            [{'name': 'cpu'}, {'name': 'mem'}])))
+        self.assertEqual(1, len(self.calls))
+
+    def test_set(self):
+        self.responses.append(FakeResponse())
+        metric = {'name': 'cpu', 'tags': {}, 'value': 1,
+                  'position': {'timestamp': 1}}
+        added = self._run(self.client.set(metric))
+        self.assertEqual(1, len(added))
+        method, url, headers, data = self.calls[0]
+        self.assertEqual(self.warp10_url + '/update', url)
+        self.assertEqual('write', headers['X-Warp10-Token'])
+
+    def test_unexpected_status(self):
+        response = FakeResponse(status=503)
+        self.responses.append(response)
+        self.assertRaises(requests.RequestException, self._run,
+                          self.client.get({'name': 'cpu'}))
+        response.release.assert_called_once_with()
+
+    def test_delete(self):
+        self.responses.extend([FakeResponse(content=b'cpu{a=b}\n'),
+                               FakeResponse(content=b'mem{}\nmem{c=d}\n')])
+        self.assertEqual(3, self._run(self.client.delete(
+            [{'name': 'cpu', 'tags': {'a': 'b'}}, {'name': 'mem'}])))
+        method, url, headers, params = self.calls[0]
+        self.assertEqual('GET', method)
+        self.assertEqual(self.warp10_url + '/delete', url)
+        self.assertEqual({'selector': 'cpu{a=b}', 'deleteall': 'true'},
+                         params)
+
+    def test_find_and_resolve(self):
+        self.responses.extend([FakeResponse(
+            content=b'[[{"c":"cpu","l":{"host":"a"},"a":{}}]]')] * 2)
+        self.assertEqual([{'name': 'cpu', 'tags': {'host': 'a'}}],
+                         self._run(self.client.find({'name': '~c.*'})))
+        self.assertIn('FIND', self.calls[0][3])
+        self.assertEqual([{'name': 'cpu', 'tags': {'host': 'a'}}],
+                         self._run(self.client.resolve({'name': '~c.*'})))
+        self.assertRaises(ValueError, self._run,
+                          self.client.refresh_index())
+
+    def test_find_bypasses_cache(self):
+        self.responses.extend([FakeResponse()] * 2)
+        client = self._client(cache=MemoryCache())
+        self._run(client.find({'name': 'cpu'}))
+        self._run(client.find({'name': 'cpu'}))
+        self.assertEqual(2, len(self.calls))
+
+    def test_blocking_methods(self):
+        self.assertRaises(TypeError, self.client.__enter__)
+        self.assertRaises(TypeError, self.client.get_pages, {'name': 'cpu'})
+        self.assertRaises(TypeError, self.client.stream, {'name': 'cpu'})
+        self.assertRaises(TypeError, self.client.send_request, {}, '')
+
+    def test_streamed_body(self):
+        self.responses.append(FakeResponse())
+        self._run(self.client.set_serie('cpu', {}, [1, 2], [1, 2]))
+        data = self.calls[0][3]
+
+        async def read():
+            # NOTE: Asynchronous comprehensions need python 3.6.
+            chunks = list()
+            async for chunk in data:
+                chunks.append(chunk)
+            return b''.join(chunks)
+
+        self.assertEqual(b'1// cpu{} 1\n=2// 2\n', self._run(read()))
+
+    def test_timeout(self):
+        self.responses.extend([FakeResponse()] * 3)
+        self._run(self.client.get_all({'name': 'cpu'}))
+        self.assertIsNone(self.timeouts[0])
+        client = self._client(timeout=5)
+        self._run(client.get_all({'name': 'cpu'}))
+        self.assertEqual((5, 5), (self.timeouts[1].sock_connect,
+                                  self.timeouts[1].sock_read))
+        client = self._client(timeout=(1, 30))
+        self._run(client.get_all({'name': 'cpu'}))
+        self.assertEqual((1, 30), (self.timeouts[2].sock_connect,
+                                   self.timeouts[2].sock_read))
+
+    def test_retry(self):
+        failed = FakeResponse(status=503)
+        self.responses.extend([aio.aiohttp.ClientError('refused'), failed,
+                               FakeResponse()])
+        client = self._client(retry=RetryPolicy(attempts=3, backoff=0))
+        self.assertEqual(0, len(self._run(client.get_all({'name': 'cpu'}))))
+        self.assertEqual(3, len(self.calls))
+        failed.release.assert_called_once_with()
+
+    def test_retry_streamed_ingress(self):
+        self.responses.extend([FakeResponse(status=503), FakeResponse()])
+        client = self._client(retry=RetryPolicy(attempts=2, backoff=0,
+                                                retry_ingress=True))
+        self._run(client.set_serie('cpu', {}, [1, 2], [1, 2]))
+        self.assertEqual([b'1// cpu{} 1\n=2// 2\n'] * 2,
+                         [call[3] for call in self.calls])
+
+    def test_circuit_breaker(self):
+        self.responses.append(aio.aiohttp.ClientError('refused'))
+        client = self._client(circuit_breaker=CircuitBreaker(threshold=1))
+        self.assertRaises(aio.CallException, self._run,
+                          client.get({'name': 'cpu'}))
+        self.assertRaises(CircuitOpenException, self._run,
+                          client.get({'name': 'cpu'}))
+        self.assertEqual(1, len(self.calls))
+
+    def test_unsupported_options(self):
+        for option in ('pool_maxsize', 'interval_cache', 'instrumentation'):
+            self.assertRaises(ValueError, self._client,
+                              **{option: mock.Mock()})
@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+
+# NOTE: Test cases of the asyncio client use async def, which doesn't
+# compile before python 3.5. They are only imported where they can run.
+if sys.version_info >= (3, 5):
+    from warp10client.tests.unit._aio_cases import *  # noqa
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import fixtures
+from mock import mock
+
+from warp10client import cache
+from warp10client.tests import base
+from warp10client.timeserie import ColumnsBuilder
+from warp10client.timeserie import TimeserieSet
+
+
+class TestMemoryCacheTestCase(base.BaseTestCase):
+
+    def test_get_set(self):
+        memory_cache = cache.MemoryCache()
+        self.assertIsNone(memory_cache.get('a'))
+        memory_cache.set('a', b'value')
+        self.assertEqual(b'value', memory_cache.get('a'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 0},
+                         memory_cache.stats)
+
+    @mock.patch('time.time')
+    def test_ttl(self, mock_time):
+        mock_time.return_value = 100
+        memory_cache = cache.MemoryCache(ttl=10)
+        memory_cache.set('a', b'value')
+        memory_cache.set('b', b'value', ttl=30)
+        mock_time.return_value = 111
+        self.assertIsNone(memory_cache.get('a'))
+        self.assertEqual(b'value', memory_cache.get('b'))
+        self.assertEqual(1, len(memory_cache))
+
+    def test_lru_eviction(self):
+        memory_cache = cache.MemoryCache(max_entries=2)
+        memory_cache.set('a', b'1')
+        memory_cache.set('b', b'2')
+        memory_cache.get('a')
+        memory_cache.set('c', b'3')
+        self.assertIsNone(memory_cache.get('b'))
+        self.assertEqual(b'1', memory_cache.get('a'))
+        self.assertEqual(b'3', memory_cache.get('c'))
+        self.assertEqual(1, memory_cache.stats['evictions'])
+
+    def test_max_bytes(self):
+        memory_cache = cache.MemoryCache(max_bytes=10)
+        memory_cache.set('a', b'x' * 6)
+        memory_cache.set('b', b'x' * 6)
+        self.assertEqual(1, len(memory_cache))
+        self.assertIsNone(memory_cache.get('a'))
+
+
+class TestDiskCacheTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestDiskCacheTestCase, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+
+    def test_get_set(self):
+        disk_cache = cache.DiskCache(self.directory)
+        self.assertIsNone(disk_cache.get('a'))
+        disk_cache.set('a', b'[[]]\n')
+        self.assertEqual(b'[[]]\n', disk_cache.get('a'))
+        self.assertEqual(b'[[]]\n',
+                         cache.DiskCache(self.directory).get('a'))
+        disk_cache.delete('a')
+        self.assertIsNone(disk_cache.get('a'))
+
+    def test_ttl(self):
+        disk_cache = cache.DiskCache(self.directory)
+        disk_cache.set('a', b'value', ttl=-1)
+        self.assertIsNone(disk_cache.get('a'))
+        self.assertEqual(0, len(disk_cache))
+
+    def test_eviction(self):
+        disk_cache = cache.DiskCache(self.directory, max_entries=2)
+        for key in ('a', 'b', 'c'):
+            disk_cache.set(key, key.encode('utf-8'))
+        self.assertEqual(2, len(disk_cache))
+        self.assertEqual(1, disk_cache.stats['evictions'])
+        disk_cache.clear()
+        self.assertEqual(0, len(disk_cache))
+
+
+class TestIntervalCacheTestCase(base.BaseTestCase):
+
+    @staticmethod
+    def _serie(*points):
+        builder = ColumnsBuilder()
+        for timestamp, value in points:
+            builder.append(timestamp, None, None, None, value)
+        return TimeserieSet([builder.build(name='cpu', tags={'a': '1'})])
+
+    def test_gaps(self):
+        interval_cache = cache.IntervalCache()
+        self.assertEqual([(0, 100)], interval_cache.get_gaps('k', 0, 100))
+        interval_cache.update('k', 20, 40, TimeserieSet())
+        interval_cache.update('k', 60, 70, TimeserieSet())
+        self.assertEqual([(0, 19), (41, 59), (71, 100)],
+                         interval_cache.get_gaps('k', 0, 100))
+        self.assertEqual([], interval_cache.get_gaps('k', 25, 35))
+        interval_cache.update('k', 41, 59, TimeserieSet())
+        self.assertEqual([(10, 19), (71, 80)],
+                         interval_cache.get_gaps('k', 10, 80))
+
+    def test_covered_end(self):
+        interval_cache = cache.IntervalCache()
+        interval_cache.update('k', 0, 100, TimeserieSet(), covered_end=80)
+        self.assertEqual([(81, 100)], interval_cache.get_gaps('k', 0, 100))
+
+    def test_merge_points(self):
+        interval_cache = cache.IntervalCache()
+        interval_cache.update('k', 0, 10, self._serie((10, 1), (5, 2)))
+        interval_cache.update('k', 11, 20, self._serie((15, 3)))
+        # NOTE: Refetched ranges replace previous datapoints.
+        interval_cache.update('k', 8, 12, self._serie((9, 4)))
+        timeserie = interval_cache.get('k', 0, 20).get('cpu', {'a': '1'})
+        self.assertEqual([5, 9, 15], list(timeserie.timestamps))
+        self.assertEqual([2, 4, 3], list(timeserie.values))
+        timeserie = interval_cache.get('k', 6, 10).get('cpu', {'a': '1'})
+        self.assertEqual([9], list(timeserie.timestamps))
+
+    def test_max_age(self):
+        interval_cache = cache.IntervalCache(max_age=10)
+        interval_cache.update('k', 0, 30, self._serie((5, 1), (25, 2)))
+        timeserie = interval_cache.get('k', 0, 30).get('cpu', {'a': '1'})
+        self.assertEqual([25], list(timeserie.timestamps))
+        self.assertEqual([(0, 19)], interval_cache.get_gaps('k', 0, 30))
+
+    def test_lru_eviction(self):
+        interval_cache = cache.IntervalCache(max_entries=1)
+        interval_cache.update('a', 0, 10, TimeserieSet())
+        interval_cache.update('b', 0, 10, TimeserieSet())
+        self.assertEqual([(0, 10)], interval_cache.get_gaps('a', 0, 10))
+
+
+class TestExistsCacheTestCase(base.BaseTestCase):
+
+    @mock.patch('time.time')
+    def test_ttls(self, mock_time):
+        mock_time.return_value = 100
+        exists_cache = cache.ExistsCache(positive_ttl=60, negative_ttl=10)
+        self.assertIsNone(exists_cache.get('a'))
+        exists_cache.set('a', True)
+        exists_cache.set('b', False)
+        self.assertTrue(exists_cache.get('a'))
+        self.assertFalse(exists_cache.get('b'))
+        mock_time.return_value = 111
+        self.assertTrue(exists_cache.get('a'))
+        self.assertIsNone(exists_cache.get('b'))
@@ -1,14 +1,21 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import collections
 import uuid
+import zlib
 
 from mock import mock
 import requests
 
 import warp10client
+from warp10client.cache import ExistsCache
+from warp10client.cache import IntervalCache
+from warp10client.cache import MemoryCache
+from warp10client import encoder
 from warp10client.tests import base
 from warp10client.timeserie import Timeserie
+from warp10client.timeserie import TimeserieSet
 
 
 class TestWarp10ClientTestCase(base.BaseTestCase):
@@ -93,6 +100,95 @@ class TestWarp10ClientTestCase(base.BaseTestCase):
                                                       data=mock.ANY,
                                                       headers=expected_headers)
 
+    def test_set_streams_body(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        metrics = (dict(self.metric_write, value=i) for i in range(3))
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            client.WRITE_CHUNK_SIZE = 1
+            self.assertIsNone(client.set(metrics, return_metrics=False))
+            body = self.mock_session.post.call_args[1]['data']
+            self.assertNotIsInstance(body, (list, bytes))
+            chunks = list(body)
+            self.assertEqual(3, len(chunks))
+            self.assertTrue(chunks[0].startswith(
+                b'1506398400000000// cpu_util{'))
+            self.assertTrue(chunks[0].endswith(b'} 0\n'))
+            self.assertEqual(b'=1506398400000000// 2\n', chunks[2])
+
+    def test_set_serie(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            self.assertEqual(2, client.set_serie('cpu', {'unit': '%'},
+                                                 [1, 2], [0.5, 1]))
+            body = b''.join(self.mock_session.post.call_args[1]['data'])
+            self.assertEqual(b'1// cpu{unit=%25} 0.5\n=2// 1\n', body)
+
+    def test_set_returns_metrics(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            added_metrics = client.set(self.metric_write)
+            self.assertEqual(1, len(added_metrics))
+            self.assertIsInstance(added_metrics[0], warp10client.Metric)
+            self.assertEqual(self.expected_value, added_metrics[0].value)
+            body = b''.join(self.mock_session.post.call_args[1]['data'])
+            self.assertEqual(
+                (added_metrics[0].format_metric() + '\n').encode('utf-8'),
+                body)
+
+    def test_call_ingress_gzip(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url,
+                                               compression='gzip',
+                                               compression_threshold=10)
+            client.set([self.metric_write] * 10)
+            kwargs = self.mock_session.post.call_args[1]
+            self.assertEqual('application/gzip',
+                             kwargs['headers']['Content-Type'])
+            body = zlib.decompress(b''.join(kwargs['data']),
+                                   16 + zlib.MAX_WBITS)
+            self.assertEqual(10, body.count(b'\n'))
+
+            client._compression_threshold = 10 ** 6
+            client.set(self.metric_write)
+            kwargs = self.mock_session.post.call_args[1]
+            self.assertEqual('text/plain', kwargs['headers']['Content-Type'])
+
+    def test_call_fetch_gzip(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url,
+                                               compression='gzip')
+            client._call(self.metric_get, call_type='fetch')
+            # NOTE: The session default Accept-Encoding is kept.
+            headers = self.mock_session.post.call_args[1]['headers']
+            self.assertNotIn('Accept-Encoding', headers)
+            self.assertRaises(ValueError, warp10client.Warp10Client,
+                              compression='lz4')
+
     def test_get_resp_200(self):
         self.mock_response.status_code = 200
         self.mock_session.post = mock.Mock(return_value=self.mock_response)
@@ -123,6 +219,376 @@ class TestWarp10ClientTestCase(base.BaseTestCase):
             self.assertEqual(timeserie.metrics[0].position.timestamp,
                              self.expected_timestamp)
 
+    def test_get_all(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = \
+            '[[{{"c":"{0}","l":{{"resource_id":"a"}},"a":{{}},'\
+            '"v":[[1,1.5],[2,2.5]]}},'\
+            '{{"c":"{0}","l":{{"resource_id":"b"}},"a":{{}},'\
+            '"v":[[1,3]]}}]]'.format(self.metric_name)
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            timeseries = client.get_all(self.metric_get)
+            self.assertIsInstance(timeseries, TimeserieSet)
+            self.assertEqual(1, self.mock_session.post.call_count)
+            self.assertEqual(2, len(timeseries))
+            serie_a = timeseries.get(self.metric_name, {'resource_id': 'a'})
+            serie_b = timeseries['cpu_util{resource_id=b}']
+            self.assertEqual([1.5, 2.5], [m.value for m in serie_a])
+            self.assertEqual([3], [m.value for m in serie_b])
+
+    def test_get_all_columns(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = \
+            '[[["{0}",{{"resource_id":"a"}},[1,2],[1.5,2.5],[],[],[]],' \
+            '["{0}",{{"resource_id":"b"}},[1,2],[true,false],' \
+            '[48.5,NaN],[2.25,NaN],[null,100]]]]'.format(self.metric_name)
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url,
+                                               fetch_format='columns')
+            timeseries = client.get_all(self.metric_get)
+            script = self.mock_session.post.call_args[1]['data']
+            self.assertTrue(script.endswith(client.COLUMNS_SCRIPT))
+            serie_a = timeseries.get(self.metric_name, {'resource_id': 'a'})
+            serie_b = timeseries.get(self.metric_name, {'resource_id': 'b'})
+            self.assertEqual([1, 2], serie_a.timestamps.tolist())
+            self.assertEqual([1.5, 2.5], serie_a.values.tolist())
+            self.assertEqual(2, serie_a.stop)
+            self.assertIsNone(serie_a.latitudes)
+            self.assertIsNone(serie_a.elevations)
+            metrics = list(serie_b)
+            self.assertEqual([True, False], [m.value for m in metrics])
+            self.assertEqual((48.5, 2.25, ''),
+                             (metrics[0].position.latitude,
+                              metrics[0].position.longitude,
+                              metrics[0].position.elevation))
+            self.assertEqual((None, 100), (metrics[1].position.latitude,
+                                           metrics[1].position.elevation))
+
+    def test_fetch_format_per_metric(self):
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            self.assertNotIn('LMAP', client._gen_warp10_script(
+                self.metric_get))
+            self.assertIn('LMAP', client._gen_warp10_script(
+                dict(self.metric_get, format='columns')))
+            self.assertNotIn('LMAP', client._gen_exists_script(
+                dict(self.metric_get, format='columns')))
+        self.assertRaises(ValueError, warp10client.Warp10Client,
+                          fetch_format='xml')
+
+    def test_get_all_empty(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = '[[]]'
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            self.assertEqual(0, len(client.get_all(self.metric_get)))
+
+    def test_get_many(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        # NOTE: Stack is rendered from its top, i.e. the result
+        # of the last FETCH comes first.
+        self.mock_response.content = \
+            '[[{"c":"mem","l":{},"a":{},"v":[[1,2]]}],' \
+            '[{"c":"cpu_util","l":{},"a":{},"v":[[1,1]]}]]'
+        metric_mem = dict(self.metric_get, name='mem')
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            results = client.get_many([self.metric_get, metric_mem])
+            self.assertEqual(1, self.mock_session.post.call_count)
+            script = self.mock_session.post.call_args[1]['data']
+            self.assertEqual(2, script.count('FETCH'))
+            self.assertLess(script.index("'cpu_util'"), script.index("'mem'"))
+            self.assertEqual(['cpu_util', 'mem'],
+                             [list(result)[0].name for result in results])
+
+    def test_get_many_chunks(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = '[[],[]]'
+        # NOTE: One year bucketized by hour.
+        metrics = [dict(self.metric_get, name='m%d' % i) for i in range(4)]
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            self.assertEqual(4, len(client.get_many(metrics,
+                                                    max_points=20000)))
+            self.assertEqual(2, self.mock_session.post.call_count)
+
+            self.mock_session.post.reset_mock()
+            script_size = len(client._gen_warp10_script(metrics[0]))
+            client.get_many(metrics, max_script_size=script_size)
+            self.assertEqual(4, self.mock_session.post.call_count)
+
+    def test_get_expected_points(self):
+        get_expected_points = \
+            warp10client.Warp10Client._get_expected_points
+        self.assertEqual(8761, get_expected_points(self.metric_get))
+        self.assertEqual(10, get_expected_points({'expected_points': 10}))
+        self.assertIsNone(get_expected_points({'name': 'cpu_util'}))
+
+    def test_get_cache(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = \
+            '[[{"c":"cpu_util","l":{},"a":{},"v":[[1,1.5]]}]]'
+        memory_cache = MemoryCache()
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url,
+                                               cache=memory_cache)
+            first = client.get(self.metric_get)
+            second = client.get(self.metric_get)
+            self.assertEqual(1, self.mock_session.post.call_count)
+            self.assertEqual(first.metrics[0].value, second.metrics[0].value)
+            self.assertEqual(1, memory_cache.stats['hits'])
+            self.assertEqual(1, memory_cache.stats['misses'])
+
+    def test_get_cache_now_bound(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = '[[]]'
+        metric = {'name': 'cpu_util', 'tags': {'state': 'NOW'},
+                  'timestamp': {'start': '2017-01-01T00:00:00.000Z'}}
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url,
+                                               cache=MemoryCache())
+            client.get(metric)
+            client.get(metric)
+            self.assertEqual(2, self.mock_session.post.call_count)
+
+            client._cache_now_bound = True
+            client.get(metric)
+            client.get(metric)
+            self.assertEqual(3, self.mock_session.post.call_count)
+
+            # NOTE: NOW within a quoted label value is not a
+            # relative window.
+            metric['timestamp']['end'] = '2018-01-01T00:00:00.000Z'
+            client._cache_now_bound = False
+            client.get(metric)
+            client.get(metric)
+            self.assertEqual(4, self.mock_session.post.call_count)
+
+    @mock.patch('warp10client.common.timeutils.now')
+    def test_get_interval_cache(self, mock_now):
+        mock_now.return_value = 1500000000000000
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = \
+            '[[{"c":"cpu_util","l":{},"a":{},"v":[[1400000000000000,1.5]]}]]'
+        metric = {'name': 'cpu_util',
+                  'timestamp': {'start': '2014-05-13T16:53:20.000000Z',
+                                'end': '2016-03-15T05:20:00.000000Z'}}
+        interval_cache = IntervalCache(lag=0)
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url,
+                                               interval_cache=interval_cache)
+            timeserie = client.get(metric)
+            self.assertEqual([1400000000000000], list(timeserie.timestamps))
+            self.assertEqual(1, self.mock_session.post.call_count)
+
+            self.mock_response.content = '[[]]'
+            metric['timestamp']['end'] = '2017-07-14T02:40:00.000000Z'
+            timeseries = client.get_all(metric)
+            self.assertEqual(2, self.mock_session.post.call_count)
+            self.assertIn("'2016-03-15T05:20:00.000001Z' "
+                          "'2017-07-14T02:40:00.000000Z'",
+                          self.mock_session.post.call_args[1]['data'])
+            self.assertEqual([1400000000000000],
+                             list(timeseries.get('cpu_util').timestamps))
+
+            client.get(metric)
+            self.assertEqual(2, self.mock_session.post.call_count)
+
+    @mock.patch('warp10client.common.timeutils.now')
+    def test_get_interval_cache_aggregate(self, mock_now):
+        mock_now.return_value = 10000000
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = '[[]]'
+        metric = {'name': 'cpu_util',
+                  'timestamp': {'start': '1970-01-01T00:00:00.500000Z'},
+                  'aggregate': {'type': 'mean', 'span': 2000000}}
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(
+                write_token=self.write_token, read_token=self.read_token,
+                warp10_api_url=self.warp10_url,
+                interval_cache=IntervalCache(lag=3000000))
+            client.get(metric)
+            script = self.mock_session.post.call_args[1]['data']
+            self.assertIn("'1970-01-01T00:00:00.000001Z' "
+                          "'1970-01-01T00:00:10.000000Z'", script)
+            self.assertIn('bucketizer.mean 10000000 2000000 0', script)
+
+            mock_now.return_value = 11000000
+            client.get(metric)
+            script = self.mock_session.post.call_args[1]['data']
+            self.assertIn("'1970-01-01T00:00:06.000001Z' "
+                          "'1970-01-01T00:00:12.000000Z'", script)
+
+    def test_get_pages_windows(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.mock_response.content = '[[]]'
+        metric = {'name': 'cpu_util',
+                  'timestamp': {'start': '1970-01-01T00:00:00.500000Z',
+                                'end': '1970-01-01T00:00:05.000000Z'},
+                  'aggregate': {'type': 'max', 'span': 2000000}}
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            pages = client.get_pages(metric, window=3000000)
+            self.assertEqual(0, self.mock_session.post.call_count)
+            self.assertEqual(3, len(list(pages)))
+        scripts = [call[1]['data']
+                   for call in self.mock_session.post.call_args_list]
+        # NOTE: Windows are aligned on the aggregation span.
+        self.assertIn("'1970-01-01T00:00:00.000001Z' "
+                      "'1970-01-01T00:00:02.000000Z'", scripts[0])
+        self.assertIn('bucketizer.max 2000000 2000000 0', scripts[0])
+        self.assertIn("'1970-01-01T00:00:04.000001Z' "
+                      "'1970-01-01T00:00:06.000000Z'", scripts[2])
+
+    def test_get_pages_count(self):
+        responses = [
+            '[[{"c":"a","l":{},"a":{},"v":[[9,1],[8,1]]},'
+            '{"c":"b","l":{},"a":{},"v":[[7,2],[5,2]]}]]',
+            '[[{"c":"a","l":{},"a":{},"v":[[7,1],[6,1]]},'
+            '{"c":"b","l":{},"a":{},"v":[[7,2],[5,2]]}]]',
+            '[[{"c":"a","l":{},"a":{},"v":[[5,1]]},'
+            '{"c":"b","l":{},"a":{},"v":[[5,2],[4,2]]}]]',
+            '[[{"c":"b","l":{},"a":{},"v":[[3,2]]}]]',
+        ]
+        self.mock_session.post = mock.Mock(side_effect=[
+            mock.Mock(status_code=200, content=content)
+            for content in responses])
+        metric = {'name': '~.*',
+                  'timestamp': {'end': '1970-01-01T00:00:00.000010Z'}}
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            pages = list(client.get_pages(metric, page_size=2))
+        self.assertIn("'1970-01-01T00:00:00.000010Z' TOTIMESTAMP -2",
+                      self.mock_session.post.call_args_list[0][1]['data'])
+        self.assertIn("'1970-01-01T00:00:00.000007Z' TOTIMESTAMP -2",
+                      self.mock_session.post.call_args_list[1][1]['data'])
+        self.assertEqual(4, self.mock_session.post.call_count)
+        timestamps = dict()
+        for page in pages:
+            for timeserie in page:
+                timestamps.setdefault(timeserie.name, []).extend(
+                    timeserie.timestamps)
+        self.assertEqual({'a': [9, 8, 7, 6, 5], 'b': [7, 5, 4, 3]},
+                         timestamps)
+
+    def test_get_pages_count_aggregate(self):
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            pages = client.get_pages({'name': 'cpu_util',
+                                      'aggregate': {'type': 'max'}})
+            self.assertRaises(ValueError, list, pages)
+
+    def test_get_log_data(self):
+        client = warp10client.Warp10Client(read_token='secret',
+                                           write_token=self.write_token)
+        client.LOG_PREVIEW_SIZE = 22
+        self.assertEqual("[ '<token>' 'a' ] FETCH",
+                         client._get_log_data("[ 'secret' 'a' ] FETCH"))
+        self.assertEqual('%s... (30 bytes)' % ('a' * 22),
+                         client._get_log_data(b'a' * 30))
+        # NOTE: Characters cut by the preview are dropped.
+        self.assertEqual('%s... (23 bytes)' % ('a' * 21),
+                         client._get_log_data(b'a' * 21 + u'\xe9'.encode(
+                             'utf-8')))
+        self.assertEqual('<binary body>',
+                         client._get_log_data(b'\x1f\x8b\x08\xff' * 10))
+        self.assertEqual('<streamed body>',
+                         client._get_log_data(iter([b'a'])))
+
+    @mock.patch('warp10client.client.LOG')
+    def test_call_debug_off(self, mock_log):
+        mock_log.isEnabledFor.return_value = False
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            with mock.patch.object(client, '_get_log_data') as mock_data:
+                client._call('1// a{} 1\n', call_type='ingress')
+                self.assertFalse(mock_data.called)
+                self.assertFalse(mock_log.debug.called)
+
+                mock_log.isEnabledFor.return_value = True
+                client._call('1// a{} 1\n', call_type='ingress')
+                self.assertTrue(mock_data.called)
+                self.assertTrue(mock_log.debug.called)
+
+    def test_stream(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        resp_content = '[[{{"c":"{}","l":{{"resource_id":"{}"}},"a":{{}},'\
+                       '"v":[[{},{}],[{},48.1,2.3,{}]]}}]]'.format(
+                           self.metric_name, self.resource_id,
+                           self.expected_timestamp, self.expected_value,
+                           self.expected_timestamp + 1, self.expected_value)
+        self.mock_response.iter_content = mock.Mock(
+            return_value=iter([resp_content[:20].encode('utf-8'),
+                               resp_content[20:].encode('utf-8')]))
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            metrics = list(client.stream(self.metric_get))
+            self.mock_session.post.assert_called_with(
+                self.warp10_url + '/exec', data=mock.ANY,
+                headers=mock.ANY, stream=True)
+            self.assertEqual(2, len(metrics))
+            self.assertEqual(self.metric_name, metrics[0].name)
+            self.assertEqual(self.expected_value, metrics[0].value)
+            self.assertEqual({'resource_id': self.resource_id},
+                             metrics[0]._tags)
+            self.assertEqual(48.1, metrics[1].position.latitude)
+            self.assertEqual(2.3, metrics[1].position.longitude)
+            self.mock_response.close.assert_called_once_with()
+
     def test_get_resp_503(self):
         self.mock_response.status_code = 503
         self.mock_session.post = mock.Mock(return_value=self.mock_response)
@@ -137,32 +603,31 @@ class TestWarp10ClientTestCase(base.BaseTestCase):
     def test_exists_metric_exists(self):
         mock_response = mock.Mock()
         mock_response.status_code.return_value = 200
-        string_args = [self.metric_name, self.resource_id,
-                       self.project_id, self.app, "{}",
-                       self.expected_timestamp, self.expected_value]
-
-        resp_content = '[[{{"c":"{}","l":{{"resource_id":"{}",'\
-                       '"project_id":"{}",".app":"{}"}},"a":{}'\
-                       ',"v":[[{},{}]]}}]]'.format(*string_args)
-
-        mock_response.content = resp_content
+        mock_response.content = '[true]'
 
         with mock.patch(
                 'requests.Session', return_value=self.mock_session
         ), mock.patch(
                 'warp10client.client.Warp10Client._call',
                 return_value=mock_response
-        ):
+        ) as mock_call:
             client = warp10client.Warp10Client(write_token=self.write_token,
                                                read_token=self.read_token,
                                                warp10_api_url=self.warp10_url)
             self.assertTrue(client.exists(self.metric_get))
+        script = mock_call.call_args[0][0]
+        # NOTE: A single datapoint is fetched even with a start,
+        # its tick is checked by Warp10.
+        self.assertIn("'2018-01-01T00:00:00.000Z' TOTIMESTAMP -1 ] FETCH  "
+                      "false SWAP <% LASTTICK '2017-01-01T00:00:00.000Z' "
+                      "TOTIMESTAMP >= || %> FOREACH ", script)
+        self.assertNotIn('BUCKETIZE', script)
 
     def test_exists_non_exist(self):
         mock_response = mock.Mock()
         mock_response.status_code.return_value = 200
 
-        resp_content = '[[]]'
+        resp_content = '[false]'
         mock_response.content = resp_content
 
         with mock.patch(
@@ -170,19 +635,99 @@ class TestWarp10ClientTestCase(base.BaseTestCase):
         ), mock.patch(
                 'warp10client.client.Warp10Client._call',
                 return_value=mock_response
-        ):
+        ) as mock_call:
             client = warp10client.Warp10Client(write_token=self.write_token,
                                                read_token=self.read_token,
                                                warp10_api_url=self.warp10_url)
-            self.assertFalse(client.exists(self.metric_get))
+            self.assertFalse(client.exists({'name': self.metric_name}))
+        # NOTE: Only the last datapoint is fetched.
+        self.assertIn('NOW -1 ] FETCH', mock_call.call_args[0][0])
+
+    def test_exists_many(self):
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(side_effect=[
+            mock.Mock(status_code=200, content='[false,true]'),
+            mock.Mock(status_code=200, content='[true]'),
+            mock.Mock(status_code=200, content='[false]')])
+        metrics = [{'name': 'a'}, {'name': 'b'}, {'name': 'c'}]
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(
+                write_token=self.write_token, read_token=self.read_token,
+                warp10_api_url=self.warp10_url,
+                exists_cache=ExistsCache())
+            script_size = len(client._gen_exists_script(metrics[0]))
+            self.assertEqual([True, False, True], client.exists_many(
+                metrics, max_script_size=script_size * 2))
+            self.assertEqual(2, self.mock_session.post.call_count)
+            self.assertIn("'a'", self.mock_session.post.call_args_list[0][1][
+                'data'])
+
+            # NOTE: Cached results are not checked again.
+            self.assertEqual([True, False, True, False], client.exists_many(
+                metrics + [{'name': 'd'}]))
+            self.assertEqual(3, self.mock_session.post.call_count)
+            self.assertNotIn("'a'", self.mock_session.post.call_args[1][
+                'data'])
 
     def test_delete(self):
+        self.mock_response.status_code = 200
+        self.mock_response.content = b'cpu_util{project_id=a,unit=b}\n'
+        self.mock_session.get = mock.Mock(return_value=self.mock_response)
+
         with mock.patch('requests.Session', return_value=self.mock_session):
             client = warp10client.Warp10Client(write_token=self.write_token,
                                                read_token=self.read_token,
                                                warp10_api_url=self.warp10_url)
-            self.assertRaises(NotImplementedError,
-                              client.delete, self.metric_write)
+            self.assertEqual(1, client.delete(self.metric_write))
+        self.mock_session.get.assert_called_once_with(
+            self.warp10_url + '/delete',
+            headers={'X-Warp10-Token': self.write_token},
+            params={'selector': 'cpu_util{%s}' % ','.join(
+                '%s=%s' % (key, encoder.quote(value)) for key, value in
+                self.metric_write['tags'].items()),
+                'deleteall': 'true'})
+
+    def test_delete_selector(self):
+        client = warp10client.Warp10Client(write_token=self.write_token,
+                                           warp10_api_url=self.warp10_url)
+        self.assertEqual(
+            'cpu_util{host~web-.%2A,unit=%25,az=eu+1}',
+            client._get_delete_selector({
+                'name': 'cpu_util',
+                'tags': collections.OrderedDict([
+                    ('host', '~web-.*'), ('unit', '=%'), ('az', 'eu 1')])}))
+        self.assertEqual(
+            '~cpu%7B.%2B%7D{dc%2C1=a%3Db}',
+            client._get_delete_selector({'name': '~cpu{.+}',
+                                         'tags': {'dc,1': 'a=b'}}))
+
+    def test_delete_range(self):
+        self.mock_response.status_code = 200
+        self.mock_response.content = b'a{}\nb{}\n'
+        self.mock_session.get = mock.Mock(return_value=self.mock_response)
+        metric = {'name': '~cpu.*', 'tags': {'host': 'a', 'empty': ''},
+                  'timestamp': {'start': '1970-01-01T00:00:00.000000Z',
+                                'end': '1970-01-01T00:00:02.500000Z'}}
+
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(write_token=self.write_token,
+                                               read_token=self.read_token,
+                                               warp10_api_url=self.warp10_url)
+            self.assertEqual(2, client.delete(metric, dry_run=True,
+                                              window=1000000))
+            self.assertEqual({'selector': '~cpu.%2A{host=a}',
+                              'start': '1970-01-01T00:00:00.000000Z',
+                              'end': '1970-01-01T00:00:02.500000Z',
+                              'dryrun': 'true'},
+                             self.mock_session.get.call_args[1]['params'])
+
+            self.assertEqual(6, client.delete([metric], window=1000000))
+            self.assertEqual(4, self.mock_session.get.call_count)
+            self.assertEqual({'selector': '~cpu.%2A{host=a}',
+                              'start': '1970-01-01T00:00:02.000000Z',
+                              'end': '1970-01-01T00:00:02.500000Z'},
+                             self.mock_session.get.call_args[1]['params'])
 
     def test__call__gen_requests_body(self):
         with mock.patch('warp10client.client.Warp10Client._gen_request_body',
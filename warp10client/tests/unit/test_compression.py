@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import zlib
+
+from warp10client.common import compression
+from warp10client.tests import base
+
+
+def gunzip(data):
+    return zlib.decompress(data, compression.GZIP_WBITS)
+
+
+class TestCompressionTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCompressionTestCase, self).setUp()
+        self.line = b'1506398400000000// cpu_util{resource_id=abc} 1\n'
+
+    def test_gzip_chunks(self):
+        data = b''.join(compression.gzip_chunks([self.line, u'é'], level=1))
+        self.assertEqual(self.line + u'é'.encode('utf-8'), gunzip(data))
+
+    def test_gzip_body_bytes(self):
+        body, compressed = compression.gzip_body(self.line * 100,
+                                                 threshold=100)
+        self.assertTrue(compressed)
+        self.assertLess(len(body), len(self.line) * 10)
+        self.assertEqual(self.line * 100, gunzip(body))
+
+    def test_gzip_body_below_threshold(self):
+        self.assertEqual((self.line, False),
+                         compression.gzip_body(self.line.decode('utf-8'),
+                                               threshold=1024))
+
+    def test_gzip_body_iterable(self):
+        body, compressed = compression.gzip_body(
+            iter([self.line] * 100), threshold=len(self.line) * 2)
+        self.assertTrue(compressed)
+        self.assertNotIsInstance(body, bytes)
+        self.assertEqual(self.line * 100, gunzip(b''.join(body)))
+
+    def test_gzip_body_small_iterable(self):
+        self.assertEqual((self.line * 2, False),
+                         compression.gzip_body(iter([self.line] * 2),
+                                               threshold=1024))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+
+from warp10client import decoder
+from warp10client.tests import base
+
+
+class TestDecoderTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestDecoderTestCase, self).setUp()
+        self.stack = [
+            [
+                {'c': 'cpu_util', 'l': {'host': 'a'}, 'a': {},
+                 'v': [[1506398400000000, 0.5],
+                       [1506398500000000, 12345678901],
+                       [1506398600000000, 'éèà']]},
+                {'c': 'cpu_util', 'l': {'host': 'b'}, 'a': {},
+                 'v': [[1506398400000000, 48.1, 2.3, 10, True]]},
+            ],
+            42,
+            [{'v': [[1, 2]], 'c': 'late_header', 'l': {}, 'a': {}}],
+        ]
+        self.content = json.dumps(self.stack,
+                                  ensure_ascii=False).encode('utf-8')
+
+    @staticmethod
+    def _chunks(content, size):
+        return (content[i:i + size] for i in range(0, len(content), size))
+
+    def test_loads(self):
+        self.assertEqual(self.stack, decoder.loads(self.content))
+
+    def test_loads_invalid(self):
+        self.assertRaises(decoder.DecodeException,
+                          decoder.loads, b'[[{"c":')
+
+    def test_split_value(self):
+        self.assertEqual((1, None, None, None, 2),
+                         decoder.split_value([1, 2]))
+        self.assertEqual((1, None, None, 3, 2),
+                         decoder.split_value([1, 3, 2]))
+        self.assertEqual((1, 4, 5, None, 2),
+                         decoder.split_value([1, 4, 5, 2]))
+        self.assertEqual((1, 4, 5, 3, 2),
+                         decoder.split_value([1, 4, 5, 3, 2]))
+        self.assertRaises(decoder.DecodeException,
+                          decoder.split_value, [1])
+
+    def test_iter_values(self):
+        expected = [
+            (0, 'cpu_util', [1506398400000000, 0.5]),
+            (0, 'cpu_util', [1506398500000000, 12345678901]),
+            (0, 'cpu_util', [1506398600000000, u'éèà']),
+            (0, 'cpu_util', [1506398400000000, 48.1, 2.3, 10, True]),
+            (2, 'late_header', [1, 2]),
+        ]
+        # NOTE: Tiny chunks split numbers and multi-byte
+        # characters across reads.
+        for size in (1, 3, 7, len(self.content)):
+            result = [(level, gts['c'], value) for level, gts, value in
+                      decoder.iter_values(self._chunks(self.content, size),
+                                          chunk_size=size)]
+            self.assertEqual(expected, result)
+
+    def test_iter_values_empty(self):
+        self.assertEqual([], list(decoder.iter_values([b'[[]]'])))
+        self.assertEqual([], list(decoder.iter_values([b'[]'])))
+
+    def test_iter_values_truncated(self):
+        self.assertRaises(decoder.DecodeException, list,
+                          decoder.iter_values([self.content[:-10]]))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import array
+
+from warp10client import encoder
+from warp10client.metric import Metric
+from warp10client.tests import base
+
+
+class TestEncoderTestCase(base.BaseTestCase):
+
+    def test_format_class(self):
+        self.assertEqual('cpu+util{unit=%25,host=a}',
+                         encoder.format_class('cpu util',
+                                              {'unit': '%', 'host': 'a',
+                                               'empty': ''}))
+        self.assertEqual('cpu{}', encoder.format_class('cpu'))
+        self.assertIs(encoder.format_class('cpu', {'host': 'a'}),
+                      encoder.format_class('cpu', {'host': 'a'}))
+
+    def test_cache_is_bounded(self):
+        original = encoder.CACHE_SIZE
+        encoder.CACHE_SIZE = 2
+        self.addCleanup(setattr, encoder, 'CACHE_SIZE', original)
+        for i in range(5):
+            encoder.format_class('cpu', {'host': str(i)})
+        self.assertLessEqual(len(encoder._classes), 2)
+        self.assertLessEqual(len(encoder._quoted), 2)
+
+    def test_format_value(self):
+        self.assertEqual('T', encoder.format_value(True))
+        self.assertEqual('F', encoder.format_value(False))
+        self.assertEqual("'up+and+running'",
+                         encoder.format_value('up and running'))
+        self.assertEqual('42', encoder.format_value(42))
+        self.assertEqual('0.5', encoder.format_value(0.5))
+
+    def test_format_position(self):
+        self.assertEqual('10//', encoder.format_position(10.0))
+        self.assertEqual('10/48.5:2.25/100',
+                         encoder.format_position(10, 48.5, 2.25, 100.0))
+
+    def test_metric_format_metric(self):
+        metric = Metric(name='cpu', value=1.5, tags={'host': 'a b'},
+                        position={'timestamp': 10, 'latitude': 48.5,
+                                  'longitude': 2.25, 'elevation': 100})
+        self.assertEqual('10/48.5:2.25/100 cpu{host=a+b} 1.5',
+                         metric.format_metric())
+
+    def test_gts_encoder(self):
+        gts_encoder = encoder.GTSEncoder('cpu', {'host': 'a'})
+        self.assertEqual(['1// cpu{host=a} 0.5', '=2// 1.5', "=3// 'x'"],
+                         list(gts_encoder.encode([1, 2, 3],
+                                                 [0.5, 1.5, 'x'])))
+
+    def test_gts_encoder_columns(self):
+        gts_encoder = encoder.GTSEncoder('cpu', {'host': 'a'})
+        self.assertEqual('1// cpu{host=a} 0.5\n=2// 1.5\n',
+                         gts_encoder.encode_body(array.array('q', [1, 2]),
+                                                 array.array('d',
+                                                             [0.5, 1.5])))
+
+    def test_gts_encoder_geo(self):
+        nan = float('nan')
+        gts_encoder = encoder.GTSEncoder('cpu')
+        self.assertEqual(['1/48.5:2.25/ cpu{} 1', '=2// 2'],
+                         list(gts_encoder.encode([1, 2], [1, 2],
+                                                 latitudes=[48.5, nan],
+                                                 longitudes=[2.25, nan])))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mock import mock
+
+import warp10client
+from warp10client.cache import MemoryCache
+from warp10client.index import LabelIndex
+from warp10client.tests import base
+
+
+class TestLabelIndexTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestLabelIndexTestCase, self).setUp()
+        self.index = LabelIndex()
+        self.index.update([
+            {'name': 'cpu', 'tags': {'host': 'a', 'dc': 'par'}},
+            {'name': 'cpu', 'tags': {'host': 'b', 'dc': 'waw'}},
+            {'name': 'mem', 'tags': {'host': 'a', 'dc': 'par', 'unit': ''}},
+        ])
+
+    def test_find(self):
+        self.assertEqual(3, len(self.index))
+        self.assertEqual([{'name': 'cpu', 'tags': {'host': 'a',
+                                                   'dc': 'par'}}],
+                         self.index.find({'name': 'cpu',
+                                          'tags': {'host': 'a'}}))
+        self.assertEqual(['cpu', 'mem'], [serie['name'] for serie in
+                                          self.index.find({'tags': {
+                                              'host': '=a', 'unit': ''}})])
+        self.assertEqual(2, len(self.index.find({'name': '~c.*'})))
+        self.assertEqual([], self.index.find({'name': '~c'}))
+        self.assertEqual(1, len(self.index.find({'tags': {'dc': '~w.*'}})))
+        self.assertEqual([], self.index.find({'tags': {'rack': '1'}}))
+        self.assertIn({'name': 'mem', 'tags': {'host': 'a', 'dc': 'par'}},
+                      self.index)
+
+    def test_label_values(self):
+        self.assertEqual(['a', 'b'], self.index.label_values('host'))
+        self.assertEqual(['par'], self.index.label_values(
+            'dc', {'name': 'mem'}))
+        self.assertEqual([], self.index.label_values('unit'))
+
+    def test_replace(self):
+        self.index.replace({'name': 'cpu'},
+                           [{'name': 'cpu', 'tags': {'host': 'c'}}])
+        self.assertEqual(['c'], self.index.label_values(
+            'host', {'name': 'cpu'}))
+        self.assertEqual(['a', 'c'], self.index.label_values('host'))
+        self.assertEqual(['par'], self.index.label_values('dc'))
+
+    def test_separators_in_values(self):
+        self.index.update([{'name': 'disk', 'tags': {'a': 'x,b=y'}},
+                           {'name': 'disk', 'tags': {'a': 'x', 'b': 'y'}}])
+        self.assertEqual(2, len(self.index.find({'name': 'disk'})))
+
+
+class TestClientFindTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestClientFindTestCase, self).setUp()
+        self.mock_session = mock.Mock()
+        patcher = mock.patch('requests.Session',
+                             return_value=self.mock_session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = LabelIndex()
+        self.client = warp10client.Warp10Client(
+            read_token='read', write_token='write',
+            warp10_api_url='http://warp10', label_index=self.index)
+
+    def test_find(self):
+        self.mock_session.post = mock.Mock(return_value=mock.Mock(
+            status_code=200,
+            content='[[{"c":"cpu","l":{"host":"~a"},"a":{},"v":[]},'
+                    '{"c":"cpu","l":{"host":"b"},"a":{},"v":[]}]]'))
+        self.assertEqual([{'name': 'cpu', 'tags': {'host': '~a'}},
+                          {'name': 'cpu', 'tags': {'host': 'b'}}],
+                         self.client.find({'name': 'cpu'}))
+        self.assertEqual("[ 'read' 'cpu' {} ] FIND ",
+                         self.mock_session.post.call_args[1]['data'])
+        self.assertEqual(2, len(self.index))
+
+        # NOTE: Resolved from the index, without calling
+        # Warp10.
+        metrics = self.client.resolve({'name': 'cpu',
+                                       'timestamp': {'start': 'x'}})
+        self.assertEqual(1, self.mock_session.post.call_count)
+        self.assertEqual([{'name': 'cpu', 'tags': {'host': 'b'},
+                           'timestamp': {'start': 'x'}},
+                          {'name': 'cpu', 'tags': {'host': '=~a'},
+                           'timestamp': {'start': 'x'}}], metrics)
+
+    def test_find_bypasses_cache(self):
+        self.mock_session.post = mock.Mock(return_value=mock.Mock(
+            status_code=200, content='[[]]'))
+        client = warp10client.Warp10Client(
+            read_token='read', warp10_api_url='http://warp10',
+            cache=MemoryCache())
+        client.find({'name': 'cpu'})
+        client.find({'name': 'cpu'})
+        self.assertEqual(2, self.mock_session.post.call_count)
+
+    def test_refresh_index_from_writes(self):
+        def post(url, headers=None, data=None):
+            b''.join(data)
+            return mock.Mock(status_code=200)
+
+        self.mock_session.post = mock.Mock(side_effect=post)
+        self.client.set({'name': 'cpu', 'tags': {'host': 'a'}, 'value': 1,
+                         'position': {'timestamp': 1}})
+        self.client.set_serie('mem', {'host': 'a'}, [1], [1])
+        self.assertEqual(['cpu', 'mem'], [serie['name'] for serie in
+                                          self.index.find({'tags': {
+                                              'host': 'a'}})])
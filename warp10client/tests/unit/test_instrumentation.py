@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mock import mock
+
+import warp10client
+from warp10client import instrumentation
+from warp10client.tests import base
+
+
+class TestHistogramTestCase(base.BaseTestCase):
+
+    def test_percentile(self):
+        histogram = instrumentation.Histogram()
+        self.assertEqual(0.0, histogram.percentile(50))
+        for value in (0.0001, 0.002, 0.003, 0.7):
+            histogram.add(value)
+        self.assertEqual(4, histogram.count)
+        self.assertEqual(0.0025, histogram.percentile(50))
+        self.assertEqual(0.7, histogram.percentile(99))
+        self.assertEqual(0.7, histogram.max)
+
+
+class TestStatsTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestStatsTestCase, self).setUp()
+        self.mock_session = mock.Mock()
+        patcher = mock.patch('requests.Session',
+                             return_value=self.mock_session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stats = instrumentation.Stats()
+        self.client = warp10client.Warp10Client(
+            read_token='read', write_token='write',
+            warp10_api_url='http://warp10', instrumentation=self.stats)
+
+    def test_fetch(self):
+        content = '[[{"c":"cpu","l":{},"a":{},"v":[[1,1.5],[2,2.5]]}]]'
+        self.mock_session.post = mock.Mock(
+            return_value=mock.Mock(status_code=200, content=content))
+        self.client.get_all({'name': 'cpu'})
+        stats = self.stats.calls['fetch']
+        self.assertEqual(1, stats['calls'])
+        self.assertEqual(2, stats['points'])
+        self.assertEqual(len(content), stats['bytes_received'])
+        self.assertTrue(stats['bytes_sent'] > 0)
+        for phase in instrumentation.PHASES:
+            self.assertEqual(1, stats[phase].count)
+
+    def test_ingress(self):
+        def post(url, headers=None, data=None):
+            # NOTE: Streamed bodies are counted while sent.
+            b''.join(data)
+            return mock.Mock(status_code=200, content=b'')
+
+        self.mock_session.post = mock.Mock(side_effect=post)
+        self.client.set_serie('cpu', {}, [1, 2, 3], [1, 2, 3])
+        stats = self.stats.calls['ingress']
+        self.assertEqual(3, stats['points'])
+        self.assertEqual(len(b'1// cpu{} 1\n=2// 2\n=3// 3\n'),
+                         stats['bytes_sent'])
+
+    def test_errors(self):
+        self.mock_session.post = mock.Mock(
+            return_value=mock.Mock(status_code=500, content=b''))
+        self.assertRaises(Exception, self.client.get, {'name': 'cpu'})
+        self.mock_session.post = mock.Mock(side_effect=Exception('reset'))
+        self.assertRaises(Exception, self.client.get, {'name': 'cpu'})
+        self.assertEqual(2, self.stats.calls['fetch']['errors'])
+
+    def test_report(self):
+        self.stats.on_call('fetch', 10, 20)
+        self.stats.on_phase('fetch', 'network', 0.01)
+        writer = mock.Mock()
+        self.stats.report(writer, tags={'host': 'a'}, timestamp=1)
+        metrics = dict(((metric['name'], metric['tags'].get('phase')),
+                        metric) for metric in writer.write.call_args[0][0])
+        self.assertEqual(20, metrics[('warp10client.bytes_received',
+                                      None)]['value'])
+        metric = metrics[('warp10client.latency.p99', 'network')]
+        self.assertEqual({'host': 'a', 'call_type': 'fetch',
+                          'phase': 'network'}, metric['tags'])
+        self.assertEqual(1, metric['position']['timestamp'])
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections
+import threading
+import time
+
+from concurrent import futures
+from mock import mock
+
+from warp10client.metric import Metric
+from warp10client.metric import Tags
+from warp10client import parallel
+from warp10client import routing
+from warp10client.tests import base
+
+
+class TestOrderedMapTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOrderedMapTestCase, self).setUp()
+        self.executor = futures.ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_results_in_order(self):
+        def func(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 2
+
+        self.assertEqual([0, 2, 4, 6, 8],
+                         list(parallel.ordered_map(self.executor, func,
+                                                   range(5), 4)))
+
+    def test_max_in_flight(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'max': 0}
+
+        def func(item):
+            with lock:
+                state['running'] += 1
+                state['max'] = max(state['max'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+            return item
+
+        self.assertEqual(list(range(10)),
+                         list(parallel.ordered_map(self.executor, func,
+                                                   range(10), 2)))
+        self.assertEqual(2, state['max'])
+
+    def test_exception(self):
+        def func(item):
+            if item == 1:
+                raise ValueError(item)
+            return item
+
+        self.assertRaises(ValueError, list,
+                          parallel.ordered_map(self.executor, func,
+                                               range(3), 2))
+
+
+class TestConcurrentWarp10ClientTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestConcurrentWarp10ClientTestCase, self).setUp()
+        self.mock_session = mock.Mock()
+        self.mock_response = mock.Mock()
+        self.mock_response.status_code = 200
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.warp10_url = 'http://example.warp10.com'
+        patcher = mock.patch('requests.Session',
+                             return_value=self.mock_session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = parallel.ConcurrentWarp10Client(
+            max_workers=3, read_token='read', write_token='write',
+            warp10_api_url=self.warp10_url)
+        self.addCleanup(self.client.close)
+
+    def test_session_pool_size(self):
+        adapter = self.mock_session.mount.call_args[0][1]
+        self.assertEqual(3, adapter._pool_maxsize)
+        self.assertEqual(3, adapter._pool_connections)
+
+    def test_endpoint_pool_size(self):
+        read = routing.EndpointPool(['http://egress'], pool_maxsize=2)
+        write = routing.EndpointPool(['http://ingress'], pool_maxsize=32)
+        client = parallel.ConcurrentWarp10Client(
+            max_workers=16, read_token='read', write_token='write',
+            read_endpoints=read, write_endpoints=write)
+        self.addCleanup(client.close)
+        self.assertEqual((16, 32), (read.pool_maxsize, write.pool_maxsize))
+        adapter = read.endpoints[0].session.mount.call_args[0][1]
+        self.assertEqual(16, adapter._pool_maxsize)
+
+    def test_close(self):
+        with parallel.ConcurrentWarp10Client(
+                max_workers=2, warp10_api_url=self.warp10_url) as client:
+            executor = client._executor
+        self.assertRaises(RuntimeError, executor.submit, len, ())
+        self.mock_session.close.assert_called_once_with()
+
+    def test_parallel_get(self):
+        self.mock_response.content = \
+            '[[{"c":"cpu","l":{},"a":{},"v":[[1,1.5]]}]]'
+        metrics = [{'name': 'cpu%d' % i} for i in range(5)]
+        timeseries = self.client.parallel_get(metrics)
+        self.assertEqual(5, len(timeseries))
+        self.assertEqual(5, self.mock_session.post.call_count)
+        self.assertEqual(1.5, timeseries[0].metrics[0].value)
+
+    def test_parallel_exists(self):
+        self.mock_response.content = '[false]'
+        self.assertEqual([False, False],
+                         self.client.parallel_exists([{'name': 'a'},
+                                                      {'name': 'b'}]))
+
+    def test_parallel_set(self):
+        metric = {'name': 'cpu', 'tags': {}, 'value': 1,
+                  'position': {'timestamp': 1}}
+        added = self.client.parallel_set([metric, [metric, metric]])
+        self.assertEqual([1, 2], [len(metrics) for metrics in added])
+        self.assertEqual(2, self.mock_session.post.call_count)
+
+    def test_sharded_set(self):
+        bodies = list()
+
+        def post(url, headers=None, data=None):
+            bodies.append(b''.join(data).decode('utf-8'))
+            return self.mock_response
+
+        self.mock_session.post = mock.Mock(side_effect=post)
+        metrics = [{'name': 'cpu', 'tags': {'host': str(i % 3)}, 'value': i,
+                    'position': {'timestamp': i}} for i in range(9)]
+        self.assertEqual(9, self.client.sharded_set(metrics, shards=2))
+        self.assertEqual(len(set(parallel.get_shard(
+            'cpu{host=%d}' % i, 2) for i in range(3))), len(bodies))
+        lines = '\n'.join(bodies).split('\n')
+        self.assertEqual(3, len([line for line in lines if 'cpu{' in line]))
+        self.assertEqual(6, len([line for line in lines
+                                 if line.startswith('=')]))
+        for host in range(3):
+            body = [body for body in bodies
+                    if 'host=%d' % host in body][0]
+            self.assertIn('%d// cpu{host=%d} %d\n=%d// %d\n=%d// %d' % (
+                host, host, host, host + 3, host + 3, host + 6, host + 6),
+                body)
+
+    def test_get_shard(self):
+        self.assertEqual(parallel.get_shard('cpu{host=a}', 8),
+                         parallel.get_shard('cpu{host=a}', 8))
+        self.assertEqual(0, parallel.get_shard('cpu{host=a}', 1))
+
+    def test_sharded_set_tags_order(self):
+        bodies = list()
+
+        def post(url, headers=None, data=None):
+            bodies.append(b''.join(data).decode('utf-8'))
+            return self.mock_response
+
+        self.mock_session.post = mock.Mock(side_effect=post)
+        # NOTE: Interned labels keep the order they were first
+        # seen with, other processes may see another one.
+        metrics = [Metric('cpu', value=i, position={'timestamp': i},
+                          tags=Tags(collections.OrderedDict(sorted(
+                              {'host': 'a', 'dc': 'b', 'az': ''}.items(),
+                              reverse=bool(i % 2)))))
+                   for i in range(8)]
+        self.assertEqual(8, self.client.sharded_set(metrics, shards=8))
+        self.assertEqual(1, len(bodies))
+        self.assertEqual(list(range(8)), [
+            int(line.split(' ')[-1]) for line in bodies[0].splitlines()])
+
+    def test_get_pages(self):
+        def post(url, headers=None, data=None):
+            start = data.split("'")[5]
+            return mock.Mock(status_code=200, content='[[{"c":"cpu","l":{},'
+                             '"a":{},"v":[[1,"%s"]]}]]' % start)
+
+        self.mock_session.post = mock.Mock(side_effect=post)
+        pages = list(self.client.get_pages(
+            {'name': 'cpu', 'timestamp': {
+                'start': '1970-01-01T00:00:00.000000Z',
+                'end': '1970-01-01T00:00:09.999999Z'}}, window=2000000))
+        self.assertEqual(['1970-01-01T00:00:%02d.000000Z' % i
+                          for i in range(0, 10, 2)],
+                         [page.get('cpu').values[0] for page in pages])
+
+    def test_delete(self):
+        self.mock_response.content = b'cpu{}\n'
+        self.mock_session.get = mock.Mock(return_value=self.mock_response)
+        self.assertEqual(3, self.client.delete(
+            {'name': 'cpu', 'timestamp': {
+                'start': '1970-01-01T00:00:00.000000Z',
+                'end': '1970-01-01T00:00:02.999999Z'}}, window=1000000))
+        self.assertEqual(3, self.mock_session.get.call_count)
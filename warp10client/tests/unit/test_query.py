@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mock import mock
+
+import warp10client
+from warp10client.query import Query
+from warp10client.tests import base
+
+
+class TestQueryTestCase(base.BaseTestCase):
+
+    def test_pipeline(self):
+        query = Query('cpu_util', tags={'host': 'a'},
+                      start='2017-01-01T00:00:00.000Z')
+        query.bucketize('max', span=60000000, count=10).rate() \
+            .reduce('sum', labels=['host']).max_points(100)
+        self.assertEqual(
+            '[ SWAP  bucketizer.max 0 60000000 10 ] BUCKETIZE '
+            '[ SWAP  mapper.rate 1 0 0 ] MAP '
+            "[ SWAP [ 'host' ] reducer.sum ] REDUCE "
+            '100 LTTB', query.to_warpscript())
+        self.assertEqual(100, query['expected_points'])
+
+    def test_bucketize_percentile(self):
+        query = Query('cpu_util').bucketize('90pct')
+        self.assertEqual(
+            '[ SWAP 90.0 bucketizer.percentile 0 1000000 0 ] BUCKETIZE',
+            query.to_warpscript())
+
+    def test_invalid_steps(self):
+        query = Query('cpu_util')
+        self.assertRaises(NotImplementedError, query.bucketize, 'foo')
+        self.assertRaises(NotImplementedError, query.map, 'foo')
+        self.assertRaises(NotImplementedError, query.reduce, 'foo')
+
+    def test_client_script(self):
+        mock_session = mock.Mock()
+        mock_response = mock.Mock(status_code=200, content='[[]]')
+        mock_session.post = mock.Mock(return_value=mock_response)
+        query = Query('cpu_util', start='2017-01-01T00:00:00.000Z',
+                      end='2017-01-02T00:00:00.000Z').delta() \
+            .reduce('max')
+
+        with mock.patch('requests.Session', return_value=mock_session):
+            client = warp10client.Warp10Client(
+                read_token='token', warp10_api_url='http://warp10')
+            client.get_all(query)
+        self.assertEqual(
+            "[ 'token' 'cpu_util'  '2017-01-01T00:00:00.000Z' "
+            "'2017-01-02T00:00:00.000Z' ] FETCH  "
+            '[ SWAP  mapper.delta 1 0 0 ] MAP '
+            '[ SWAP [  ] reducer.max ] REDUCE ',
+            mock_session.post.call_args[1]['data'])
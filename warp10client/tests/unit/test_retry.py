@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mock import mock
+
+import warp10client
+from warp10client.client import CallException
+from warp10client import retry
+from warp10client.tests import base
+
+
+class TestRetryPolicyTestCase(base.BaseTestCase):
+
+    def test_backoff(self):
+        policy = retry.RetryPolicy(backoff=1, max_backoff=3)
+        for attempt in range(5):
+            backoff = policy.get_backoff(attempt)
+            self.assertTrue(0 <= backoff <= min(3, 2 ** attempt))
+
+    def test_retryable(self):
+        policy = retry.RetryPolicy(attempts=2)
+        self.assertTrue(policy.is_retryable('fetch'))
+        self.assertFalse(policy.is_retryable('ingress'))
+        self.assertTrue(policy.can_retry(0))
+        self.assertFalse(policy.can_retry(1))
+
+
+class TestCircuitBreakerTestCase(base.BaseTestCase):
+
+    @mock.patch('time.time')
+    def test_open_and_reset(self, mock_time):
+        mock_time.return_value = 100
+        breaker = retry.CircuitBreaker(threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.OPEN, breaker.state)
+        self.assertRaises(retry.CircuitOpenException, breaker.before_call)
+
+        mock_time.return_value = 111
+        breaker.before_call()
+        self.assertEqual(breaker.HALF_OPEN, breaker.state)
+        breaker.record_failure()
+        self.assertEqual(breaker.OPEN, breaker.state)
+
+        mock_time.return_value = 122
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.CLOSED, breaker.state)
+
+
+class TestClientRetryTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestClientRetryTestCase, self).setUp()
+        self.mock_session = mock.Mock()
+        patcher = mock.patch('requests.Session',
+                             return_value=self.mock_session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep_patcher = mock.patch('time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def _client(self, **kwargs):
+        return warp10client.Warp10Client(read_token='read',
+                                         write_token='write',
+                                         warp10_api_url='http://warp10',
+                                         **kwargs)
+
+    def test_fetch_retried(self):
+        self.mock_session.post = mock.Mock(side_effect=[
+            Exception('reset'),
+            mock.Mock(status_code=503),
+            mock.Mock(status_code=200, content='[[]]')])
+        client = self._client(retry=retry.RetryPolicy(attempts=3),
+                              timeout=(1, 5))
+        self.assertEqual(0, len(client.get({'name': 'cpu'})))
+        self.assertEqual(3, self.mock_session.post.call_count)
+        self.assertEqual(2, self.mock_sleep.call_count)
+        self.assertEqual((1, 5),
+                         self.mock_session.post.call_args[1]['timeout'])
+
+    def test_fetch_retries_exhausted(self):
+        self.mock_session.post = mock.Mock(
+            return_value=mock.Mock(status_code=503))
+        client = self._client(retry=retry.RetryPolicy(attempts=2))
+        self.assertRaises(Exception, client.get, {'name': 'cpu'})
+        self.assertEqual(2, self.mock_session.post.call_count)
+
+    def test_ingress_not_retried(self):
+        self.mock_session.post = mock.Mock(side_effect=Exception('reset'))
+        client = self._client(retry=retry.RetryPolicy(attempts=3))
+        self.assertRaises(CallException, client.set_serie, 'cpu', {}, [1],
+                          [1])
+        self.assertEqual(1, self.mock_session.post.call_count)
+
+    def test_ingress_retried(self):
+        self.mock_session.post = mock.Mock(side_effect=[
+            Exception('reset'), mock.Mock(status_code=200)])
+        client = self._client(
+            retry=retry.RetryPolicy(attempts=3, retry_ingress=True))
+        self.assertEqual(1, client.set_serie('cpu', {}, [1], [1]))
+        # NOTE: The body is materialized so it can be resent.
+        self.assertEqual(b'1// cpu{} 1\n',
+                         self.mock_session.post.call_args[1]['data'])
+
+    def test_circuit_breaker(self):
+        self.mock_session.post = mock.Mock(
+            return_value=mock.Mock(status_code=503))
+        client = self._client(
+            circuit_breaker=retry.CircuitBreaker(threshold=2))
+        self.assertRaises(Exception, client.get, {'name': 'cpu'})
+        self.assertRaises(Exception, client.get, {'name': 'cpu'})
+        self.assertRaises(retry.CircuitOpenException, client.get,
+                          {'name': 'cpu'})
+        self.assertEqual(2, self.mock_session.post.call_count)
+
+    def test_pool_size(self):
+        self._client(pool_maxsize=20)
+        adapter = self.mock_session.mount.call_args[0][1]
+        self.assertEqual(20, adapter._pool_maxsize)
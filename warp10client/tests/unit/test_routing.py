@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from mock import mock
+import requests
+
+import warp10client
+from warp10client.retry import RetryPolicy
+from warp10client import routing
+from warp10client.tests import base
+
+
+class TestEndpointPoolTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestEndpointPoolTestCase, self).setUp()
+        patch = mock.patch('requests.Session', side_effect=mock.Mock)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.urls = ['http://a/api/v0', 'http://b/api/v0/',
+                     'http://c/api/v0']
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, routing.EndpointPool, [])
+        self.assertRaises(ValueError, routing.EndpointPool, self.urls,
+                          strategy='random')
+
+    def test_least_in_flight(self):
+        pool = routing.EndpointPool(self.urls)
+        first = pool.acquire()
+        second = pool.acquire()
+        third = pool.acquire()
+        self.assertEqual(3, len(set([first, second, third])))
+        self.assertEqual('http://b/api/v0', second.url)
+        pool.release(second, 0.01, 200)
+        self.assertIs(second, pool.acquire())
+
+    def test_round_robin(self):
+        pool = routing.EndpointPool(self.urls, strategy='round_robin')
+        urls = list()
+        for _ in range(4):
+            endpoint = pool.acquire()
+            urls.append(endpoint.url)
+            pool.release(endpoint, 0.01, 200)
+        self.assertEqual(['http://a/api/v0', 'http://b/api/v0',
+                          'http://c/api/v0', 'http://a/api/v0'], urls)
+
+    def test_eject_on_failures(self):
+        pool = routing.EndpointPool(self.urls[:2], strategy='round_robin',
+                                    max_failures=2)
+        first = pool.endpoints[0]
+        pool.release(pool.acquire(), 0.01, 503)
+        pool.release(pool.acquire(), 0.01, 200)
+        pool.release(pool.acquire(), 0.01, None)
+        self.assertIsNotNone(first.ejected_until)
+        self.assertEqual([pool.endpoints[1]] * 2,
+                         [pool.acquire(), pool.acquire()])
+
+    def test_eject_on_latency(self):
+        pool = routing.EndpointPool(self.urls[:1], max_latency=0.5)
+        endpoint = pool.acquire()
+        pool.release(endpoint, 2.0, 200)
+        self.assertIsNotNone(endpoint.ejected_until)
+        # NOTE: All nodes are ejected, calls still go out.
+        self.assertIs(endpoint, pool.acquire())
+
+    def test_readmitted(self):
+        pool = routing.EndpointPool(self.urls[:1], max_failures=2,
+                                    eject_time=0)
+        endpoint = pool.endpoints[0]
+        for _ in range(2):
+            pool.release(pool.acquire(), 0.01, 502)
+        self.assertTrue(endpoint.is_healthy(endpoint.ejected_until))
+        self.assertEqual(1, endpoint.failures)
+        pool.release(pool.acquire(), 0.01, 200)
+        self.assertEqual(0, endpoint.failures)
+
+
+class TestClientRoutingTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestClientRoutingTestCase, self).setUp()
+        self.sessions = list()
+
+        def session():
+            new_session = mock.Mock()
+            new_session.post.return_value = mock.Mock(status_code=200,
+                                                      content=b'[[]]')
+            self.sessions.append(new_session)
+            return new_session
+
+        patch = mock.patch('requests.Session', side_effect=session)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_read_and_write_endpoints(self):
+        read = routing.EndpointPool(['http://egress-1', 'http://egress-2'])
+        write = routing.EndpointPool(['http://ingress'])
+        client = warp10client.Warp10Client(
+            read_token='read', write_token='write', read_endpoints=read,
+            write_endpoints=write)
+        client.get_all({'name': 'cpu_util'})
+        client.get_all({'name': 'cpu_util'})
+        client.set_serie('cpu_util', {}, [1], [1])
+        for endpoint in read.endpoints:
+            self.assertEqual('http://%s/exec' % endpoint.url.split('//')[1],
+                             endpoint.session.post.call_args[0][0])
+        self.assertEqual('http://ingress/update',
+                         write.endpoints[0].session.post.call_args[0][0])
+        self.assertFalse(self.sessions[-1].post.called)
+
+    def test_missing_endpoints(self):
+        read = routing.EndpointPool(['http://egress'])
+        self.assertRaises(ValueError, warp10client.Warp10Client,
+                          read_token='read', read_endpoints=read)
+        client = warp10client.Warp10Client(
+            read_token='read', write_token='write', read_endpoints=read,
+            warp10_api_url='http://warp10')
+        client.set_serie('cpu_util', {}, [1], [1])
+        self.assertEqual('http://warp10/update',
+                         self.sessions[-1].post.call_args[0][0])
+
+    def test_retry_on_another_node(self):
+        read = routing.EndpointPool(['http://egress-1', 'http://egress-2'])
+        read.endpoints[0].session.post.side_effect = \
+            requests.ConnectionError('refused')
+        client = warp10client.Warp10Client(
+            read_token='read', read_endpoints=read,
+            warp10_api_url='http://warp10',
+            retry=RetryPolicy(attempts=2, backoff=0))
+        self.assertEqual(0, len(client.get_all({'name': 'cpu_util'})))
+        self.assertEqual(1, read.endpoints[0].failures)
+        self.assertEqual(0, read.endpoints[1].in_flight)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import fixtures
+from mock import mock
+import requests
+
+import warp10client
+from warp10client import client as warp10_client
+from warp10client import spool
+from warp10client.tests import base
+
+
+class TestSpoolTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestSpoolTestCase, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+        self.line = b'1// cpu_util{resource_id=abc} 1\n'
+
+    def _spool(self, **kwargs):
+        new_spool = spool.Spool(self.directory, **kwargs)
+        self.addCleanup(new_spool.close)
+        return new_spool
+
+    def _segments(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_append_peek_ack(self):
+        new_spool = self._spool()
+        self.assertEqual((None, None), new_spool.peek())
+        self.assertTrue(new_spool.append(self.line))
+        new_spool.append(self.line.decode('utf-8').rstrip('\n'))
+        self.assertEqual(len(self.line) * 2, new_spool.pending_bytes)
+        position, data = new_spool.peek()
+        self.assertEqual(self.line * 2, data)
+        new_spool.ack(position)
+        self.assertEqual(0, new_spool.pending_bytes)
+        self.assertEqual((None, None), new_spool.peek())
+        self.assertEqual(len(self.line) * 2,
+                         new_spool.stats['replayed_bytes'])
+
+    def test_segments(self):
+        new_spool = self._spool(segment_bytes=len(self.line) * 2)
+        for _ in range(5):
+            new_spool.append(self.line)
+        self.assertEqual(3, len(self._segments()))
+        position, data = new_spool.peek()
+        self.assertEqual(self.line * 2, data)
+        new_spool.ack(position)
+        self.assertEqual(2, len(self._segments()))
+
+    def test_peek_keeps_continuation_lines(self):
+        new_spool = self._spool()
+        serie = self.line + b'=2// 2\n=3// 3\n'
+        new_spool.append(serie + self.line)
+        position, data = new_spool.peek(max_bytes=len(self.line) + 4)
+        self.assertEqual(serie, data)
+        new_spool.ack(position)
+        self.assertEqual(self.line, new_spool.peek(max_bytes=4)[1])
+
+    def test_reload_and_repair(self):
+        new_spool = self._spool()
+        new_spool.append(self.line)
+        new_spool.close()
+        with open(os.path.join(self.directory, self._segments()[0]),
+                  'ab') as segment:
+            segment.write(b'2// cpu_')
+        new_spool = self._spool()
+        self.assertEqual(len(self.line), new_spool.pending_bytes)
+        new_spool.append(self.line)
+        self.assertEqual(2, len(self._segments()))
+        position, data = new_spool.peek()
+        self.assertEqual(self.line, data)
+        new_spool.ack(position)
+        self.assertEqual(1, len(self._segments()))
+
+    def test_drop_oldest(self):
+        new_spool = self._spool(segment_bytes=len(self.line),
+                                max_bytes=len(self.line) * 2)
+        for value in (b'1', b'2', b'3'):
+            new_spool.append(self.line[:-2] + value + b'\n')
+        self.assertEqual(len(self.line), new_spool.stats['dropped_bytes'])
+        self.assertEqual(self.line[:-2] + b'2\n', new_spool.peek()[1])
+
+    def test_stale_ack_after_drop(self):
+        new_spool = self._spool(segment_bytes=1000, max_bytes=100)
+        line = b'123456789\n'
+        for _ in range(5):
+            new_spool.append(line)
+        position, data = new_spool.peek(max_bytes=30)
+        self.assertEqual(line * 3, data)
+        # NOTE: Drops the segment being read, the new one gets
+        # another number.
+        new_spool.append(line * 9)
+        self.assertNotEqual(position[0], new_spool.peek()[0][0])
+        new_spool.ack(position)
+        self.assertEqual(len(line) * 9, new_spool.pending_bytes)
+        self.assertEqual(line * 9, new_spool.peek()[1])
+
+    def test_drop_newest(self):
+        new_spool = self._spool(max_bytes=len(self.line), drop='newest')
+        self.assertTrue(new_spool.append(self.line))
+        self.assertFalse(new_spool.append(self.line))
+        self.assertEqual(len(self.line), new_spool.pending_bytes)
+
+    def test_drop_error(self):
+        new_spool = self._spool(max_bytes=len(self.line), drop='error')
+        new_spool.append(self.line)
+        self.assertRaises(spool.SpoolFullException, new_spool.append,
+                          self.line)
+
+    def test_invalid_policies(self):
+        self.assertRaises(ValueError, spool.Spool, self.directory,
+                          fsync='sometimes')
+        self.assertRaises(ValueError, spool.Spool, self.directory,
+                          drop='random')
+
+
+class TestReplayerTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestReplayerTestCase, self).setUp()
+        directory = self.useFixture(fixtures.TempDir()).path
+        self.spool = spool.Spool(directory)
+        self.addCleanup(self.spool.close)
+        self.line = b'1// cpu_util{resource_id=abc} 1\n'
+        self.mock_session = mock.Mock()
+        self.mock_response = mock.Mock(status_code=200)
+
+    def _client(self):
+        with mock.patch('requests.Session', return_value=self.mock_session):
+            client = warp10client.Warp10Client(
+                write_token='token', warp10_api_url='http://example.com',
+                spool=self.spool, replay_interval=60)
+        self.addCleanup(client.close)
+        return client
+
+    def test_set_spools_when_unreachable(self):
+        self.mock_session.post = mock.Mock(
+            side_effect=requests.ConnectionError('refused'))
+        client = self._client()
+        client.set({'name': 'cpu_util', 'tags': {'resource_id': 'abc'},
+                    'position': {'timestamp': 1}, 'value': 1})
+        self.assertEqual(len(self.line), self.spool.pending_bytes)
+
+        self.assertFalse(client._replayer.replay())
+        self.assertEqual(1, client._replayer.stats['errors'])
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        self.assertTrue(client._replayer.replay())
+        self.assertEqual(self.line,
+                         self.mock_session.post.call_args[1]['data'])
+        self.assertEqual(0, self.spool.pending_bytes)
+
+    def test_set_raises_when_rejected(self):
+        self.mock_response.status_code = 400
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        client = self._client()
+        self.assertRaises(requests.RequestException, client.set_serie,
+                          'cpu_util', {}, [1], [1])
+        self.assertEqual(0, self.spool.pending_bytes)
+
+    def test_replay_drops_rejected(self):
+        self.spool.append(self.line)
+        self.mock_response.status_code = 400
+        self.mock_session.post = mock.Mock(return_value=self.mock_response)
+        client = self._client()
+        self.assertTrue(client._replayer.replay())
+        self.assertEqual(len(self.line),
+                         client._replayer.stats['rejected_bytes'])
+
+    def test_close(self):
+        self.spool.append(self.line)
+        with self._client() as client:
+            replayer = client._replayer
+        self.assertFalse(replayer._thread.is_alive())
+        self.assertIsNone(self.spool._file)
+        self.mock_session.close.assert_called_once_with()
+
+    def test_is_spoolable(self):
+        is_spoolable = warp10_client.Warp10Client._is_spoolable
+        self.assertTrue(is_spoolable(warp10_client.CallException()))
+        self.assertTrue(is_spoolable(requests.RequestException(
+            response=mock.Mock(status_code=503))))
+        self.assertFalse(is_spoolable(requests.RequestException(
+            response=mock.Mock(status_code=400))))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import array
+
+import warp10client
+from warp10client.position import Position
+from warp10client.tests import base
+from warp10client import timeserie
+
+
+class TestTimeserieTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestTimeserieTestCase, self).setUp()
+        self.tags = {'resource_id': 'abc'}
+        self.builder = timeserie.ColumnsBuilder()
+
+    def _build(self, values):
+        for i, value in enumerate(values):
+            self.builder.append(1000 + i, None, None, None, value)
+        return self.builder.build(name='cpu_util', tags=self.tags)
+
+    def test_builder_long_values(self):
+        serie = self._build([1, 2, 3])
+        self.assertIsInstance(serie.values, array.array)
+        self.assertEqual(timeserie.LONG_TYPECODE, serie.values.typecode)
+        self.assertEqual([1, 2, 3], serie.values.tolist())
+        self.assertEqual(1000, serie.start)
+        self.assertEqual(1002, serie.stop)
+
+    def test_builder_promotes_to_double(self):
+        serie = self._build([1, 2.5])
+        self.assertEqual(timeserie.DOUBLE_TYPECODE, serie.values.typecode)
+        self.assertEqual([1.0, 2.5], serie.values.tolist())
+
+    def test_builder_keeps_booleans_and_strings(self):
+        serie = self._build([1, True, 'up'])
+        self.assertEqual([1, True, 'up'], serie.values)
+        self.assertIs(True, serie.metrics[1].value)
+
+    def test_builder_geo_columns(self):
+        self.builder.append(1, None, None, None, 1.0)
+        self.builder.append(2, 48.5, 2.25, 100, 2.0)
+        self.builder.append(3, None, None, None, 3.0)
+        serie = self.builder.build(name='cpu_util', tags=self.tags)
+        self.assertEqual(3, len(serie.latitudes))
+        self.assertEqual(48.5, serie.latitudes[1])
+        metrics = list(serie.metrics)
+        self.assertIsNone(metrics[0].position.latitude)
+        self.assertEqual(48.5, metrics[1].position.latitude)
+        self.assertEqual(2.25, metrics[1].position.longitude)
+        self.assertEqual(100, metrics[1].position.elevation)
+        self.assertEqual('', metrics[2].position.elevation)
+
+    def test_metrics_are_lazy(self):
+        serie = self._build([1.0, 2.0, 3.0])
+        self.assertIsInstance(serie.metrics, timeserie.MetricSequence)
+        self.assertEqual(3, len(serie.metrics))
+        self.assertIsInstance(serie.metrics[-1], warp10client.Metric)
+        self.assertEqual(3.0, serie.metrics[-1].value)
+        self.assertEqual([1.0, 2.0], [m.value for m in serie.metrics[:2]])
+        self.assertEqual(self.tags, serie.metrics[0]._tags)
+        self.assertRaises(IndexError, serie.metrics.__getitem__, 3)
+
+    def test_build_from_columns(self):
+        serie = timeserie.build_from_columns('cpu_util', self.tags,
+                                             [3, 1, 2], [1, 2.5, 3])
+        self.assertEqual(timeserie.DOUBLE_TYPECODE, serie.values.typecode)
+        self.assertEqual([1, 3], [serie.start, serie.stop])
+        self.assertEqual(['up'], timeserie.build_from_columns(
+            'cpu_util', self.tags, [1], ['up']).values)
+        self.assertIsNone(timeserie.build_from_columns(
+            'cpu_util', self.tags, [], []).values)
+        self.assertRaises(ValueError, timeserie.build_from_columns,
+                          'cpu_util', self.tags, [1], [])
+
+    def test_build_from_geo_columns(self):
+        nan = float('nan')
+        serie = timeserie.build_from_columns(
+            'cpu_util', self.tags, [1, 2], [1, 2], latitudes=[nan, nan],
+            longitudes=[nan, nan], elevations=[None, 100])
+        self.assertIsNone(serie.latitudes)
+        self.assertIsNone(serie.longitudes)
+        self.assertEqual(100, serie.elevations[1])
+        serie = timeserie.build_from_columns(
+            'cpu_util', self.tags, [1, 2], [1, 2], latitudes=[48.5, None])
+        self.assertEqual(48.5, serie.latitudes[0])
+        self.assertEqual(2, len(serie.longitudes))
+        self.assertRaises(ValueError, timeserie.build_from_columns,
+                          'cpu_util', self.tags, [1, 2], [1, 2],
+                          elevations=[1])
+
+    def test_metrics_share_tags(self):
+        serie = self._build([1.0, 2.0])
+        first, second = serie.metrics
+        self.assertIs(first._tags, second._tags)
+        self.assertRaises(TypeError, first._tags.__setitem__, 'unit', '%')
+        self.assertRaises(AttributeError, setattr, first, 'extra', 1)
+        serie.tags = {'resource_id': 'def'}
+        self.assertEqual({'resource_id': 'def'}, serie.metrics[0]._tags)
+
+    def test_metrics_list(self):
+        metric = warp10client.Metric(name='cpu_util', value=1.5,
+                                     tags=self.tags,
+                                     position=Position(timestamp=10))
+        serie = timeserie.Timeserie(start=10, stop=10, metrics=[metric])
+        self.assertEqual([metric], serie.metrics)
+        self.assertEqual(1, len(serie))
+
+    def test_empty(self):
+        serie = timeserie.Timeserie()
+        self.assertEqual(0, len(serie))
+        self.assertFalse(serie.metrics)
+        self.assertEqual([], list(serie))
+
+    def test_to_numpy_does_not_copy(self):
+        if timeserie.numpy is None:
+            self.skipTest('NumPy is not installed')
+        serie = self._build([1.0, 2.0])
+        columns = serie.to_numpy()
+        self.assertEqual(['timestamps', 'values'], sorted(columns))
+        serie.values[0] = 42.0
+        self.assertEqual(42.0, columns['values'][0])
+        self.assertEqual([1000, 1001], columns['timestamps'].tolist())
+
+    def test_to_numpy_from_metrics(self):
+        if timeserie.numpy is None:
+            self.skipTest('NumPy is not installed')
+        metric = warp10client.Metric(name='cpu_util', value=1.5,
+                                     tags=self.tags,
+                                     position=Position(timestamp=10))
+        serie = timeserie.Timeserie(metrics=[metric])
+        columns = serie.to_numpy()
+        self.assertEqual([10], columns['timestamps'].tolist())
+        self.assertEqual([1.5], columns['values'].tolist())
+
+    def test_to_pandas(self):
+        if timeserie.pandas is None:
+            self.skipTest('pandas is not installed')
+        serie = self._build([1.0, 2.0])
+        frame = serie.to_pandas()
+        self.assertEqual([1000, 1001], list(frame.index))
+        self.assertEqual([1.0, 2.0], list(frame['values']))
+
+
+class TestTimeserieSetTestCase(base.BaseTestCase):
+
+    def test_get_serie_key(self):
+        self.assertEqual('cpu{a=1,b=2}',
+                         timeserie.get_serie_key('cpu', {'b': '2', 'a': '1'}))
+        self.assertEqual('cpu{}', timeserie.get_serie_key('cpu'))
+        self.assertEqual('cpu{a=x%2Cb%3Dy}',
+                         timeserie.get_serie_key('cpu', {'a': 'x,b=y'}))
+
+    def test_set_keeps_series_apart(self):
+        series = timeserie.TimeserieSet([
+            timeserie.build_from_columns('cpu', {'a': 'x,b=y'}, [1], [1]),
+            timeserie.build_from_columns('cpu', {'a': 'x', 'b': 'y'},
+                                         [1], [2])])
+        self.assertEqual(2, len(series))
+        self.assertEqual([1], list(series.get('cpu', {'a': 'x,b=y'})
+                                   .values))
+        self.assertEqual([2], list(series.get('cpu', {'a': 'x', 'b': 'y'})
+                                   .values))
+
+    def test_set(self):
+        serie_a = timeserie.Timeserie(name='cpu', tags={'host': 'a'})
+        serie_b = timeserie.Timeserie(name='cpu', tags={'host': 'b'})
+        series = timeserie.TimeserieSet([serie_a, serie_b])
+        self.assertEqual(2, len(series))
+        self.assertEqual([serie_a, serie_b], list(series))
+        self.assertIs(serie_b, series.get('cpu', {'host': 'b'}))
+        self.assertIsNone(series.get('cpu', {'host': 'c'}))
+        self.assertIn('cpu{host=a}', series)
+        self.assertEqual(['cpu{host=a}', 'cpu{host=b}'], series.keys())
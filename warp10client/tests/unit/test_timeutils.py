@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from warp10client.common import timeutils
+from warp10client.tests import base
+
+
+class TestTimeutilsTestCase(base.BaseTestCase):
+
+    def test_parse_iso8601(self):
+        self.assertEqual(0, timeutils.parse_iso8601('1970-01-01T00:00:00Z'))
+        self.assertEqual(1483228800000000,
+                         timeutils.parse_iso8601('2017-01-01T00:00:00.000Z'))
+        self.assertEqual(1483228800123456,
+                         timeutils.parse_iso8601(
+                             '2017-01-01T00:00:00.123456789Z'))
+        self.assertEqual(1483228800000000,
+                         timeutils.parse_iso8601(
+                             '2017-01-01T02:00:00.000+02:00'))
+        self.assertRaises(ValueError, timeutils.parse_iso8601, 'NOW')
+
+    def test_format_iso8601(self):
+        self.assertEqual('2017-01-01T00:00:00.000001Z',
+                         timeutils.format_iso8601(1483228800000001))
+        self.assertEqual(1506398400000000,
+                         timeutils.parse_iso8601(
+                             timeutils.format_iso8601(1506398400000000)))
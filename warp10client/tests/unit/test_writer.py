@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+from mock import mock
+
+import warp10client
+from warp10client.tests import base
+from warp10client import writer
+
+
+class TestBufferedWriterTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestBufferedWriterTestCase, self).setUp()
+        self.client = mock.Mock()
+        self.metric = {
+            'name': 'cpu_util',
+            'tags': {'resource_id': 'abc'},
+            'position': {'timestamp': 1506398400000000},
+            'value': 1,
+        }
+        self.line = '1506398400000000// cpu_util{resource_id=abc} 1\n'
+
+    def _writer(self, **kwargs):
+        buffered_writer = writer.BufferedWriter(self.client, **kwargs)
+        self.addCleanup(buffered_writer.close)
+        return buffered_writer
+
+    def _wait_for(self, predicate, timeout=2):
+        deadline = time.time() + timeout
+        while not predicate() and time.time() < deadline:
+            time.sleep(0.005)
+        self.assertTrue(predicate())
+
+    def test_flush_on_max_lines(self):
+        buffered_writer = self._writer(max_lines=2, max_latency=60)
+        buffered_writer.write(self.metric)
+        self.assertFalse(self.client._ingest.called)
+        buffered_writer.write(self.metric)
+        self._wait_for(lambda: self.client._ingest.called)
+        self.client._ingest.assert_called_once_with(None, body=self.line * 2)
+        self.assertEqual({'lines': 2, 'bytes': len(self.line) * 2,
+                          'flushes': 1, 'errors': 0, 'dropped_lines': 0,
+                          'spooled_lines': 0},
+                         buffered_writer.stats)
+
+    def test_flush_on_max_bytes(self):
+        buffered_writer = self._writer(max_bytes=len(self.line),
+                                       max_latency=60)
+        buffered_writer.write([self.metric])
+        self._wait_for(lambda: self.client._ingest.called)
+
+    def test_flush_on_max_latency(self):
+        buffered_writer = self._writer(max_latency=0.05)
+        buffered_writer.write(self.metric)
+        self._wait_for(lambda: self.client._ingest.called)
+        self.assertEqual(1, buffered_writer.stats['flushes'])
+
+    def test_flush_on_close(self):
+        buffered_writer = self._writer(max_latency=60)
+        buffered_writer.write(self.metric)
+        buffered_writer.close()
+        self.client._ingest.assert_called_once_with(None, body=self.line)
+        self.assertRaises(ValueError, buffered_writer.write, self.metric)
+
+    def test_errors(self):
+        self.client._ingest.side_effect = Exception('boom')
+        buffered_writer = self._writer(max_latency=60)
+        buffered_writer.write([self.metric, self.metric])
+        buffered_writer.flush()
+        self.assertEqual(1, buffered_writer.stats['errors'])
+        self.assertEqual(2, buffered_writer.stats['dropped_lines'])
+        self.assertEqual(0, buffered_writer.stats['flushes'])
+
+    def test_spooled(self):
+        self.client._ingest.return_value = False
+        buffered_writer = self._writer(max_latency=60)
+        buffered_writer.write([self.metric, self.metric])
+        buffered_writer.flush()
+        self.assertEqual(2, buffered_writer.stats['spooled_lines'])
+        self.assertEqual(0, buffered_writer.stats['lines'])
+
+    def test_lines_reach_transport(self):
+        mock_session = mock.Mock()
+        mock_session.post.return_value = mock.Mock(status_code=200)
+        with mock.patch('requests.Session', return_value=mock_session):
+            client = warp10client.Warp10Client(
+                write_token='write', warp10_api_url='http://example.com')
+        buffered_writer = client.writer(max_latency=60)
+        buffered_writer.write([self.metric, self.metric])
+        buffered_writer.close()
+        url = mock_session.post.call_args[0][0]
+        self.assertEqual('http://example.com/update', url)
+        self.assertEqual(self.line * 2,
+                         mock_session.post.call_args[1]['data'])
+        self.assertEqual(2, buffered_writer.stats['lines'])
+
+    def test_async_client(self):
+        try:
+            from warp10client import aio
+        except SyntaxError:
+            self.skipTest('asyncio client needs python 3.5+')
+        if aio.aiohttp is None:
+            self.skipTest('aiohttp is not installed')
+        client = aio.AsyncWarp10Client(write_token='write',
+                                       warp10_api_url='http://example.com')
+        self.assertRaises(TypeError, client.writer)
+
+    def test_backpressure(self):
+        sending = threading.Event()
+        release = threading.Event()
+
+        def call(*args, **kwargs):
+            sending.set()
+            release.wait(2)
+            return True
+
+        self.client._ingest.side_effect = call
+        buffered_writer = self._writer(max_lines=1, max_latency=60,
+                                       max_bytes=10 ** 6,
+                                       max_buffer_bytes=len(self.line))
+        buffered_writer.write(self.metric)
+        sending.wait(2)
+        buffered_writer.write(self.metric)
+        self.assertRaises(writer.BufferFullException,
+                          buffered_writer.write, self.metric, timeout=0.05)
+        release.set()
+        buffered_writer.write(self.metric, timeout=2)
+        buffered_writer.close()
+        self.assertEqual(3, buffered_writer.stats['lines'])
@@ -1,12 +1,413 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import array
+import collections
+
+import six
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+from warp10client import encoder
+from warp10client.metric import intern_tags
+from warp10client.metric import Metric
+from warp10client.position import Position
+
+# NOTE: 'q' is not available on python 2, 'l' is 64 bits there
+# on the platforms we care about.
+LONG_TYPECODE = 'q' if 'q' in getattr(array, 'typecodes', '') else 'l'
+DOUBLE_TYPECODE = 'd'
+
+COLUMNS = ('timestamps', 'values', 'latitudes', 'longitudes', 'elevations')
+
+_NAN = float('nan')
+_NUMERIC_TYPES = six.integer_types + (float,)
+
+
+def _is_nan(value):
+    return value != value
+
+
+class ColumnsBuilder(object):
+    """
+
+    Accumulate datapoints of one serie into typed arrays.
+
+    Timestamps are stored as 64 bits integers, numeric values as 64 bits
+    integers or doubles. Values of other types (booleans, strings) fall
+    back to a plain list. Geo columns are only allocated when a datapoint
+    carries a location or an elevation, missing entries are NaN.
+
+    """
+
+    def __init__(self):
+        self.timestamps = array.array(LONG_TYPECODE)
+        self.values = None
+        self.latitudes = None
+        self.longitudes = None
+        self.elevations = None
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _nan_column(self):
+        return array.array(DOUBLE_TYPECODE, [_NAN]) * len(self.timestamps)
+
+    def _append_value(self, value):
+        values = self.values
+        kind = type(value)
+        if values is None:
+            if kind in six.integer_types:
+                values = array.array(LONG_TYPECODE)
+            elif kind == float:
+                values = array.array(DOUBLE_TYPECODE)
+            else:
+                values = list()
+            self.values = values
+        elif isinstance(values, list):
+            values.append(value)
+            return
+        elif kind == float and values.typecode == LONG_TYPECODE:
+            values = self.values = array.array(DOUBLE_TYPECODE, values)
+        elif kind not in _NUMERIC_TYPES:
+            # NOTE: array.array would silently turn booleans
+            # into numbers.
+            values = self.values = values.tolist()
+        try:
+            values.append(value)
+        except OverflowError:
+            values = self.values = values.tolist()
+            values.append(value)
+
+    def append(self, timestamp, latitude, longitude, elevation, value):
+        if latitude is not None or longitude is not None:
+            if self.latitudes is None:
+                self.latitudes = self._nan_column()
+                self.longitudes = self._nan_column()
+            self.latitudes.append(_NAN if latitude is None else latitude)
+            self.longitudes.append(_NAN if longitude is None else longitude)
+        elif self.latitudes is not None:
+            self.latitudes.append(_NAN)
+            self.longitudes.append(_NAN)
+        if elevation is not None:
+            if self.elevations is None:
+                self.elevations = self._nan_column()
+            self.elevations.append(elevation)
+        elif self.elevations is not None:
+            self.elevations.append(_NAN)
+        self._append_value(value)
+        self.timestamps.append(timestamp)
+
+    def build(self, **kwargs):
+        timestamps = self.timestamps
+        return Timeserie(start=min(timestamps) if timestamps else None,
+                         stop=max(timestamps) if timestamps else None,
+                         columns=dict((column, getattr(self, column))
+                                      for column in COLUMNS),
+                         **kwargs)
+
+
+def _get_values_column(values):
+    # NOTE: Same typing as ColumnsBuilder, booleans and strings
+    # are kept in a plain list.
+    if not values:
+        return None
+    kinds = set(type(value) for value in values)
+    try:
+        if kinds <= set(six.integer_types):
+            return array.array(LONG_TYPECODE, values)
+        if kinds <= set(_NUMERIC_TYPES):
+            return array.array(DOUBLE_TYPECODE, values)
+    except OverflowError:
+        pass
+    return list(values)
+
+
+def _get_geo_column(column, length):
+    # NOTE: Warp10 gives NaN for datapoints without a location
+    # or an elevation, null with strict JSON output. Columns without any
+    # are not allocated, like in ColumnsBuilder.
+    if not column:
+        return None
+    if len(column) != length:
+        raise ValueError('timestamps and geo columns have different '
+                         'lengths')
+    column = array.array(DOUBLE_TYPECODE,
+                         (_NAN if value is None else value
+                          for value in column))
+    if all(_is_nan(value) for value in column):
+        return None
+    return column
+
+
+def build_from_columns(name, tags, timestamps, values, latitudes=None,
+                       longitudes=None, elevations=None):
+    """
+
+    Build a serie from whole columns.
+
+    :param name: class name of the serie
+    :param tags: labels of the serie
+    :param timestamps: list of timestamps
+    :param values: list of values, same length as timestamps
+    :param latitudes: list of latitudes, None or NaN when missing
+    :param longitudes: list of longitudes, None or NaN when missing
+    :param elevations: list of elevations, None or NaN when missing
+    :return: Timeserie object
+
+    """
+    if len(timestamps) != len(values):
+        raise ValueError('timestamps and values have different lengths')
+    latitudes = _get_geo_column(latitudes, len(timestamps))
+    longitudes = _get_geo_column(longitudes, len(timestamps))
+    if latitudes is None and longitudes is not None:
+        latitudes = array.array(DOUBLE_TYPECODE, [_NAN]) * len(timestamps)
+    elif longitudes is None and latitudes is not None:
+        longitudes = array.array(DOUBLE_TYPECODE, [_NAN]) * len(timestamps)
+    return Timeserie(start=min(timestamps) if timestamps else None,
+                     stop=max(timestamps) if timestamps else None,
+                     name=name, tags=tags,
+                     columns={'timestamps': array.array(LONG_TYPECODE,
+                                                        timestamps),
+                              'values': _get_values_column(values),
+                              'latitudes': latitudes,
+                              'longitudes': longitudes,
+                              'elevations': _get_geo_column(
+                                  elevations, len(timestamps))})
+
+
+class MetricSequence(object):
+    """Read only sequence building metric objects on access."""
+
+    def __init__(self, timeserie):
+        self._timeserie = timeserie
+
+    def __len__(self):
+        return len(self._timeserie)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._timeserie._get_metric(i) for i in
+                    six.moves.range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('metric index out of range')
+        return self._timeserie._get_metric(index)
+
+    def __iter__(self):
+        for index in six.moves.range(len(self)):
+            yield self._timeserie._get_metric(index)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return '<MetricSequence of %d metrics>' % len(self)
+
 
 class Timeserie(object):
-    def __init__(self, start=None, stop=None, metrics=[],
-                 aggregation=None, granularity=None):
+    """
+
+    Serie of datapoints.
+
+    Datapoints fetched from Warp10 are held column by column in typed
+    arrays. Metric objects are only created when ``metrics`` is accessed,
+    ``to_numpy()`` and ``to_pandas()`` expose the columns directly.
+    Metric objects of a serie share one read only labels mapping.
+
+    """
+
+    __slots__ = ('start', 'stop', 'aggregation', 'granularity', 'name',
+                 'tags', '_metrics', '_shared_tags') + COLUMNS
+
+    def __init__(self, start=None, stop=None, metrics=None,
+                 aggregation=None, granularity=None, name=None, tags=None,
+                 columns=None):
         self.start = start
         self.stop = stop
-        self.metrics = metrics
         self.aggregation = aggregation
         self.granularity = granularity
+        self.name = name
+        self.tags = tags
+        self._metrics = None
+        self._shared_tags = None
+        self.timestamps = array.array(LONG_TYPECODE)
+        self.values = None
+        self.latitudes = None
+        self.longitudes = None
+        self.elevations = None
+        if columns:
+            for column in COLUMNS:
+                setattr(self, column, columns.get(column))
+        elif metrics:
+            self._metrics = list(metrics)
+
+    @property
+    def metrics(self):
+        if self._metrics is not None:
+            return self._metrics
+        return MetricSequence(self)
+
+    @metrics.setter
+    def metrics(self, metrics):
+        self._metrics = list(metrics)
+
+    def __len__(self):
+        if self._metrics is not None:
+            return len(self._metrics)
+        return len(self.timestamps)
+
+    def __iter__(self):
+        return iter(self.metrics)
+
+    def _get_tags(self):
+        # NOTE: tags may be replaced or updated by the caller,
+        # the shared mapping is only reused while they are equal.
+        tags = self.tags or {}
+        if self._shared_tags is None or self._shared_tags != tags:
+            self._shared_tags = intern_tags(tags)
+        return self._shared_tags
+
+    def _get_metric(self, index):
+        def column(values):
+            if values is None:
+                return None
+            value = values[index]
+            return None if _is_nan(value) else value
+
+        elevation = column(self.elevations)
+        return Metric(name=self.name,
+                      value=self.values[index],
+                      tags=self._get_tags(),
+                      position=Position(
+                          timestamp=self.timestamps[index],
+                          latitude=column(self.latitudes),
+                          longitude=column(self.longitudes),
+                          elevation=None if elevation is None
+                          else int(elevation)))
+
+    def _get_columns(self):
+        if self._metrics is None:
+            return dict((column, getattr(self, column)) for column in COLUMNS)
+        # NOTE: Serie built from metric objects, columns have to
+        # be computed (and so copied) from them.
+        builder = ColumnsBuilder()
+        for metric in self._metrics:
+            position = metric.position
+            elevation = position.elevation
+            builder.append(position.timestamp, position.latitude,
+                           position.longitude,
+                           None if elevation == '' else elevation,
+                           metric.value)
+        return dict((column, getattr(builder, column)) for column in COLUMNS)
+
+    def to_numpy(self):
+        """
+
+        Get columns as NumPy arrays.
+
+        Numeric columns are views on the underlying arrays, no data is
+        copied. Columns of booleans or strings are object arrays.
+
+        :return: dict of column name to array, absent columns are skipped
+
+        """
+        if numpy is None:
+            raise ImportError('NumPy is required by Timeserie.to_numpy()')
+        columns = dict()
+        for column, values in six.iteritems(self._get_columns()):
+            if values is None:
+                continue
+            if isinstance(values, array.array):
+                dtype = numpy.float64 if values.typecode == DOUBLE_TYPECODE \
+                    else numpy.int64
+                columns[column] = numpy.frombuffer(values, dtype=dtype) \
+                    if len(values) else numpy.array([], dtype=dtype)
+            else:
+                columns[column] = numpy.array(values, dtype=object)
+        return columns
+
+    def to_pandas(self):
+        """
+
+        Get datapoints as a pandas DataFrame indexed by timestamp.
+
+        :return: pandas.DataFrame built on top of to_numpy() columns
+
+        """
+        if pandas is None:
+            raise ImportError('pandas is required by Timeserie.to_pandas()')
+        columns = self.to_numpy()
+        timestamps = columns.pop('timestamps', None)
+        return pandas.DataFrame(columns, index=timestamps, copy=False)
+
+    def __repr__(self):
+        return '<Timeserie {} points={} start={} stop={}>'.format(
+            self.name, len(self), self.start, self.stop)
+
+
+def get_serie_key(name, tags=None):
+    """
+
+    Get the key identifying a serie in a TimeserieSet.
+
+    :param name: class name of the serie
+    :param tags: labels of the serie
+    :return: selector like 'class{label1=value1,label2=value2}', class,
+        labels and values URL encoded as in GTS input lines
+
+    """
+    # NOTE: Encoding keeps ',' and '=' of values from making
+    # two series share a key.
+    tags = tags or {}
+    return '{}{{{}}}'.format(encoder.quote(name), ','.join(
+        '{}={}'.format(encoder.quote(key), encoder.quote(tags[key]))
+        for key in sorted(tags)))
+
+
+class TimeserieSet(object):
+    """Series returned by a single fetch, keyed by class and labels."""
+
+    def __init__(self, timeseries=None):
+        self._timeseries = collections.OrderedDict()
+        for timeserie in timeseries or ():
+            self.add(timeserie)
+
+    def add(self, timeserie):
+        self._timeseries[get_serie_key(timeserie.name,
+                                       timeserie.tags)] = timeserie
+
+    def get(self, name, tags=None, default=None):
+        return self._timeseries.get(get_serie_key(name, tags), default)
+
+    def keys(self):
+        return list(self._timeseries.keys())
+
+    def items(self):
+        return list(self._timeseries.items())
+
+    def __getitem__(self, key):
+        return self._timeseries[key]
+
+    def __contains__(self, key):
+        return key in self._timeseries
+
+    def __iter__(self):
+        return iter(self._timeseries.values())
+
+    def __len__(self):
+        return len(self._timeseries)
+
+    def __repr__(self):
+        return '<TimeserieSet of %d series>' % len(self)
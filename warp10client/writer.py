@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import inspect
+import threading
+import time
+
+import daiquiri
+
+from warp10client.metric import Metric
+
+LOG = daiquiri.getLogger(__name__)
+
+
+class BufferFullException(Exception):
+    pass
+
+
+class BufferedWriter(object):
+    """
+
+    Accumulate metrics and send them to Warp10 in batches.
+
+    Lines are flushed by a background thread once max_bytes or max_lines
+    are buffered, or max_latency seconds after the oldest buffered line.
+    When max_buffer_bytes are waiting to be sent, write() blocks until
+    the flusher catches up (backpressure). Remaining lines are flushed
+    on close(), at the latest when the interpreter exits.
+
+    """
+
+    def __init__(self, client, max_bytes=1024 * 1024, max_lines=10000,
+                 max_latency=1.0, max_buffer_bytes=None):
+        iscoroutinefunction = getattr(inspect, 'iscoroutinefunction', None)
+        if iscoroutinefunction and iscoroutinefunction(client._call):
+            # NOTE: The flusher thread can't await calls of an asyncio
+            # client, lines would be lost.
+            raise TypeError('BufferedWriter needs a blocking Warp10Client')
+        self._client = client
+        self._max_bytes = max_bytes
+        self._max_lines = max_lines
+        self._max_latency = max_latency
+        self._max_buffer_bytes = max_buffer_bytes or max_bytes * 4
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._lines = list()
+        self._bytes = 0
+        self._oldest = None
+        self._closed = False
+        self.stats = {
+            'lines': 0,
+            'bytes': 0,
+            'flushes': 0,
+            'errors': 0,
+            'dropped_lines': 0,
+            'spooled_lines': 0,
+        }
+        self._thread = threading.Thread(target=self._run,
+                                        name='warp10-writer')
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _format(metric):
+        if not isinstance(metric, Metric):
+            metric = Metric(**metric)
+        return '{}\n'.format(metric.format_metric())
+
+    def write(self, metrics, timeout=None):
+        """
+
+        Buffer metrics to be sent to Warp10.
+
+        :param metrics: Hash with metric, metric object or list of them
+        :param timeout: seconds to wait for room in the buffer, wait
+            forever if None
+        :raise BufferFullException: buffer still full after timeout
+
+        """
+        if isinstance(metrics, (dict, Metric)):
+            metrics = [metrics]
+        lines = [self._format(metric) for metric in metrics]
+        size = sum(len(line) for line in lines)
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while (self._bytes and not self._closed and
+                   self._bytes + size > self._max_buffer_bytes):
+                remaining = None if deadline is None \
+                    else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise BufferFullException(
+                        'Warp10 writer buffer is full (%d bytes)' %
+                        self._bytes)
+                self._condition.notify_all()
+                self._condition.wait(remaining)
+            if self._closed:
+                raise ValueError('Write to a closed Warp10 writer')
+            empty = not self._lines
+            if empty:
+                self._oldest = time.time()
+            self._lines.extend(lines)
+            self._bytes += size
+            # NOTE: Wake the flusher up so it starts counting
+            # max_latency from the first line.
+            if empty or self._is_ready():
+                self._condition.notify_all()
+
+    def _is_ready(self):
+        return (self._bytes >= self._max_bytes or
+                len(self._lines) >= self._max_lines)
+
+    def _take(self):
+        lines = self._lines
+        self._lines = list()
+        self._bytes = 0
+        self._oldest = None
+        self._condition.notify_all()
+        return lines
+
+    def _send(self, lines):
+        if not lines:
+            return
+        body = ''.join(lines)
+        try:
+            sent = self._client._ingest(None, body=body)
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.stats['dropped_lines'] += len(lines)
+            LOG.error('Failed to flush %d lines to Warp10: %s',
+                      len(lines), e)
+        else:
+            if not sent:
+                self.stats['spooled_lines'] += len(lines)
+                return
+            self.stats['lines'] += len(lines)
+            self.stats['bytes'] += len(body)
+            self.stats['flushes'] += 1
+
+    def flush(self):
+        """Send buffered lines now."""
+        with self._send_lock:
+            with self._condition:
+                lines = self._take()
+            self._send(lines)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not (self._closed or self._is_ready() or (
+                        self._lines and time.time() - self._oldest >=
+                        self._max_latency)):
+                    timeout = None
+                    if self._lines:
+                        timeout = self._max_latency - (
+                            time.time() - self._oldest)
+                    self._condition.wait(timeout)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):
+        """Flush remaining lines and stop the background thread."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        unregister = getattr(atexit, 'unregister', None)
+        if unregister:
+            unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()